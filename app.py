@@ -1,25 +1,35 @@
-import os
 from pathlib import Path
 
-os.environ["FLAGS_enable_pir_api"] = "0"
-os.environ["FLAGS_use_pir_api"] = "0"
-os.environ["FLAGS_new_executor"] = "0"
-os.environ["FLAGS_use_mkldnn"] = "0"
-
 import gradio as gr
 from src.ui.page import build_app
 from src.config import CSS_PATH, SERVER_NAME, SERVER_PORT
+from src.services import ocr_pool, cpu_budget
+
+
+def main():
+    css = open(CSS_PATH, "r", encoding="utf-8").read()
+
+    # ✅ 线程预算：Gradio 进程里的 OpenCV 先限住（OCR 进程在加载模型时各自生效）
+    budget = cpu_budget.plan()
+    cpu_budget.apply_cv(budget)
+    print(cpu_budget.report("web"))
+
+    # ✅ OCR 子进程先拉起来预热（spawn 会重新 import 本文件，所以启动逻辑必须放在 main 里）
+    ocr_pool.start_pool()
+
+    demo = build_app(css=css)
 
-css = open(CSS_PATH, "r", encoding="utf-8").read()
+    # ✅ Windows 下务必用绝对路径
+    STATIC_DIR = Path("static").resolve()
 
-demo = build_app(css=css)
+    demo.launch(
+        server_name=SERVER_NAME,
+        server_port=SERVER_PORT,
+        css=css,
+        allowed_paths=[str(STATIC_DIR)],
+        max_threads=budget["web_threads"],
+    )
 
-# ✅ Windows 下务必用绝对路径
-STATIC_DIR = Path("static").resolve()
 
-demo.launch(
-    server_name=SERVER_NAME,
-    server_port=SERVER_PORT,
-    css=css,
-    allowed_paths=[str(STATIC_DIR)],
-)
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 LOG_DIR = "data/logs"
+LOG_INDEX_DB_PATH = "data/log_index.sqlite3"   # 日志索引（SQLite），可随时用 tools/rebuild_log_index.py 重建
+LEDGER_PATH = "data/ledger.jsonl"  # 结构化提交记录（只追加，一行一条）；旧日志用 tools/ledger_backfill.py 补
+LOG_WATCH_ENABLED = True      # 日志文件夹列表缓存在内存里，用 inotify 盯着 LOG_DIR 的外部改动（非 Linux 退回轮询）
+LOG_WATCH_POLL_SEC = 2.0      # 轮询模式下检查 LOG_DIR mtime 的间隔
 ITEMS_JSON_PATH = "data/items.json"
 CSS_PATH = "static/style.css"
 
@@ -21,4 +25,92 @@ PRICE_PARAMS_BASE = {
     "sIdeToken": "NoOapI",
     "method": "dfm/object.price.latest",
     "source": "2",
-}
\ No newline at end of file
+}
+
+# OCR 级联提前退出门槛：候选满足以下条件就直接返回，不再跑剩余 ROI/预处理
+OCR_GATE_MIN_SCORE = 0.80        # rec 置信度下限
+OCR_GATE_REQUIRE_UNIT = True     # 必须带 K/w 等单位才算“可靠”
+OCR_GATE_MIN_RAW = 1_000         # 纯币合理范围（raw）
+OCR_GATE_MAX_RAW = 10_000_000_000
+
+# OCR 批量识别：所有预处理图拼成一批 rec（用满 predictor 的 batch 吞吐）
+OCR_BATCH_VARIANTS = True
+OCR_REC_BATCH_NUM = 16
+OCR_VARIANT_CHUNK = 4             # 整张截图 ROI：预处理图按这个数分批 rec（前一批找到可靠结果就不再算后面的）
+
+# OCR 工作进程池（0 = 不用进程池，在 Gradio 进程里直接识别）
+OCR_POOL_WORKERS = 2
+OCR_POOL_MAX_PENDING = 8          # 排队上限：超过直接提示“繁忙”
+OCR_POOL_JOB_TIMEOUT_SEC = 30     # 单张图识别超时
+
+# OCR 结果缓存（按图片内容 hash）
+OCR_CACHE_DIR = "data/ocr_cache"
+OCR_CACHE_MEM_ITEMS = 256
+
+# 按分辨率学到的纯币位置（命中后下次直接裁小框 rec-only）
+OCR_ROI_STORE_PATH = "data/ocr_roi.json"
+OCR_ROI_PAD = 0.5                 # 外扩比例（相对文字高度；左右再翻倍）
+OCR_ROI_REC_VARIANTS = 3          # 小框只跑前几个预处理（同一批 rec）
+
+# 整张截图：先用连通域找数字串、裁紧后 rec-only（不跑检测模型），没过门槛再 det+rec
+OCR_CC_LOCALIZE = True
+
+# 纯币区域感知哈希（近似重复的截图直接复用确认过的值；索引来自写日志 + tools/ocr_phash_index.py）
+OCR_PHASH_ENABLED = True
+OCR_PHASH_INDEX_PATH = "data/ocr_phash.jsonl"  # 只追加，一行一条；旧版的 data/ocr_phash.json 第一次读时自动转过来
+OCR_PHASH_MAX_DIST = 24           # 找候选：汉明距离上限（共 1024 位）
+OCR_PHASH_MAX_INK_DIFF = 0.03     # 核对：数字串墨迹图的差异上限（差一位数字约 0.06 以上）
+
+# 纯币字形模板匹配（PaddleOCR 前的快速通道）
+OCR_GLYPH_BANK_PATH = "data/ocr_glyphs.npz"
+OCR_GLYPH_MAX_DIST = 0.18         # 和最像模板的平均像素差上限
+OCR_GLYPH_MIN_MARGIN = 0.05       # 第一名和第二名（不同字符）至少拉开这么多
+OCR_GLYPH_MAX_PER_LABEL = 12      # 每个字符最多留几个样本
+
+# OCR 前的图片质量预检（明显没救的图毫秒级拒绝，不跑级联）
+OCR_QC_ENABLED = True
+OCR_QC_MIN_SIDE = 16              # 图片最短边（像素）
+OCR_QC_MIN_CONTRAST = 8.0         # 纯币区域灰度标准差下限（全黑/全白/纯色）
+OCR_QC_MIN_SHARPNESS = 12.0       # 纯币区域 Laplacian 方差下限（糊成一片）
+OCR_QC_MIN_GLYPHS = 2             # 纯币区域至少能切出几个“字”
+
+# 大截图只解码顶部一条（纯币和所有 ROI 都在顶部 20% 以内；仅非隔行 PNG，其余格式照常整张解码）
+OCR_DECODE_BAND = True
+OCR_DECODE_BAND_MIN_PIXELS = 1_000_000
+
+# 顶部货币栏（extract_currencies）：区域比例（y 不要超过 0.22：大图只解码顶部条带）
+# + 从左到右的货币（名字, get_person_money 的 item）
+OCR_CURRENCY_BAND = (0.55, 0.00, 1.00, 0.16)
+OCR_CURRENCY_FIELDS = [
+    ("哈夫币", "17020000010"),
+    ("三角币", "17888808888"),
+    ("三角券", "17888808889"),
+]
+
+# OCR 推理后端：paddle（PaddleOCR）/ onnx（onnxruntime 跑 tools/ocr_export_onnx.py 导出的模型）
+# 换后端前先用 tools/ocr_bench.py --backend onnx --compare <paddle 的结果> 确认准确率一致
+OCR_BACKEND = "paddle"
+OCR_ONNX_DIR = "data/ocr_models"  # <dir>/main/、<dir>/num/：det.onnx、rec.onnx、cls.onnx（可选）、dict.txt
+OCR_ONNX_INT8 = False             # 优先用 det.int8.onnx / rec.int8.onnx（导出时加 --int8）
+OCR_ONNX_THREADS = 0              # onnxruntime 线程数（0 = 按 CPU 线程预算）
+
+# OCR 模型生命周期（ocr_models；每个进程各自计算：进程池里每个子进程都是一份）
+OCR_MODEL_IDLE_SEC = 600          # 空闲这么久就卸载，下次用到（或结算页打开预热）再加载；0 = 常驻
+OCR_MODEL_BUDGET_MB = 0           # 模型内存预算；0 = 不限
+OCR_MODEL_SHARE_REC = False       # 纯数字小图也用通用模型（只加载一套）；打开前先用 ocr_bench 确认准确率
+
+# 本地 OCR 服务（python -m src.services.ocr_server）：模型只在服务进程里加载一份，
+# 几毫秒内到达的请求拼成一批识别；OCR_SERVER_URL 非空时 Gradio 不再建进程池，改走 HTTP
+OCR_SERVER_URL = ""               # 例如 "http://127.0.0.1:7861"
+OCR_SERVER_HOST = "127.0.0.1"
+OCR_SERVER_PORT = 7861
+OCR_SERVER_BATCH_WINDOW_MS = 8    # 第一张图到达后最多再等这么久凑批
+OCR_SERVER_MAX_BATCH = 8
+OCR_SERVER_MAX_QUEUE = 32         # 排队上限：超过返回 503（客户端提示“繁忙”）
+
+# CPU 线程预算（cpu_budget）：Paddle / OpenCV / Gradio 默认各自按核数开线程，并发识别时互相抢核
+# 0 = 自动：总核数 = os.cpu_count()；每个 OCR 进程推理线程 = (总核数 - 留给请求处理的 1 核) / OCR 进程数
+CPU_THREADS_TOTAL = 0
+CPU_THREADS_OCR = 0               # 每个 OCR 进程的推理线程（Paddle cpu_threads / onnxruntime intra-op / OMP）
+CPU_THREADS_CV = 1                # OpenCV 线程（预处理都是小图，多线程反而抢推理的核）
+CPU_THREADS_WEB = 0               # Gradio handler 线程池（大多在等 OCR 结果）；0 = 排队上限 x 2，至少 8
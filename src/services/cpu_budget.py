@@ -0,0 +1,103 @@
+# src/services/cpu_budget.py
+# CPU 线程预算：Paddle 推理线程池、OpenCV、Gradio handler 线程池默认都按核数各开一套，
+# 进程池里 N 个 OCR 进程同时识别时 N x 核数个线程挤在几个核上，反而更慢
+# 这里按 config.CPU_THREADS_* 统一分配：
+# - OCR 推理：加载模型时生效（ocr_backends.create -> apply_ocr：OMP/MKL 环境变量、Paddle cpu_threads、onnxruntime 线程）
+# - OpenCV：每个进程 cv2.setNumThreads
+# - 请求处理：Gradio launch(max_threads=...)，并给它留一个核
+# 启动时 report() 打印实际生效的设置
+import os
+
+import cv2
+
+from src.config import (
+    CPU_THREADS_TOTAL,
+    CPU_THREADS_OCR,
+    CPU_THREADS_CV,
+    CPU_THREADS_WEB,
+    OCR_POOL_WORKERS,
+    OCR_POOL_MAX_PENDING,
+    OCR_SERVER_URL,
+)
+
+# Paddle / numpy 底层线程池看的环境变量（必须在 import paddle 之前设）
+_THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def total_cores() -> int:
+    return CPU_THREADS_TOTAL if CPU_THREADS_TOTAL > 0 else (os.cpu_count() or 1)
+
+
+def ocr_processes() -> int:
+    """同时在跑推理的进程数：进程池的子进程数；用本地 OCR 服务 / 不用进程池时是 1 个"""
+    if OCR_SERVER_URL:
+        return 1
+    return max(1, OCR_POOL_WORKERS)
+
+
+def plan() -> dict:
+    total = total_cores()
+    procs = ocr_processes()
+    # 给请求处理（Gradio 事件循环、查缓存、写日志）留一个核；两核以下就不留了
+    reserved = 1 if total > 2 else 0
+    ocr = CPU_THREADS_OCR if CPU_THREADS_OCR > 0 else max(1, (total - reserved) // procs)
+    cv = CPU_THREADS_CV if CPU_THREADS_CV > 0 else 1
+    web = CPU_THREADS_WEB if CPU_THREADS_WEB > 0 else max(8, OCR_POOL_MAX_PENDING * 2)
+    return {
+        "total": total,
+        "ocr_processes": procs,
+        "ocr_threads": ocr,
+        "cv_threads": cv,
+        "web_threads": web,
+        "reserved_cores": reserved,
+        "oversubscribed": procs * ocr + reserved > total,
+    }
+
+
+def apply_cv(p: dict | None = None) -> int:
+    """当前进程的 OpenCV 线程数"""
+    p = p or plan()
+    try:
+        cv2.setNumThreads(int(p["cv_threads"]))
+    except Exception:
+        pass
+    return p["cv_threads"]
+
+
+def apply_ocr() -> int:
+    """
+    要加载 OCR 模型的进程里调用（ocr_backends.create），返回推理线程数
+    环境变量只在没手动设过时才设（手动 export 的优先）
+    """
+    p = plan()
+    for k in _THREAD_ENV:
+        os.environ.setdefault(k, str(p["ocr_threads"]))
+    apply_cv(p)
+    return p["ocr_threads"]
+
+
+def effective() -> dict:
+    """当前进程实际生效的值（环境变量可能被手动覆盖过）"""
+    try:
+        cv = cv2.getNumThreads()
+    except Exception:
+        cv = None
+    return {"cv2": cv, **{k: os.environ.get(k) for k in _THREAD_ENV}}
+
+
+def report(role: str = "web") -> str:
+    p = plan()
+    eff = effective()
+    lines = [
+        f"🧮 CPU 线程预算（{role}）：共 {p['total']} 核，给请求处理留 {p['reserved_cores']} 核",
+        f"   OCR 推理：{p['ocr_processes']} 个进程 × {p['ocr_threads']} 线程"
+        f"{'（进程池）' if not OCR_SERVER_URL and OCR_POOL_WORKERS > 0 else ''}",
+        f"   OpenCV：{p['cv_threads']} 线程（当前进程实际 {eff['cv2']}）",
+        f"   Gradio handler 线程池：{p['web_threads']}",
+    ]
+    manual = {k: v for k, v in eff.items() if k != "cv2" and v is not None and v != str(p["ocr_threads"])}
+    if manual:
+        lines.append(f"   ⚠️ 手动设置的线程环境变量优先：{manual}")
+    if p["oversubscribed"]:
+        lines.append("   ⚠️ OCR 进程数 × 线程数超过核数，并发识别时会互相抢核（调小 OCR_POOL_WORKERS / CPU_THREADS_OCR）")
+    return "\n".join(lines)
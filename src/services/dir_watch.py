@@ -0,0 +1,147 @@
+# src/services/dir_watch.py
+# 盯一个目录的直接子项增删（日志文件夹列表缓存用）：
+# - Linux：ctypes 调 libc 的 inotify，后台线程阻塞读事件，几乎零开销
+# - 其它平台 / inotify 用不了（fd 上限、容器限制等）：后台线程每 poll_sec 秒 stat 一次目录 mtime
+# 回调 on_events(events)：[(kind, name)]，kind 为
+#   "add"    name 是新建/移入的子目录
+#   "remove" name 被删除/移出
+#   "reset"  说不清变了什么（事件队列溢出、目录本身被删/移走、轮询模式）：调用方整个作废重列
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, List, Tuple
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEAD = struct.Struct("iIII")
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return _libc
+
+
+def _inotify_open(path: str) -> int:
+    """成功返回 fd；inotify 不可用抛 OSError"""
+    libc = _load_libc()
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1")
+    if libc.inotify_add_watch(fd, os.fsencode(path), _WATCH_MASK) < 0:
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, "inotify_add_watch")
+    return fd
+
+
+def _parse_events(buf: bytes) -> Tuple[List[Tuple[str, str]], bool]:
+    """-> (事件列表, 监听是否失效需要重建)"""
+    events, dead = [], False
+    off = 0
+    while off + _EVENT_HEAD.size <= len(buf):
+        _wd, mask, _cookie, nlen = _EVENT_HEAD.unpack_from(buf, off)
+        name = os.fsdecode(buf[off + _EVENT_HEAD.size: off + _EVENT_HEAD.size + nlen].rstrip(b"\0"))
+        off += _EVENT_HEAD.size + nlen
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            dead = True
+            events.append(("reset", ""))
+        elif mask & IN_Q_OVERFLOW:
+            events.append(("reset", ""))
+        elif mask & (IN_CREATE | IN_MOVED_TO):
+            # 普通文件不算日志文件夹
+            if mask & IN_ISDIR:
+                events.append(("add", name))
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            events.append(("remove", name))
+    return events, dead
+
+
+def _dir_mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _poll_loop(path: str, on_events: Callable, poll_sec: float, stop: threading.Event):
+    last = _dir_mtime(path)
+    while not stop.wait(poll_sec):
+        cur = _dir_mtime(path)
+        if cur != last:
+            last = cur
+            on_events([("reset", "")])
+
+
+def _inotify_loop(path: str, on_events: Callable, poll_sec: float, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            fd = _inotify_open(path)
+        except OSError:
+            # 目录暂时不存在（被删了还没重建）：等一会再挂；其它错误直接退回轮询
+            if os.path.isdir(path):
+                _poll_loop(path, on_events, poll_sec, stop)
+                return
+            stop.wait(poll_sec)
+            continue
+        # 重新挂上之前可能漏了事件
+        on_events([("reset", "")])
+        try:
+            while not stop.is_set():
+                r, _, _ = select.select([fd], [], [], 1.0)
+                if not r:
+                    continue
+                events, dead = _parse_events(os.read(fd, 64 * 1024))
+                if events:
+                    on_events(events)
+                if dead:
+                    break
+        except OSError:
+            pass
+        finally:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def watch(path: str, on_events: Callable[[List[Tuple[str, str]]], None], poll_sec: float = 2.0) -> Tuple[str, threading.Event]:
+    """
+    后台线程开始盯 path；返回 (模式 "inotify"/"poll", stop 事件)
+    on_events 在后台线程里调用，自己保证线程安全；里面抛的异常吞掉
+    """
+    def _safe(events):
+        try:
+            on_events(events)
+        except Exception:
+            pass
+
+    stop = threading.Event()
+    mode = "poll"
+    if sys.platform.startswith("linux"):
+        try:
+            os.close(_inotify_open(path))
+            mode = "inotify"
+        except (OSError, AttributeError):
+            mode = "poll"
+    target = _inotify_loop if mode == "inotify" else _poll_loop
+    threading.Thread(target=target, args=(path, _safe, poll_sec, stop), name=f"dir-watch:{path}", daemon=True).start()
+    return mode, stop
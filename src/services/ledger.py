@@ -0,0 +1,123 @@
+# src/services/ledger.py
+# 结构化提交记录（data/ledger.jsonl，只追加，一行一条 json）：
+# log.txt 是给人看的中文文本，统计/分析每次都要正则重新解析；这里在写日志时顺手存一份带类型的记录
+#   {"v", "dir", "ts", "source", "up_raw", "down_raw", "reserve_items": [{"name", "qty", "unit_raw"}],
+#    "reserve_total_raw", "reserve_total_only", "change_raw", "yuan", "prepay_yuan", "settlement_yuan", "remark",
+#    "images": {"up": sha256, "down": sha256}}
+# - 金额都是 raw 整数（和 money_format 一致），元是 float；没有的字段为 None
+# - 预留物品只知道总价（结算页填的是“总计: xxx”、旧日志只写了总价值）时 reserve_items 为 None、reserve_total_only 为 true，
+#   不会出现“明细为空但总价不为 0”的记录；reserve_items 为 [] 只表示确实没有预留物品
+# - source: "app"（确认页写日志时）/ "text"（调用方没给结构化数据，从日志文本解析）/ "backfill"（tools/ledger_backfill.py 补的旧日志）
+# - 文件里的顺序是写入顺序，补进来的旧记录在后面：要按时间看请按 dir 排序
+# - 同一个 dir 写过多次（同一秒提交两次，文件夹被覆盖）以最后一条为准，iter_records 只给这一条
+# - 文本只在写入/补录时解析一次（logs_service.parse_log_record），读的一方直接 iter_records()
+import datetime
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Iterator, List, Set
+
+from src.config import LEDGER_PATH
+
+SCHEMA_VERSION = 1
+
+_LOCK = threading.Lock()
+
+
+def file_sha256(path) -> Optional[str]:
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def make_record(dir_name: str, base_dir, fields: Dict, remark: str = "", source: str = "app") -> Dict:
+    """fields：logs_service.parse_log_record / 确认页给的结构化数据；补上文件夹、时间、备注、截图哈希"""
+    base = Path(base_dir)
+    try:
+        ts = datetime.datetime.strptime(dir_name, "%y-%m-%d_%H-%M-%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        ts = None
+    rec = {"v": SCHEMA_VERSION, "dir": dir_name, "ts": ts, "source": source}
+    for key in ("up_raw", "down_raw", "reserve_items", "reserve_total_raw", "change_raw",
+                "yuan", "prepay_yuan", "settlement_yuan"):
+        rec[key] = fields.get(key)
+    # 明细拿不到、只有总价：明确标成只有总价，别让读的一方以为“没有预留物品”
+    rec["reserve_total_only"] = bool(not rec["reserve_items"] and rec["reserve_total_raw"])
+    if rec["reserve_total_only"]:
+        rec["reserve_items"] = None
+    rec["remark"] = (remark or "").strip()
+    rec["images"] = {slot: file_sha256(base / f"{slot}.png") for slot in ("up", "down")}
+    return rec
+
+
+def _dumps(rec: Dict) -> str:
+    return json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def append_many(records: List[Dict], path: str = LEDGER_PATH) -> int:
+    """
+    追加若干条：一次 O_APPEND write（同时写的其它进程/线程不会插进半行）
+    """
+    if not records:
+        return 0
+    data = "".join(_dumps(r) for r in records).encode("utf-8")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with _LOCK:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                n = os.write(fd, view)
+                view = view[n:]
+        finally:
+            os.close(fd)
+    return len(records)
+
+
+def append(record: Dict, path: str = LEDGER_PATH) -> None:
+    append_many([record], path)
+
+
+def _iter_lines(path: str) -> Iterator[Dict]:
+    """逐行读；坏行（写一半断电等）跳过"""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict):
+                yield rec
+
+
+def iter_records(path: str = LEDGER_PATH) -> Iterator[Dict]:
+    """
+    每个日志文件夹一条：同一秒提交两次会写进同一个文件夹（后一次覆盖前一次），
+    ledger 里就有两行同样的 dir，这里只留后写的那条（和文件夹里的内容一致），统计不会重复算
+    顺序按每个 dir 最后一次写入
+    """
+    latest: Dict = {}
+    for i, rec in enumerate(_iter_lines(path)):
+        key = rec.get("dir") or ("", i)
+        latest.pop(key, None)
+        latest[key] = rec
+    yield from latest.values()
+
+
+def recorded_dirs(path: str = LEDGER_PATH) -> Set[str]:
+    """已经有记录的日志文件夹（补录时跳过）"""
+    return {r["dir"] for r in _iter_lines(path) if r.get("dir")}
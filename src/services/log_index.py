@@ -0,0 +1,308 @@
+# src/services/log_index.py
+# 日志索引（SQLite，WAL 模式，data/log_index.sqlite3）：
+# 首页表格/更多日志/今日总计原来每次都 listdir + 逐个读 log.txt + 正则解析，日志一多就慢
+# 这里每个日志文件夹存一行：文件夹名、时间、解析好的本次变化（w）、上下号纯币、备注、有没有截图
+# - save_submit_log 写完文件后 upsert（一个事务）
+# - LOG_DIR 的 mtime 变了（手动删/拷了日志文件夹）才对一次目录增量同步；否则查询完全不碰磁盘上的日志
+# - 手动改过 log.txt 内容（mtime 不变）：python tools/rebuild_log_index.py 全量重建
+# - 今日/累计赚了多少：totals 表按天 + 全部（day='*'）存条数和合计，logs 表增删改时由触发器增量维护，
+#   查询只读一行，日志再多也一样快；verify_totals() 从磁盘全量重算对账
+import datetime
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict
+
+from src.config import LOG_DIR, LOG_INDEX_DB_PATH
+
+# 表结构有改动时 +1：旧库自动重建
+SCHEMA_VERSION = "2"
+
+# totals 表里“全部日志”那一行的 day
+ALL_DAYS = "*"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    dir       TEXT PRIMARY KEY,   -- 26-02-07_20-20-13（字符串序 = 时间序）
+    ts        TEXT,               -- 2026-02-07 20:20:13；文件夹名不是时间格式的为 NULL
+    day       TEXT,               -- 26-02-07
+    profit_w  REAL,               -- parse_profit_w_from_log_text，解析不到为 NULL
+    up_raw    INTEGER,
+    down_raw  INTEGER,
+    remark    TEXT,
+    has_up    INTEGER NOT NULL DEFAULT 0,
+    has_down  INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_logs_day ON logs(day);
+CREATE TABLE IF NOT EXISTS totals (
+    day       TEXT PRIMARY KEY,   -- 26-02-07；'*' 为全部
+    n         INTEGER NOT NULL DEFAULT 0,
+    profit_w  REAL NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS logs_totals_ins AFTER INSERT ON logs BEGIN
+    INSERT INTO totals(day, n, profit_w) VALUES (COALESCE(NEW.day, ''), 1, COALESCE(NEW.profit_w, 0))
+        ON CONFLICT(day) DO UPDATE SET n = n + 1, profit_w = profit_w + excluded.profit_w;
+    INSERT INTO totals(day, n, profit_w) VALUES ('*', 1, COALESCE(NEW.profit_w, 0))
+        ON CONFLICT(day) DO UPDATE SET n = n + 1, profit_w = profit_w + excluded.profit_w;
+END;
+CREATE TRIGGER IF NOT EXISTS logs_totals_del AFTER DELETE ON logs BEGIN
+    UPDATE totals SET n = n - 1, profit_w = profit_w - COALESCE(OLD.profit_w, 0)
+        WHERE day IN (COALESCE(OLD.day, ''), '*');
+END;
+CREATE TRIGGER IF NOT EXISTS logs_totals_upd AFTER UPDATE OF day, profit_w ON logs BEGIN
+    UPDATE totals SET n = n - 1, profit_w = profit_w - COALESCE(OLD.profit_w, 0)
+        WHERE day IN (COALESCE(OLD.day, ''), '*');
+    INSERT INTO totals(day, n, profit_w) VALUES (COALESCE(NEW.day, ''), 1, COALESCE(NEW.profit_w, 0))
+        ON CONFLICT(day) DO UPDATE SET n = n + 1, profit_w = profit_w + excluded.profit_w;
+    INSERT INTO totals(day, n, profit_w) VALUES ('*', 1, COALESCE(NEW.profit_w, 0))
+        ON CONFLICT(day) DO UPDATE SET n = n + 1, profit_w = profit_w + excluded.profit_w;
+END;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_LOCAL = threading.local()
+# 目录同步只要一个线程做
+_SYNC_LOCK = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """每个线程一个连接（Gradio handler 在线程池里跑）"""
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and getattr(_LOCAL, "path", None) == LOG_INDEX_DB_PATH:
+        return conn
+    Path(LOG_INDEX_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(LOG_INDEX_DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    _LOCAL.conn, _LOCAL.path = conn, LOG_INDEX_DB_PATH
+    return conn
+
+
+def _get_meta(conn, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def _set_meta(conn, key: str, value) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, None if value is None else str(value)))
+
+
+def _dir_mtime(logs_dir: str = LOG_DIR) -> Optional[str]:
+    try:
+        return str(os.stat(logs_dir).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _parse_ts(dir_name: str) -> Optional[str]:
+    try:
+        return datetime.datetime.strptime(dir_name, "%y-%m-%d_%H-%M-%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _row_for_dir(dir_name: str, logs_dir: str = LOG_DIR) -> Dict:
+    from src.services import logs_service
+
+    base = Path(logs_dir) / dir_name
+    try:
+        text = (base / "log.txt").read_text(encoding="utf-8")
+    except Exception:
+        text = ""
+    up_raw, down_raw = logs_service.parse_up_down_raw_from_log_text(text)
+    return {
+        "dir": dir_name,
+        "ts": _parse_ts(dir_name),
+        "day": logs_service.dir_date_prefix(dir_name),
+        "profit_w": logs_service.parse_profit_w_from_log_text(text),
+        "up_raw": up_raw,
+        "down_raw": down_raw,
+        "remark": logs_service.parse_remark_from_log_text(text),
+        "has_up": int((base / "up.png").exists()),
+        "has_down": int((base / "down.png").exists()),
+    }
+
+
+def _upsert(conn, row: Dict) -> None:
+    # 不用 INSERT OR REPLACE：REPLACE 删旧行时不触发 DELETE 触发器，totals 会重复计数
+    conn.execute(
+        "INSERT INTO logs(dir, ts, day, profit_w, up_raw, down_raw, remark, has_up, has_down) "
+        "VALUES (:dir, :ts, :day, :profit_w, :up_raw, :down_raw, :remark, :has_up, :has_down) "
+        "ON CONFLICT(dir) DO UPDATE SET ts = excluded.ts, day = excluded.day, profit_w = excluded.profit_w, "
+        "up_raw = excluded.up_raw, down_raw = excluded.down_raw, remark = excluded.remark, "
+        "has_up = excluded.has_up, has_down = excluded.has_down",
+        row,
+    )
+
+
+def _list_dirs(logs_dir: str) -> List[str]:
+    try:
+        return [d for d in os.listdir(logs_dir) if os.path.isdir(os.path.join(logs_dir, d))]
+    except OSError:
+        return []
+
+
+def rebuild(logs_dir: str = LOG_DIR) -> int:
+    """全量重建：清空后把磁盘上每个日志文件夹重新解析一遍，返回条数"""
+    conn = _connect()
+    dirs = _list_dirs(logs_dir)
+    rows = [_row_for_dir(d, logs_dir) for d in dirs]
+    with _SYNC_LOCK, conn:
+        conn.execute("DELETE FROM logs")
+        conn.execute("DELETE FROM totals")
+        for row in rows:
+            _upsert(conn, row)
+        _set_meta(conn, "schema", SCHEMA_VERSION)
+        _set_meta(conn, "dir_mtime", _dir_mtime(logs_dir))
+        _set_meta(conn, "built_at", datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    return len(rows)
+
+
+def sync(logs_dir: str = LOG_DIR) -> None:
+    """
+    LOG_DIR 的 mtime 和上次同步时一样就什么都不做（一次 stat）
+    否则对比目录和索引：新文件夹解析入库、消失的删掉
+    """
+    conn = _connect()
+    if _get_meta(conn, "schema") != SCHEMA_VERSION:
+        rebuild(logs_dir)
+        return
+    mtime = _dir_mtime(logs_dir)
+    if mtime == _get_meta(conn, "dir_mtime"):
+        return
+    with _SYNC_LOCK:
+        if _dir_mtime(logs_dir) == _get_meta(conn, "dir_mtime"):
+            return
+        on_disk = set(_list_dirs(logs_dir))
+        indexed = {r["dir"] for r in conn.execute("SELECT dir FROM logs")}
+        new_rows = [_row_for_dir(d, logs_dir) for d in sorted(on_disk - indexed)]
+        with conn:
+            for row in new_rows:
+                _upsert(conn, row)
+            conn.executemany("DELETE FROM logs WHERE dir = ?", [(d,) for d in indexed - on_disk])
+            _set_meta(conn, "dir_mtime", mtime)
+
+
+def upsert_dir(dir_name: str, logs_dir: str = LOG_DIR) -> None:
+    """
+    写完一个日志文件夹后调用（save_submit_log）：解析入库，一个事务
+    目录 mtime 不在这里更新：下次查询的 sync 还会 listdir 对一遍（新文件夹已经在库里，不用再解析）
+    """
+    conn = _connect()
+    row = _row_for_dir(dir_name, logs_dir)
+    with _SYNC_LOCK, conn:
+        _upsert(conn, row)
+
+
+# ======================
+# 查询（都会先 sync）
+# ======================
+def count() -> int:
+    """日志条数：读 totals 的 '*' 行（触发器维护），不数表"""
+    sync()
+    row = _connect().execute("SELECT n FROM totals WHERE day = ?", (ALL_DAYS,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def page(offset: int, limit: int) -> List[Dict]:
+    """按时间倒序取第 offset 条起的一页（按页码翻的旧接口；新代码用 page_by_key）"""
+    sync()
+    cur = _connect().execute(
+        "SELECT * FROM logs ORDER BY dir DESC LIMIT ? OFFSET ?", (int(limit), max(0, int(offset)))
+    )
+    return [dict(r) for r in cur]
+
+
+def page_by_key(key: Optional[str], limit: int, older: bool = True, inclusive: bool = False) -> List[Dict]:
+    """
+    按文件夹名（= 时间）翻页，走主键索引，代价只和 limit 有关：
+    older=True：比 key 旧的 limit 条；older=False：比 key 新的 limit 条。结果都按时间倒序
+    key=None 从最新一条开始；inclusive 时包含 key 本身
+    """
+    sync()
+    conn = _connect()
+    if key is None:
+        cur = conn.execute("SELECT * FROM logs ORDER BY dir DESC LIMIT ?", (int(limit),))
+        return [dict(r) for r in cur]
+    if older:
+        op = "<=" if inclusive else "<"
+        cur = conn.execute(f"SELECT * FROM logs WHERE dir {op} ? ORDER BY dir DESC LIMIT ?", (key, int(limit)))
+        return [dict(r) for r in cur]
+    op = ">=" if inclusive else ">"
+    cur = conn.execute(f"SELECT * FROM logs WHERE dir {op} ? ORDER BY dir ASC LIMIT ?", (key, int(limit)))
+    return [dict(r) for r in cur][::-1]
+
+
+def count_after_day(day: str) -> int:
+    """比 day（26-02-07）新的日志条数：按天合计 totals 里的条数，代价和天数有关，和日志条数无关"""
+    sync()
+    row = _connect().execute(
+        "SELECT COALESCE(SUM(n), 0) FROM totals WHERE day > ? AND day != ?", (day, ALL_DAYS)
+    ).fetchone()
+    return int(row[0] or 0)
+
+
+def sum_profit_w(day: Optional[str] = None) -> float:
+    """本次变化合计（w）；day 形如 26-02-07，None 为全部。读 totals 的一行"""
+    sync()
+    row = _connect().execute(
+        "SELECT profit_w FROM totals WHERE day = ?", (ALL_DAYS if day is None else day,)
+    ).fetchone()
+    return float(row[0] or 0.0) if row else 0.0
+
+
+# ======================
+# 对账
+# ======================
+def verify_totals(logs_dir: str = LOG_DIR, fix: bool = False, tol_w: float = 0.01) -> Dict:
+    """
+    从磁盘逐个读 log.txt 重算每天/全部的条数和合计，和 totals 表对比
+    返回 {"ok", "logs", "all": {"stored", "actual"}, "mismatch": [{"day", "stored_n", "actual_n", "stored_w", "actual_w"}]}
+    fix=True 且对不上时全量重建
+    """
+    sync(logs_dir)
+    actual: Dict[str, list] = {}
+    for d in _list_dirs(logs_dir):
+        row = _row_for_dir(d, logs_dir)
+        v = float(row["profit_w"] or 0.0)
+        for key in (row["day"] or "", ALL_DAYS):
+            acc = actual.setdefault(key, [0, 0.0])
+            acc[0] += 1
+            acc[1] += v
+
+    stored = {r["day"]: (int(r["n"]), float(r["profit_w"])) for r in _connect().execute("SELECT * FROM totals")}
+    mismatch = []
+    for day in sorted(set(actual) | set(stored)):
+        a_n, a_w = actual.get(day, (0, 0.0))
+        s_n, s_w = stored.get(day, (0, 0.0))
+        if a_n != s_n or abs(a_w - s_w) > tol_w:
+            mismatch.append({"day": day, "stored_n": s_n, "actual_n": a_n,
+                             "stored_w": round(s_w, 4), "actual_w": round(a_w, 4)})
+
+    res = {
+        "ok": not mismatch,
+        "logs": actual.get(ALL_DAYS, (0, 0.0))[0],
+        "all": {"stored": round(stored.get(ALL_DAYS, (0, 0.0))[1], 4),
+                "actual": round(actual.get(ALL_DAYS, (0, 0.0))[1], 4)},
+        "mismatch": mismatch,
+    }
+    if mismatch and fix:
+        rebuild(logs_dir)
+        res["fixed"] = True
+    return res
+
+
+def index_stats() -> Dict:
+    conn = _connect()
+    return {
+        "rows": int(conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]),
+        "schema": _get_meta(conn, "schema"),
+        "built_at": _get_meta(conn, "built_at"),
+        "path": LOG_INDEX_DB_PATH,
+    }
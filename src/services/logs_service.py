@@ -1,13 +1,30 @@
 # src/services/logs_service.py
 import os
 import re
+import json
 import shutil
+import sqlite3
 import datetime
+import threading
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
 
-from src.config import LOG_DIR, PAGE_SIZE
+from src.config import LOG_DIR, PAGE_SIZE, LOG_WATCH_ENABLED, LOG_WATCH_POLL_SEC
 from src.utils.money_format import parse_money_token, format_money
+from src.services import log_index, dir_watch, ledger
+
+
+# 日志索引出错（库坏了/磁盘满/锁超时）时退回扫 log.txt；只接这两类，代码写错（AttributeError 之类）照常抛出
+_INDEX_ERRORS = (sqlite3.Error, OSError)
+_INDEX_WARNED = set()
+
+
+def _index_failed(where: str, e: Exception):
+    """每种错误只打一次，免得每次刷新都刷屏"""
+    key = (where, type(e).__name__)
+    if key not in _INDEX_WARNED:
+        _INDEX_WARNED.add(key)
+        print(f"⚠️ 日志索引不可用（{where}）：{e!r}，退回逐个读 log.txt")
 
 
 # ======================
@@ -17,14 +34,89 @@ def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-def list_log_dirs() -> List[str]:
-    """返回 logs 目录下的所有日志文件夹名（按时间倒序）"""
-    ensure_dir(LOG_DIR)
+# ======================
+# 日志文件夹列表缓存（进程内）
+# save_submit_log 原地插入；外部改动（手动删/拷文件夹）由 dir_watch 通知：增删原地改，说不清的整个作废
+# ======================
+_DIRS_LOCK = threading.Lock()
+_DIRS_CACHE: Optional[List[str]] = None   # 按时间倒序
+_DIRS_GEN = 0                             # 每次作废 +1：列目录期间被作废的结果不入缓存
+_WATCH = {"mode": None, "dir": None, "stop": None}
+
+
+def _insert_desc(dirs: List[str], name: str):
+    """按倒序插入（新日志一般在最前面）"""
+    if name in dirs:
+        return
+    i = 0
+    while i < len(dirs) and dirs[i] > name:
+        i += 1
+    dirs.insert(i, name)
+
+
+def _on_dir_events(events):
+    global _DIRS_CACHE, _DIRS_GEN
+    with _DIRS_LOCK:
+        for kind, name in events:
+            if kind == "reset" or _DIRS_CACHE is None:
+                _DIRS_CACHE = None
+                _DIRS_GEN += 1
+                return
+            if kind == "add":
+                _insert_desc(_DIRS_CACHE, name)
+            elif kind == "remove" and name in _DIRS_CACHE:
+                _DIRS_CACHE.remove(name)
+
+
+def _ensure_watch():
+    """第一次列目录时开始盯 LOG_DIR；LOG_DIR 换了（测试/工具改模块变量）就重新挂"""
+    global _DIRS_CACHE, _DIRS_GEN
+    if not LOG_WATCH_ENABLED or _WATCH["dir"] == LOG_DIR:
+        return
+    with _DIRS_LOCK:
+        if _WATCH["dir"] == LOG_DIR:
+            return
+        if _WATCH["stop"] is not None:
+            _WATCH["stop"].set()
+        _DIRS_CACHE = None
+        _DIRS_GEN += 1
+        _WATCH["mode"], _WATCH["stop"] = dir_watch.watch(LOG_DIR, _on_dir_events, LOG_WATCH_POLL_SEC)
+        _WATCH["dir"] = LOG_DIR
+
+
+def _scan_log_dirs() -> List[str]:
     dirs = [d for d in os.listdir(LOG_DIR) if os.path.isdir(os.path.join(LOG_DIR, d))]
     dirs.sort(reverse=True)
     return dirs
 
 
+def list_log_dirs() -> List[str]:
+    """返回 logs 目录下的所有日志文件夹名（按时间倒序）；走内存缓存，返回的是副本"""
+    global _DIRS_CACHE
+    ensure_dir(LOG_DIR)
+    if not LOG_WATCH_ENABLED:
+        return _scan_log_dirs()
+    _ensure_watch()
+    with _DIRS_LOCK:
+        if _DIRS_CACHE is not None:
+            return list(_DIRS_CACHE)
+        gen = _DIRS_GEN
+    dirs = _scan_log_dirs()
+    with _DIRS_LOCK:
+        if gen == _DIRS_GEN:
+            _DIRS_CACHE = list(dirs)
+    return dirs
+
+
+def log_dirs_cache_stats() -> Dict:
+    with _DIRS_LOCK:
+        return {
+            "mode": _WATCH["mode"] if LOG_WATCH_ENABLED else "off",
+            "cached": None if _DIRS_CACHE is None else len(_DIRS_CACHE),
+            "invalidations": _DIRS_GEN,
+        }
+
+
 def dir_to_display_time(dir_name: str) -> str:
     """26-02-07_20-20-13 -> 26-02-07 20:20:13"""
     if "_" in dir_name:
@@ -74,6 +166,31 @@ def _parse_change_w(text: str) -> Optional[float]:
         return None
 
 
+# ======================
+# 上号/下号纯币（确认页写进 log.txt 的值，format_money 格式）
+# ======================
+_RE_UP_COIN = re.compile(r"上号纯币(?:\s*[:：])?\s*([^\n]+)")
+_RE_DOWN_COIN = re.compile(r"下号纯币(?:\s*[:：])?\s*([^\n]+)")
+
+
+def _parse_money_line(rx: re.Pattern, text: str) -> Optional[int]:
+    m = rx.search(text or "")
+    if not m:
+        return None
+    token = (m.group(1) or "").strip()
+    if (not token) or token in ("-", "?"):
+        return None
+    try:
+        return int(parse_money_token(token))
+    except Exception:
+        return None
+
+
+def parse_up_down_raw_from_log_text(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """返回 (上号纯币 raw, 下号纯币 raw)；旧格式日志/没识别到的为 None"""
+    return _parse_money_line(_RE_UP_COIN, text), _parse_money_line(_RE_DOWN_COIN, text)
+
+
 # ======================
 # 旧日志兜底：仍按你原来的 k 公式（保持口径不变）
 # ======================
@@ -119,6 +236,99 @@ def parse_profit_w_from_log_text(text: str) -> Optional[float]:
     return float(k) / 10.0
 
 
+# ======================
+# 整条日志解析成结构化字段（提交记录 ledger / 日志索引 / 补录工具共用）
+# ======================
+_RE_RESERVE_TOTAL = re.compile(r"预留物品总价值(?:\s*[:：])?\s*([^\n]+)")
+_RE_RESERVE_TOTAL_LEGACY = re.compile(r"预留物品总价值为(?:\s*[:：])?\s*([0-9]+)\s*k", re.IGNORECASE)
+_RE_YUAN = re.compile(r"本次折合(?:\s*[:：])?\s*(-?[0-9]+(?:\.[0-9]+)?)\s*元")
+_RE_PREPAY = re.compile(r"预付款(?:\s*[:：])?\s*(-?[0-9]+(?:\.[0-9]+)?)\s*元")
+_RE_SETTLEMENT = re.compile(r"结算金额(?:\s*[:：])?\s*(-?[0-9]+(?:\.[0-9]+)?)\s*元")
+# 旧格式：“消耗预付款为：12.3元”就是本次折合；“预留物品为：留声机x1，机甲x2”（没有单价）
+_RE_YUAN_LEGACY = re.compile(r"消耗预付款为(?:\s*[:：])?\s*(-?[0-9]+(?:\.[0-9]+)?)\s*元")
+_RE_RESERVE_ITEMS_LEGACY = re.compile(r"预留物品为(?:\s*[:：])?\s*([^\n]+)")
+# reserve_manager.build_confirm_reserve_line：“预留物品: 名x数量(125w), ... 总计: 4800w”
+_RE_RESERVE_ITEMS = re.compile(r"预留物品\s*[:：]\s*(.+?)\s*总计")
+_RE_ITEM = re.compile(r"^\s*(?P<name>.+?)\s*[xX×*]\s*(?P<qty>[0-9]+)\s*(?:[(（](?P<price>[^)）]+)[)）])?\s*$")
+
+
+def _float_or_none(rx: re.Pattern, text: str) -> Optional[float]:
+    m = rx.search(text or "")
+    if not m:
+        return None
+    try:
+        return float(m.group(1))
+    except ValueError:
+        return None
+
+
+def _parse_reserve_items(text: str) -> Optional[List[Dict]]:
+    m = _RE_RESERVE_ITEMS.search(text or "") or _RE_RESERVE_ITEMS_LEGACY.search(text or "")
+    if not m:
+        return None
+    items = []
+    for part in re.split(r"[,，、]", m.group(1)):
+        mm = _RE_ITEM.match(part)
+        if not mm:
+            continue
+        unit_raw = None
+        if mm.group("price"):
+            try:
+                unit_raw = int(parse_money_token(mm.group("price").strip()))
+            except Exception:
+                unit_raw = None
+        items.append({"name": mm.group("name").strip(), "qty": int(mm.group("qty")), "unit_raw": unit_raw})
+    return items
+
+
+def parse_remark_from_log_text(text: str) -> str:
+    """save_submit_log 写在最后的“备注: xxx”"""
+    for line in reversed((text or "").splitlines()):
+        if line.startswith("备注:") or line.startswith("备注："):
+            return line[3:].strip()
+    return ""
+
+
+def parse_change_raw_from_log_text(text: str) -> Optional[int]:
+    """本次变化（raw）：优先“本次变化”那一行，否则按旧的 k 公式"""
+    change_raw = _parse_money_line(_RE_CHANGE_LINE, text)
+    if change_raw is None:
+        k = _parse_profit_k_legacy(text)
+        change_raw = int(k) * 1000 if k is not None else None
+    return change_raw
+
+
+def parse_log_record(text: str) -> Dict:
+    """
+    从 log.txt 文本解析出记录字段（调用方没给结构化数据时 / 补旧日志）
+    新格式按“上号纯币/下号纯币/预留物品总价值/本次变化/本次折合/预付款/结算金额”；
+    旧格式（已跑纯币/未结算前总纯……）按原来的 k 公式算本次变化
+    预留物品明细：文本里有就解析（旧格式没有单价，unit_raw 为 None），没有为 None
+    """
+    up_raw, down_raw = parse_up_down_raw_from_log_text(text)
+
+    reserve_total_raw = _parse_money_line(_RE_RESERVE_TOTAL, text)
+    if reserve_total_raw is None:
+        m = _RE_RESERVE_TOTAL_LEGACY.search(text or "")
+        reserve_total_raw = int(m.group(1)) * 1000 if m else None
+
+    yuan = _float_or_none(_RE_YUAN, text)
+    if yuan is None:
+        yuan = _float_or_none(_RE_YUAN_LEGACY, text)
+
+    return {
+        "up_raw": up_raw,
+        "down_raw": down_raw,
+        "reserve_items": _parse_reserve_items(text),
+        "reserve_total_raw": reserve_total_raw,
+        "change_raw": parse_change_raw_from_log_text(text),
+        "yuan": yuan,
+        "prepay_yuan": _float_or_none(_RE_PREPAY, text),
+        "settlement_yuan": _float_or_none(_RE_SETTLEMENT, text),
+        "remark": parse_remark_from_log_text(text),
+    }
+
+
 def format_profit_w(profit_w: Optional[float]) -> str:
     """
     首页表格展示：
@@ -139,7 +349,7 @@ def format_profit_w(profit_w: Optional[float]) -> str:
 # ======================
 # 今日/总计统计（w）——对外保留
 # ======================
-def _dir_date_prefix(dir_name: str) -> str:
+def dir_date_prefix(dir_name: str) -> str:
     """26-02-07_20-20-13 -> 26-02-07"""
     if "_" in dir_name:
         return dir_name.split("_", 1)[0]
@@ -147,11 +357,15 @@ def _dir_date_prefix(dir_name: str) -> str:
 
 
 def sum_change_w_today() -> float:
-    """汇总今天所有日志的“本次变化/赚了多少”，单位 w"""
+    """汇总今天所有日志的“本次变化/赚了多少”，单位 w（查日志索引；索引坏了退回逐个读 log.txt）"""
     today_prefix = datetime.datetime.now().strftime("%y-%m-%d")
+    try:
+        return log_index.sum_profit_w(today_prefix)
+    except _INDEX_ERRORS as e:
+        _index_failed("今日合计", e)
     total_w = 0.0
     for d in list_log_dirs():
-        if _dir_date_prefix(d) != today_prefix:
+        if dir_date_prefix(d) != today_prefix:
             continue
         text = read_log_text_from_dir(d)
         v = parse_profit_w_from_log_text(text)
@@ -161,7 +375,11 @@ def sum_change_w_today() -> float:
 
 
 def sum_change_w_all() -> float:
-    """汇总所有日志的“本次变化/赚了多少”，单位 w"""
+    """汇总所有日志的“本次变化/赚了多少”，单位 w（查日志索引；索引坏了退回逐个读 log.txt）"""
+    try:
+        return log_index.sum_profit_w()
+    except _INDEX_ERRORS as e:
+        _index_failed("累计合计", e)
     total_w = 0.0
     for d in list_log_dirs():
         text = read_log_text_from_dir(d)
@@ -190,33 +408,177 @@ def build_log_meta(dirs: List[str]) -> List[Dict]:
     return metas
 
 
+def _meta_from_index_row(r: Dict) -> Dict:
+    return {
+        "dir": r["dir"],
+        "time": dir_to_display_time(r["dir"]),
+        "profit_w": r["profit_w"],
+        "profit_show": format_profit_w(r["profit_w"]),
+    }
+
+
 def make_log_rows_from_meta(metas: List[Dict]):
     return [[m["time"], m["profit_show"]] for m in metas]
 
 
 def make_log_table_meta(limit: int = 20):
-    dirs = list_log_dirs()[:limit]
-    metas = build_log_meta(dirs)
+    try:
+        metas = [_meta_from_index_row(r) for r in log_index.page_by_key(None, limit)]
+    except _INDEX_ERRORS as e:
+        _index_failed("首页表格", e)
+        metas = build_log_meta(list_log_dirs()[:limit])
     rows = make_log_rows_from_meta(metas)
     return rows, metas
 
 
 def make_log_table_page_meta(page: int, page_size: int = PAGE_SIZE):
-    dirs = list_log_dirs()
-    total = len(dirs)
+    try:
+        total = log_index.count()
+    except _INDEX_ERRORS as e:
+        _index_failed("条数", e)
+        total = None
+
+    if total is None:
+        dirs = list_log_dirs()
+        total = len(dirs)
     total_pages = max(1, (total + page_size - 1) // page_size)
 
     page = max(1, min(page, total_pages))
     start = (page - 1) * page_size
     end = start + page_size
-    page_dirs = dirs[start:end]
 
-    metas = build_log_meta(page_dirs)
+    metas = None
+    try:
+        metas = [_meta_from_index_row(r) for r in log_index.page(start, page_size)]
+    except _INDEX_ERRORS as e:
+        _index_failed("分页", e)
+        metas = None
+    if metas is None:
+        metas = build_log_meta(list_log_dirs()[start:end])
     rows = make_log_rows_from_meta(metas)
     info = f"第 {page}/{total_pages} 页，共 {total} 条"
     return rows, metas, info, page
 
 
+# ======================
+# 更多日志：按文件夹名（= 时间）游标翻页
+# 翻页状态 {"first": 本页第一条, "last": 本页最后一条, "offset": 本页前面有几条}
+# 每次只取 page_size 条（索引走主键范围查询；索引坏了在缓存的目录列表上二分），总数读 totals
+# ======================
+# 比任何“26-02-07_时-分-秒”都大的后缀：day + _DAY_END 作为“这一天及更早”的上界
+_DAY_END = "~"
+
+
+def _first_desc(dirs: List[str], key: str, strict: bool) -> int:
+    """倒序列表里第一个 < key（strict）/ <= key 的下标"""
+    lo, hi = 0, len(dirs)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (dirs[mid] < key) if strict else (dirs[mid] <= key):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _metas_by_key(key: Optional[str], limit: int, older: bool = True, inclusive: bool = False) -> List[Dict]:
+    try:
+        return [_meta_from_index_row(r) for r in log_index.page_by_key(key, limit, older, inclusive)]
+    except _INDEX_ERRORS as e:
+        _index_failed("分页", e)
+    dirs = list_log_dirs()
+    if key is None:
+        return build_log_meta(dirs[:limit])
+    if older:
+        i = _first_desc(dirs, key, strict=not inclusive)
+        return build_log_meta(dirs[i:i + limit])
+    j = _first_desc(dirs, key, strict=inclusive)
+    return build_log_meta(dirs[max(0, j - limit):j])
+
+
+def _log_total() -> int:
+    try:
+        return log_index.count()
+    except _INDEX_ERRORS as e:
+        _index_failed("条数", e)
+        return len(list_log_dirs())
+
+
+def _count_after_day(day: str) -> int:
+    try:
+        return log_index.count_after_day(day)
+    except _INDEX_ERRORS as e:
+        _index_failed("跳到日期", e)
+        return _first_desc(list_log_dirs(), day + _DAY_END, strict=True)
+
+
+def parse_jump_date(text: str) -> Optional[str]:
+    """2026-02-07 / 26-02-07 / 2026/2/7 / 20260207 -> 26-02-07；认不出返回 None"""
+    t = (text or "").strip().replace("/", "-").replace(".", "-")
+    for fmt in ("%Y-%m-%d", "%y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.datetime.strptime(t, fmt).strftime("%y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _cursor_result(metas: List[Dict], offset: int, page_size: int, note: str = ""):
+    total = _log_total()
+    total_pages = max(1, (total + page_size - 1) // page_size)
+    page = min(total_pages, offset // page_size + 1)
+    state = {
+        "first": metas[0]["dir"] if metas else None,
+        "last": metas[-1]["dir"] if metas else None,
+        "offset": offset,
+    }
+    info = f"第 {page}/{total_pages} 页，共 {total} 条"
+    if note:
+        info = f"{note}　{info}"
+    return make_log_rows_from_meta(metas), metas, info, state
+
+
+def make_log_table_cursor_meta(state: Optional[Dict] = None, direction: str = "first", page_size: int = PAGE_SIZE):
+    """
+    direction: first（最新一页）/ next（更旧）/ prev（更新）/ reload（原地刷新）
+    返回 (rows, metas, info, state)；翻到头就停在当前页
+    """
+    state = state if isinstance(state, dict) else {}
+    offset = int(state.get("offset") or 0)
+    first, last = state.get("first"), state.get("last")
+
+    if direction == "next" and last:
+        metas = _metas_by_key(last, page_size, older=True)
+        if metas:
+            return _cursor_result(metas, offset + page_size, page_size)
+        direction = "reload"
+    if direction == "prev" and first:
+        metas = _metas_by_key(first, page_size, older=False)
+        # 不够一页说明到顶了：直接回最新一页，保证第一页总是满的
+        if len(metas) == page_size and offset - page_size > 0:
+            return _cursor_result(metas, offset - page_size, page_size)
+        direction = "first"
+    if direction == "reload" and first:
+        metas = _metas_by_key(first, page_size, older=True, inclusive=True)
+        if metas:
+            return _cursor_result(metas, offset, page_size)
+    return _cursor_result(_metas_by_key(None, page_size), 0, page_size)
+
+
+def make_log_table_date_meta(date_text: str, page_size: int = PAGE_SIZE):
+    """跳到某天：这一天最晚的一条开始往旧翻；日期认不出回到最新一页"""
+    day = parse_jump_date(date_text)
+    if day is None:
+        rows, metas, info, state = make_log_table_cursor_meta(None, "first", page_size)
+        return rows, metas, f"⚠️ 日期格式不对（例如 2026-02-07），已回到最新　{info}", state
+    metas = _metas_by_key(day + _DAY_END, page_size, older=True)
+    if not metas:
+        rows, metas, info, state = make_log_table_cursor_meta(None, "first", page_size)
+        return rows, metas, f"⚠️ {day} 及更早没有日志，已回到最新　{info}", state
+    note = "" if metas[0]["dir"].startswith(day) else f"{day} 没有日志，从更早的 {dir_date_prefix(metas[0]['dir'])} 开始"
+    return _cursor_result(metas, _count_after_day(day), page_size, note)
+
+
 # ======================
 # 保存日志（对外保留）
 # ======================
@@ -226,7 +588,16 @@ def save_submit_log(
     log_text: str,
     remark: str = "",
     logs_dir: str = LOG_DIR,
+    ocr_info: Optional[Dict] = None,
+    record: Optional[Dict] = None,
 ) -> str:
+    """
+    ocr_info: {"up": detail, "down": detail}（ocr_service.extract_pure_coin_detail 的结果）
+              可选 "currencies": {"up": ..., "down": ...}（ocr_service.extract_currencies 的结果，全部货币余额）
+              有截图时写成 ocr.json 放在 log.txt 旁边（识别路径/各阶段耗时，排查慢图用）
+    record:   确认页算好的结构化字段（up_raw/down_raw/reserve_items/reserve_total_raw/change_raw/yuan/prepay_yuan/settlement_yuan），
+              追加到提交记录 ledger；不给就从 log_text 解析
+    """
     base = Path(logs_dir)
     base.mkdir(parents=True, exist_ok=True)
 
@@ -243,4 +614,28 @@ def save_submit_log(
     final_log += f"\n备注: {remark.strip()}\n"
     (out_dir / "log.txt").write_text(final_log, encoding="utf-8")
 
+    if ocr_info and (up_img_path or down_img_path):
+        (out_dir / "ocr.json").write_text(
+            json.dumps(ocr_info, ensure_ascii=False, indent=2, default=str),
+            encoding="utf-8",
+        )
+
+    # 目录缓存 / 提交记录（ledger）/ 日志索引（首页表格/统计查它）：失败都不影响日志本身，索引下次查询会按目录补上
+    if os.path.abspath(logs_dir) == os.path.abspath(LOG_DIR):
+        with _DIRS_LOCK:
+            if _DIRS_CACHE is not None:
+                _insert_desc(_DIRS_CACHE, folder_name)
+        try:
+            if record is not None:
+                rec = ledger.make_record(folder_name, out_dir, record, remark, source="app")
+            else:
+                rec = ledger.make_record(folder_name, out_dir, parse_log_record(final_log), remark, source="text")
+            ledger.append(rec)
+        except Exception:
+            pass
+        try:
+            log_index.upsert_dir(folder_name, logs_dir)
+        except _INDEX_ERRORS as e:
+            _index_failed("写入", e)
+
     return str(out_dir)
@@ -0,0 +1,335 @@
+# src/services/ocr_backends.py
+# OCR 推理后端（get_ocr / get_ocr_num 背后真正干活的对象），由 config.OCR_BACKEND 选择：
+# - paddle：原来的 PaddleOCR（用到时才 import，Paddle 的 FLAGS_* 环境变量也在这里设）
+# - onnx：onnxruntime 跑本地导出的 det/rec(/cls) 模型（tools/ocr_export_onnx.py 导出，可选 int8）
+#
+# 两个后端接口一样：.ocr(img, det=True, rec=True, cls=True)，返回格式和 PaddleOCR 2.7 一致
+#   det+rec：[[[box, (text, score)], ...]]     det-only：[[box, ...]]
+#   rec-only：单张图 [[(text, score)]]；[[img, img, ...]]（一批）-> [[(text, score), ...]]
+import math
+import os
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import (
+    OCR_BACKEND,
+    OCR_REC_BATCH_NUM,
+    OCR_ONNX_DIR,
+    OCR_ONNX_INT8,
+    OCR_ONNX_THREADS,
+)
+from src.services import cpu_budget
+
+# 两套模型的参数（和原来 get_ocr / get_ocr_num 里的 PaddleOCR 参数一致）
+PROFILES = {
+    "main": {"lang": "ch", "use_angle_cls": True, "drop_score": 0.2},
+    "num": {"lang": "en", "use_angle_cls": False, "drop_score": 0.01},
+}
+
+# Paddle 2.6 新执行器/PIR 和 PaddleOCR 2.7 的推理模型不兼容；mkldnn 在部分 CPU 上会崩
+_PADDLE_FLAGS = {
+    "FLAGS_enable_pir_api": "0",
+    "FLAGS_use_pir_api": "0",
+    "FLAGS_new_executor": "0",
+    "FLAGS_use_mkldnn": "0",
+}
+
+
+def create(profile: str, backend: str = OCR_BACKEND):
+    """按 profile（main / num）创建后端对象；推理线程数按 cpu_budget 分配"""
+    p = PROFILES[profile]
+    threads = cpu_budget.apply_ocr()
+    if backend == "onnx":
+        return OnnxBackend(
+            model_dir=str(Path(OCR_ONNX_DIR) / profile),
+            drop_score=p["drop_score"],
+            use_angle_cls=p["use_angle_cls"],
+            rec_batch_num=OCR_REC_BATCH_NUM,
+            int8=OCR_ONNX_INT8,
+            threads=OCR_ONNX_THREADS or threads,
+        )
+    return create_paddle(profile, threads)
+
+
+def create_paddle(profile: str, cpu_threads: int = 0):
+    for k, v in _PADDLE_FLAGS.items():
+        os.environ.setdefault(k, v)
+    from paddleocr import PaddleOCR
+
+    p = PROFILES[profile]
+    return PaddleOCR(
+        use_angle_cls=p["use_angle_cls"],
+        lang=p["lang"],
+        ocr_version="PP-OCRv3",
+        show_log=False,
+        drop_score=p["drop_score"],
+        rec_batch_num=OCR_REC_BATCH_NUM,
+        cpu_threads=cpu_threads or cpu_budget.plan()["ocr_threads"],
+    )
+
+
+# ======================
+# ONNX Runtime
+# ======================
+# DB 检测后处理参数（PaddleOCR 默认值）
+_DET_LIMIT_SIDE = 960
+_DET_THRESH = 0.3
+_DET_BOX_THRESH = 0.6
+_DET_UNCLIP = 1.5
+_DET_MAX_CANDIDATES = 1000
+_DET_MIN_SIZE = 3
+_DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+_REC_SHAPE = (3, 48, 320)
+_CLS_SHAPE = (3, 48, 192)
+_CLS_THRESH = 0.9
+
+
+def _model_path(model_dir: str, name: str, int8: bool) -> Optional[Path]:
+    """int8 优先用 <name>.int8.onnx（没有就退回 fp32）"""
+    d = Path(model_dir)
+    if int8 and (d / f"{name}.int8.onnx").exists():
+        return d / f"{name}.int8.onnx"
+    if (d / f"{name}.onnx").exists():
+        return d / f"{name}.onnx"
+    return None
+
+
+class OnnxBackend:
+    def __init__(self, model_dir: str, drop_score: float, use_angle_cls: bool,
+                 rec_batch_num: int, int8: bool = False, threads: int = 0):
+        import onnxruntime as ort
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            so.intra_op_num_threads = threads
+            so.inter_op_num_threads = 1
+
+        def _sess(name: str, required: bool):
+            path = _model_path(model_dir, name, int8)
+            if path is None:
+                if required:
+                    raise FileNotFoundError(f"ONNX 模型不存在：{model_dir}/{name}.onnx（先跑 tools/ocr_export_onnx.py）")
+                return None
+            return ort.InferenceSession(str(path), sess_options=so, providers=["CPUExecutionProvider"])
+
+        self.drop_score = drop_score
+        self.rec_batch_num = max(1, rec_batch_num)
+        self._det = _sess("det", True)
+        self._rec = _sess("rec", True)
+        self._cls = _sess("cls", False) if use_angle_cls else None
+
+        dict_path = Path(model_dir) / "dict.txt"
+        lines = dict_path.read_text(encoding="utf-8").splitlines()
+        # 和 PaddleOCR CTCLabelDecode 一样：0 是 blank，use_space_char=True 末尾补空格
+        self._chars = ["blank"] + [ln.rstrip("\r\n") for ln in lines] + [" "]
+
+        # rec 输入高度固定（48），宽度可能是动态的
+        shape = self._rec.get_inputs()[0].shape
+        self._rec_h = shape[2] if isinstance(shape[2], int) else _REC_SHAPE[1]
+        self._rec_fixed_w = shape[3] if isinstance(shape[3], int) else None
+
+    # ---------- 对外接口 ----------
+    def ocr(self, img, det: bool = True, rec: bool = True, cls: bool = True):
+        if isinstance(img, list):
+            imgs = img[0] if img and isinstance(img[0], list) else img
+            imgs = [_ensure_bgr(im) for im in imgs]
+            if cls and self._cls is not None:
+                imgs = self._classify(imgs)
+            return [self._recognize(imgs)]
+
+        img = _ensure_bgr(img)
+        if not det:
+            crops = [img]
+            if cls and self._cls is not None:
+                crops = self._classify(crops)
+            return [self._recognize(crops)]
+
+        boxes = self._detect(img)
+        if not rec:
+            return [[b.tolist() for b in boxes]]
+
+        crops = [_crop_quad(img, b) for b in boxes]
+        if cls and self._cls is not None:
+            crops = self._classify(crops)
+        recs = self._recognize(crops)
+        return [[
+            [b.tolist(), (text, score)]
+            for b, (text, score) in zip(boxes, recs)
+            if score >= self.drop_score
+        ]]
+
+    # ---------- 检测（DB） ----------
+    def _detect(self, img) -> List[np.ndarray]:
+        h, w = img.shape[:2]
+        ratio = min(1.0, float(_DET_LIMIT_SIDE) / max(h, w))
+        rh = max(32, int(round(h * ratio / 32)) * 32)
+        rw = max(32, int(round(w * ratio / 32)) * 32)
+
+        x = cv2.resize(img, (rw, rh)).astype(np.float32) / 255.0
+        x = (x - _DET_MEAN) / _DET_STD
+        x = x.transpose(2, 0, 1)[None]
+
+        name = self._det.get_inputs()[0].name
+        prob = self._det.run(None, {name: x})[0][0, 0]
+        boxes = _db_boxes(prob, w / float(rw), h / float(rh), w, h)
+        # 从上到下、从左到右（和 PaddleOCR sorted_boxes 一致）
+        boxes.sort(key=lambda b: (b[0][1], b[0][0]))
+        return boxes
+
+    # ---------- 方向分类 ----------
+    def _classify(self, imgs):
+        if not imgs:
+            return imgs
+        c, ch, cw = _CLS_SHAPE
+        out = list(imgs)
+        name = self._cls.get_inputs()[0].name
+        for start in range(0, len(imgs), self.rec_batch_num):
+            idxs = list(range(start, min(len(imgs), start + self.rec_batch_num)))
+            batch = np.stack([_rec_norm(imgs[i], ch, cw) for i in idxs])
+            probs = self._cls.run(None, {name: batch})[0]
+            for k, i in enumerate(idxs):
+                if int(np.argmax(probs[k])) == 1 and float(np.max(probs[k])) > _CLS_THRESH:
+                    out[i] = cv2.rotate(imgs[i], cv2.ROTATE_180)
+        return out
+
+    # ---------- 识别（CTC） ----------
+    def _recognize(self, imgs) -> List[Tuple[str, float]]:
+        n = len(imgs)
+        res: List[Tuple[str, float]] = [("", 0.0)] * n
+        if not n:
+            return res
+
+        # 按宽高比排序后分批（同一批 padding 少）
+        ratios = [im.shape[1] / float(max(1, im.shape[0])) for im in imgs]
+        order = np.argsort(ratios)
+        name = self._rec.get_inputs()[0].name
+        ih = self._rec_h
+        for start in range(0, n, self.rec_batch_num):
+            idxs = order[start:start + self.rec_batch_num]
+            if self._rec_fixed_w:
+                iw = self._rec_fixed_w
+            else:
+                max_ratio = max(_REC_SHAPE[2] / float(_REC_SHAPE[1]), max(ratios[i] for i in idxs))
+                iw = int(math.ceil(ih * max_ratio))
+            batch = np.stack([_rec_norm(imgs[i], ih, iw) for i in idxs])
+            preds = self._rec.run(None, {name: batch})[0]
+            for k, i in enumerate(idxs):
+                res[i] = _ctc_decode(preds[k], self._chars)
+        return res
+
+
+def _ensure_bgr(img):
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+
+def _rec_norm(img, ih: int, iw: int) -> np.ndarray:
+    """等比缩放到高 ih、宽不超过 iw，归一化到 [-1, 1]，右侧补 0"""
+    h, w = img.shape[:2]
+    rw = min(iw, max(1, int(math.ceil(ih * w / float(max(1, h))))))
+    x = cv2.resize(img, (rw, ih)).astype(np.float32) / 255.0
+    x = (x - 0.5) / 0.5
+    out = np.zeros((3, ih, iw), dtype=np.float32)
+    out[:, :, :rw] = x.transpose(2, 0, 1)
+    return out
+
+
+def _ctc_decode(pred: np.ndarray, chars: List[str]) -> Tuple[str, float]:
+    """pred: (T, C) 概率；去重复 + 去 blank，置信度取保留字符概率的平均值"""
+    idx = pred.argmax(axis=1)
+    prob = pred.max(axis=1)
+    keep = idx != 0
+    keep[1:] &= idx[1:] != idx[:-1]
+    text = "".join(chars[i] for i in idx[keep] if i < len(chars))
+    score = float(prob[keep].mean()) if keep.any() else 0.0
+    return text, score
+
+
+def _mini_box(contour):
+    """最小外接矩形的四个点（左上/右上/右下/左下）+ 短边长"""
+    rect = cv2.minAreaRect(contour)
+    pts = sorted(cv2.boxPoints(rect).tolist(), key=lambda p: p[0])
+    left = sorted(pts[:2], key=lambda p: p[1])
+    right = sorted(pts[2:], key=lambda p: p[1])
+    box = np.array([left[0], right[0], right[1], left[1]], dtype=np.float32)
+    return box, min(rect[1])
+
+
+def _box_score(prob: np.ndarray, box: np.ndarray) -> float:
+    h, w = prob.shape
+    xmin = int(np.clip(np.floor(box[:, 0].min()), 0, w - 1))
+    xmax = int(np.clip(np.ceil(box[:, 0].max()), 0, w - 1))
+    ymin = int(np.clip(np.floor(box[:, 1].min()), 0, h - 1))
+    ymax = int(np.clip(np.ceil(box[:, 1].max()), 0, h - 1))
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+    pts = box.copy()
+    pts[:, 0] -= xmin
+    pts[:, 1] -= ymin
+    cv2.fillPoly(mask, [pts.astype(np.int32)], 1)
+    return float(cv2.mean(prob[ymin:ymax + 1, xmin:xmax + 1], mask)[0])
+
+
+def _unclip(box: np.ndarray, ratio: float) -> np.ndarray:
+    """按 面积*ratio/周长 往外扩（pyclipper 可用就用它，和 PaddleOCR 一致；否则按矩形扩）"""
+    area = cv2.contourArea(box)
+    length = cv2.arcLength(box, True)
+    if length <= 0:
+        return box
+    distance = area * ratio / length
+    try:
+        import pyclipper
+
+        off = pyclipper.PyclipperOffset()
+        off.AddPath([tuple(p) for p in box.tolist()], pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+        paths = off.Execute(distance)
+        if paths:
+            return np.array(paths[0], dtype=np.float32)
+    except ImportError:
+        pass
+    (cx, cy), (rw, rh), ang = cv2.minAreaRect(box)
+    return cv2.boxPoints(((cx, cy), (rw + 2 * distance, rh + 2 * distance), ang)).astype(np.float32)
+
+
+def _db_boxes(prob: np.ndarray, sx: float, sy: float, w: int, h: int) -> List[np.ndarray]:
+    bitmap = (prob > _DET_THRESH).astype(np.uint8) * 255
+    contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours[:_DET_MAX_CANDIDATES]:
+        box, sside = _mini_box(contour)
+        if sside < _DET_MIN_SIZE:
+            continue
+        if _box_score(prob, box) < _DET_BOX_THRESH:
+            continue
+        box, sside = _mini_box(_unclip(box, _DET_UNCLIP).reshape(-1, 1, 2))
+        if sside < _DET_MIN_SIZE + 2:
+            continue
+        box[:, 0] = np.clip(np.round(box[:, 0] * sx), 0, w)
+        box[:, 1] = np.clip(np.round(box[:, 1] * sy), 0, h)
+        if box[:, 0].max() - box[:, 0].min() <= 3 or box[:, 1].max() - box[:, 1].min() <= 3:
+            continue
+        boxes.append(box)
+    return boxes
+
+
+def _crop_quad(img, box: np.ndarray):
+    """透视变换把文字框拉正（竖着的转 90°），和 PaddleOCR get_rotate_crop_image 一致"""
+    pts = box.astype(np.float32)
+    cw = int(max(np.linalg.norm(pts[0] - pts[1]), np.linalg.norm(pts[2] - pts[3])))
+    ch = int(max(np.linalg.norm(pts[0] - pts[3]), np.linalg.norm(pts[1] - pts[2])))
+    cw, ch = max(1, cw), max(1, ch)
+    dst = np.array([[0, 0], [cw, 0], [cw, ch], [0, ch]], dtype=np.float32)
+    m = cv2.getPerspectiveTransform(pts, dst)
+    crop = cv2.warpPerspective(img, m, (cw, ch), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if ch / float(cw) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
@@ -0,0 +1,94 @@
+# src/services/ocr_cache.py
+# OCR 结果缓存（按内容寻址）：
+# - key = sha256(图片字节) + OCR 流水线版本（版本一变旧结果自动失效）
+# - 内存 LRU + data/ocr_cache/<version>/<sha>.json 落盘（重启后还在；进程池子进程共享磁盘这一层）
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from src.config import OCR_CACHE_DIR, OCR_CACHE_MEM_ITEMS
+
+_LOCK = threading.Lock()
+_MEM: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+_STATS = {
+    "mem_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "stores": 0,
+}
+
+
+def make_key(data: bytes, version: str) -> str:
+    return f"{version}/{hashlib.sha256(data).hexdigest()}"
+
+
+def _disk_path(key: str) -> Path:
+    version, digest = key.split("/", 1)
+    return Path(OCR_CACHE_DIR) / version / f"{digest}.json"
+
+
+def _mem_put(key: str, value: Dict[str, Any]):
+    with _LOCK:
+        _MEM[key] = value
+        _MEM.move_to_end(key)
+        while len(_MEM) > max(1, OCR_CACHE_MEM_ITEMS):
+            _MEM.popitem(last=False)
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """命中返回结果（副本，带 cached=mem/disk），未命中返回 None"""
+    with _LOCK:
+        v = _MEM.get(key)
+        if v is not None:
+            _MEM.move_to_end(key)
+            _STATS["mem_hits"] += 1
+            return dict(v, cached="mem")
+
+    path = _disk_path(key)
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        obj = None
+
+    if not isinstance(obj, dict):
+        with _LOCK:
+            _STATS["misses"] += 1
+        return None
+
+    _mem_put(key, obj)
+    with _LOCK:
+        _STATS["disk_hits"] += 1
+    return dict(obj, cached="disk")
+
+
+def put(key: str, value: Dict[str, Any], persist: bool = True) -> None:
+    value = {k: v for k, v in value.items() if k != "cached"}
+    _mem_put(key, value)
+    with _LOCK:
+        _STATS["stores"] += 1
+    if not persist:
+        return
+
+    path = _disk_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再 replace：多个子进程同时写同一张图也不会读到半截 json
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        st = dict(_STATS)
+        st["mem_items"] = len(_MEM)
+    lookups = st["mem_hits"] + st["disk_hits"] + st["misses"]
+    st["hit_rate"] = round((st["mem_hits"] + st["disk_hits"]) / lookups, 3) if lookups else 0.0
+    return st
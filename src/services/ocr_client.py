@@ -0,0 +1,86 @@
+# src/services/ocr_client.py
+# 本地 OCR 服务（ocr_server）的客户端：OCR_SERVER_URL 非空时 ocr_pool 改走这里
+# - 先查本进程的内容缓存，命中就不发请求
+# - 503 -> busy，超时 -> timeout，连不上/其它错误 -> crash（和进程池的错误结构一致，UI 不用区分）
+import json
+import socket
+import urllib.error
+import urllib.request
+
+from src.config import OCR_SERVER_URL, OCR_POOL_JOB_TIMEOUT_SEC
+from src.services import ocr_service, ocr_cache
+
+
+def _url(endpoint: str) -> str:
+    return OCR_SERVER_URL.rstrip("/") + endpoint
+
+
+def _post(endpoint: str, path: str, timeout: float, cache_version: str, new_result) -> dict:
+    key, hit = ocr_service.cache_lookup(path, cache_version)
+    if hit is not None:
+        return hit
+    if key is None:
+        return new_result()
+
+    try:
+        with open(ocr_service.resolve_image_path(path), "rb") as f:
+            data = f.read()
+    except Exception:
+        return new_result()
+
+    req = urllib.request.Request(
+        _url(endpoint),
+        data=data,
+        method="POST",
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            res = json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        return new_result(error={503: "busy", 504: "timeout"}.get(e.code, "crash"))
+    except (socket.timeout, TimeoutError):
+        return new_result(error="timeout")
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, (socket.timeout, TimeoutError)):
+            return new_result(error="timeout")
+        return new_result(error="crash")
+    except Exception:
+        return new_result(error="crash")
+    if not isinstance(res, dict):
+        return new_result(error="crash")
+
+    # 服务端已经落盘，这里只补本进程的内存 LRU
+    if ocr_service.is_cacheable(res):
+        ocr_cache.put(key, res, persist=False)
+    return res
+
+
+def extract(path: str, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC) -> dict:
+    """纯币识别（服务端 POST /extract）"""
+    return _post("/extract", path, timeout, ocr_service.OCR_PIPELINE_VERSION, ocr_service.new_ocr_detail)
+
+
+def currencies(path: str, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC) -> dict:
+    """顶部货币栏识别（服务端 POST /currencies）"""
+    return _post("/currencies", path, timeout, ocr_service.CURRENCY_CACHE_VERSION,
+                 ocr_service.new_currencies_result)
+
+
+def prewarm(timeout: float = 2.0) -> bool:
+    """让服务端后台加载模型（POST /warm）"""
+    req = urllib.request.Request(_url("/warm"), data=b"", method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout):
+            return True
+    except Exception:
+        return False
+
+
+def metrics(timeout: float = 2.0) -> dict:
+    """服务端 /metrics；连不上返回 {}"""
+    try:
+        with urllib.request.urlopen(_url("/metrics"), timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except Exception:
+        return {}
@@ -0,0 +1,279 @@
+# src/services/ocr_glyphs.py
+# 纯 OpenCV/NumPy 的数字字形模板匹配（PaddleOCR 之前的快速通道）：
+# - 纯币永远是同一种游戏字体：数字 + 逗号 + 结尾 K
+# - 连通域切字 -> 每个字归一化成固定大小的二值图 -> 和模板库逐个比
+# - 模板库来自用户确认过的截图（harvest），存 data/ocr_glyphs.npz
+# - 任何一个字“拿不准”（距离太大 / 第一第二名太接近）就整串放弃，交给 PaddleOCR
+# - 模板库没收齐 0-9 和 K 之前不启用：缺模板的字会被认成“最像的现有字符”，而且没有第二名可比，置信度照样很高
+import os
+import threading
+from typing import Optional, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import (
+    OCR_GLYPH_BANK_PATH,
+    OCR_GLYPH_MAX_DIST,
+    OCR_GLYPH_MIN_MARGIN,
+    OCR_GLYPH_MAX_PER_LABEL,
+)
+
+# 归一化后的字形尺寸（高 x 宽）
+_GLYPH_H = 24
+_GLYPH_W = 24
+
+# 每个都至少有一个模板才启用快速通道
+REQUIRED_LABELS = "0123456789K"
+
+_LOCK = threading.Lock()
+_BANK = {"labels": [], "glyphs": None, "mtime": None}
+
+
+# ======================
+# 切字
+# ======================
+def _binarize(crop_bgr: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2GRAY) if crop_bgr.ndim == 3 else crop_bgr
+    _, thr = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # 亮字暗底：字是少数像素；前景占一大半说明极性反了
+    if cv2.countNonZero(thr) > thr.size // 2:
+        thr = cv2.bitwise_not(thr)
+    return thr
+
+
+def _normalize(mask: np.ndarray) -> np.ndarray:
+    """保持宽高比缩放到 _GLYPH_H 高，居中放进固定画布（1 这种窄字不会被拉宽）"""
+    h, w = mask.shape[:2]
+    scale = _GLYPH_H / float(h)
+    nw = max(1, min(_GLYPH_W, int(round(w * scale))))
+    small = cv2.resize(mask, (nw, _GLYPH_H), interpolation=cv2.INTER_AREA)
+    canvas = np.zeros((_GLYPH_H, _GLYPH_W), dtype=np.float32)
+    x0 = (_GLYPH_W - nw) // 2
+    canvas[:, x0:x0 + nw] = small.astype(np.float32) / 255.0
+    return canvas
+
+
+def segment_glyphs(crop_bgr: np.ndarray) -> List[Tuple[str, Optional[np.ndarray]]]:
+    """
+    返回从左到右的字：[(kind, glyph)]
+      kind="glyph"：正常高度的字（数字/K），glyph 为归一化二值图
+      kind=","：矮小且贴底的块（逗号，按几何判断，不需要模板）
+      kind="edge"：贴着左右边缘、高度和字一样的块（glyph 为 None）：
+        可能是被裁掉一半的字，也可能是半个图标，分不清；recognize 见到就放弃
+    其它贴边的块（被裁到一半的图标等）和高度明显不对的块会被丢掉
+    """
+    if crop_bgr is None or crop_bgr.size == 0:
+        return []
+
+    thr = _binarize(crop_bgr)
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(thr, connectivity=8)
+    ch, cw = thr.shape[:2]
+
+    comps, edges = [], []
+    for i in range(1, n):
+        x, y, w, h, area = (int(v) for v in stats[i])
+        if area < 4 or h < 3:
+            continue
+        if x <= 0 or x + w >= cw:
+            edges.append((x, y, w, h, i))
+            continue
+        comps.append((x, y, w, h, i))
+    if not comps:
+        return []
+
+    max_h = max(h for (_x, _y, _w, h, _i) in comps)
+    text_h = float(np.median([h for (_x, _y, _w, h, _i) in comps if h >= 0.6 * max_h]))
+    baseline = float(np.median([y + h for (_x, y, _w, h, _i) in comps if h >= 0.7 * text_h]))
+
+    out = []
+    for (x, y, w, h, i) in sorted(comps + edges, key=lambda c: c[0]):
+        if x <= 0 or x + w >= cw:
+            if 0.7 * text_h <= h <= 1.3 * text_h:
+                out.append(("edge", None))
+        elif 0.7 * text_h <= h <= 1.3 * text_h:
+            mask = (labels[y:y + h, x:x + w] == i).astype(np.uint8) * 255
+            out.append(("glyph", _normalize(mask)))
+        elif h < 0.5 * text_h and abs((y + h) - baseline) <= 0.35 * text_h:
+            out.append((",", None))
+    return out
+
+
+def find_text_runs(crop_bgr: np.ndarray, min_glyphs: int = 3) -> List[Tuple[int, int, int, int]]:
+    """
+    连通域定位“一串字”（不跑检测模型）：高度相近、基本同一行、间距不超过字高的块连成一串
+    逗号这类矮块只能挂在串里，不能单独起串；少于 min_glyphs 个正常字的串丢掉
+    返回从左到右的 [(x1, y1, x2, y2)]（crop 内像素坐标）
+    """
+    if crop_bgr is None or crop_bgr.size == 0:
+        return []
+
+    thr = _binarize(crop_bgr)
+    n, _labels, stats, _ = cv2.connectedComponentsWithStats(thr, connectivity=8)
+    ch, cw = thr.shape[:2]
+
+    comps = []
+    for i in range(1, n):
+        x, y, w, h, area = (int(v) for v in stats[i])
+        if area < 4 or h < 2 or h > 0.8 * ch or w > 2 * max(h, 6):
+            continue
+        if x <= 0 or x + w >= cw:
+            continue
+        comps.append((x, y, w, h))
+    comps.sort(key=lambda c: c[0])
+
+    runs = []
+    used = [False] * len(comps)
+    for i, (x, y, w, h) in enumerate(comps):
+        if used[i] or h < 6:
+            continue
+        text_h = float(h)
+        rx1, ry1, rx2, ry2 = x, y, x + w, y + h
+        glyphs = 1
+        used[i] = True
+        for j in range(i + 1, len(comps)):
+            if used[j]:
+                continue
+            x2_, y2_, w2_, h2_ = comps[j]
+            if x2_ - rx2 > 0.8 * text_h:
+                break
+            same_line = abs((y2_ + h2_) - ry2) <= 0.35 * text_h
+            if 0.7 * text_h <= h2_ <= 1.4 * text_h and abs((y2_ + h2_ / 2) - (ry1 + ry2) / 2) <= 0.5 * text_h:
+                glyphs += 1
+            elif not (h2_ < 0.5 * text_h and same_line):
+                continue
+            used[j] = True
+            rx1, ry1 = min(rx1, x2_), min(ry1, y2_)
+            rx2, ry2 = max(rx2, x2_ + w2_), max(ry2, y2_ + h2_)
+        if glyphs >= min_glyphs:
+            runs.append((rx1, ry1, rx2, ry2))
+    return runs
+
+
+# ======================
+# 模板库
+# ======================
+def _load_bank_locked():
+    """文件有变化（别的进程 harvest 过）就重读"""
+    try:
+        mtime = os.path.getmtime(OCR_GLYPH_BANK_PATH)
+    except OSError:
+        return
+    if _BANK["mtime"] == mtime:
+        return
+    try:
+        with np.load(OCR_GLYPH_BANK_PATH, allow_pickle=False) as z:
+            _BANK["labels"] = [str(x) for x in z["labels"]]
+            _BANK["glyphs"] = z["glyphs"].astype(np.float32)
+        _BANK["mtime"] = mtime
+    except Exception:
+        pass
+
+
+def _save_bank_locked():
+    path = OCR_GLYPH_BANK_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, labels=np.array(_BANK["labels"]), glyphs=_BANK["glyphs"])
+    os.replace(tmp, path)
+    _BANK["mtime"] = os.path.getmtime(path)
+
+
+def harvest(crop_bgr: np.ndarray, text: str) -> int:
+    """
+    用已确认的文本给模板库加样本：切出来的字数必须和文本（去掉逗号）一一对上才收
+    每个字符最多留 OCR_GLYPH_MAX_PER_LABEL 个样本（新的挤掉旧的）
+    返回收录的字数
+    """
+    chars = [c for c in (text or "").upper() if c not in ", "]
+    parts = segment_glyphs(crop_bgr)
+    glyphs = [g for (kind, g) in parts if kind == "glyph"]
+    if not chars or len(chars) != len(glyphs) or any(kind == "edge" for (kind, _g) in parts):
+        return 0
+
+    with _LOCK:
+        _load_bank_locked()
+        labels = list(_BANK["labels"])
+        bank = list(_BANK["glyphs"]) if _BANK["glyphs"] is not None else []
+
+        for c, g in zip(chars, glyphs):
+            labels.append(c)
+            bank.append(g)
+
+        # 每个字符只保留最新的 N 个
+        keep, seen = [], {}
+        for idx in range(len(labels) - 1, -1, -1):
+            c = labels[idx]
+            seen[c] = seen.get(c, 0) + 1
+            if seen[c] <= OCR_GLYPH_MAX_PER_LABEL:
+                keep.append(idx)
+        keep.reverse()
+
+        _BANK["labels"] = [labels[i] for i in keep]
+        _BANK["glyphs"] = np.stack([bank[i] for i in keep]).astype(np.float32)
+        try:
+            _save_bank_locked()
+        except Exception:
+            pass
+    return len(chars)
+
+
+def bank_size() -> int:
+    with _LOCK:
+        _load_bank_locked()
+        return len(_BANK["labels"])
+
+
+def missing_labels() -> str:
+    """还没有模板的必需字符（空串 = 收齐了，recognize 才会启用）"""
+    with _LOCK:
+        _load_bank_locked()
+        have = set(_BANK["labels"])
+    return "".join(c for c in REQUIRED_LABELS if c not in have)
+
+
+# ======================
+# 识别
+# ======================
+def recognize(crop_bgr: np.ndarray) -> Optional[Tuple[str, float]]:
+    """
+    返回 (text, confidence)；有任何一个字拿不准返回 None（调用方回退 PaddleOCR）
+    confidence = 1 - 最差那个字的模板距离（平均像素差，0~1）
+    """
+    with _LOCK:
+        _load_bank_locked()
+        labels = _BANK["labels"]
+        bank = _BANK["glyphs"]
+    if bank is None or not labels:
+        return None
+    uniq = sorted(set(labels))
+    if any(c not in uniq for c in REQUIRED_LABELS):
+        return None
+
+    parts = segment_glyphs(crop_bgr)
+    if not any(kind == "glyph" for (kind, _g) in parts):
+        return None
+    # 裁得太紧：贴边那个字高的块可能就是被裁掉的首位/末位，少一位照样“很有把握”，宁可交给 PaddleOCR
+    if any(kind == "edge" for (kind, _g) in parts) or parts[0][0] == ",":
+        return None
+
+    label_arr = np.array(labels)
+
+    text = []
+    worst = 0.0
+    for kind, g in parts:
+        if kind == ",":
+            text.append(",")
+            continue
+
+        dists = np.abs(bank - g[None, :, :]).mean(axis=(1, 2))
+        per_label = sorted((float(dists[label_arr == c].min()), c) for c in uniq)
+        d1, best = per_label[0]
+        d2 = per_label[1][0]
+
+        if d1 > OCR_GLYPH_MAX_DIST or (d2 - d1) < OCR_GLYPH_MIN_MARGIN:
+            return None
+        text.append(best)
+        worst = max(worst, d1)
+
+    return "".join(text), 1.0 - worst
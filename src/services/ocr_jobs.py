@@ -0,0 +1,223 @@
+# src/services/ocr_jobs.py
+# 按 (会话, 槽位) 管理 OCR 任务：
+# - 上号/下号两张图各自一个任务，在后台线程里提交给 ocr_pool，两张图并发识别
+# - 同一个槽位再传新图：旧任务作废（还在排队就撤掉；已经在跑的结果直接丢弃）
+# - UI 先 start() 拿到任务号立刻显示“识别中”，再 wait() 取结果；wait 返回 None 表示被新图顶掉了
+# - 纯币识别完顺手在后台预取顶部货币栏（prefetch_currencies）；确认写日志时 currencies_ready 只拿已经好了的，
+#   还没好的由 fill_currencies_later 在后台等完再补进 ocr.json（写日志不等 OCR）
+# - 写日志后喂字形库/感知哈希索引（harvest_later）也在后台单线程做：要整张解码，不占确认请求
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple, List
+
+from src.config import OCR_POOL_MAX_PENDING, OCR_POOL_JOB_TIMEOUT_SEC
+from src.services import ocr_pool, ocr_service
+
+# 线程只负责提交+等待（真正的识别在进程池里），给够排队上限就行
+_EXEC = ThreadPoolExecutor(max_workers=max(2, OCR_POOL_MAX_PENDING), thread_name_prefix="ocr-job")
+
+# 收录确认过的截图：单线程，写字形库/哈希索引不会互相抢
+_HARVEST = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-harvest")
+
+# 写日志后补货币栏：单独一个线程，只在这里等 _EXEC 上的识别任务
+# （放在 _EXEC 里等会占住识别/预取的线程：全是等待者时新任务排不上，只能等它们超时）
+_FILL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-fill")
+
+_LOCK = threading.Lock()
+_JOBS: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_GEN = itertools.count(1)
+
+# 货币栏预取：{图片路径: future}（只留最近几张）
+_CUR: "OrderedDict[str, Any]" = OrderedDict()
+_CUR_MAX = 32
+
+_STATS = {
+    "started": 0,
+    "superseded": 0,
+    "finished": 0,
+}
+
+
+def _run(path: str, cancel_event: threading.Event) -> dict:
+    # 线程池排队期间就被顶掉了：不用再提交
+    if cancel_event.is_set():
+        return ocr_service.new_ocr_detail(error="cancelled")
+    return ocr_pool.submit_extract(path, cancel_event=cancel_event)
+
+
+def _drop_locked(key: Tuple[str, str]):
+    job = _JOBS.pop(key, None)
+    if job is not None:
+        job["cancel"].set()
+        job["future"].cancel()
+        _STATS["superseded"] += 1
+
+
+def start(session: str, slot: str, path: str) -> int:
+    """开始识别（作废该槽位上一个任务），返回任务号"""
+    key = (session or "", slot)
+    cancel_event = threading.Event()
+    fut = _EXEC.submit(_run, path, cancel_event)
+    with _LOCK:
+        _drop_locked(key)
+        gen = next(_GEN)
+        _JOBS[key] = {"gen": gen, "path": path, "cancel": cancel_event, "future": fut}
+        _STATS["started"] += 1
+    return gen
+
+
+def wait(session: str, slot: str, gen: int, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC + 5) -> Optional[dict]:
+    """
+    等任务结果；任务已经被新图顶掉（或槽位被清空）返回 None
+    """
+    key = (session or "", slot)
+    with _LOCK:
+        job = _JOBS.get(key)
+    if job is None or job["gen"] != gen:
+        return None
+
+    try:
+        detail = job["future"].result(timeout=timeout)
+    except FutureTimeout:
+        detail = ocr_service.new_ocr_detail(error="timeout")
+    except Exception:
+        detail = ocr_service.new_ocr_detail(error="crash")
+
+    with _LOCK:
+        cur = _JOBS.get(key)
+        if cur is None or cur["gen"] != gen:
+            return None
+        _JOBS.pop(key, None)
+        _STATS["finished"] += 1
+    if detail.get("error") == "cancelled":
+        return None
+    return detail
+
+
+def cancel(session: str, slot: Optional[str] = None):
+    """作废某个槽位（slot=None：该会话全部槽位，页面关闭时用）"""
+    with _LOCK:
+        for key in [k for k in _JOBS if k[0] == (session or "") and (slot is None or k[1] == slot)]:
+            _drop_locked(key)
+
+
+def prefetch_currencies(path: str):
+    """后台识别这张图的顶部货币栏（不等结果；同一张图只提交一次）"""
+    if not path:
+        return
+    with _LOCK:
+        if path in _CUR:
+            return
+        _CUR[path] = _EXEC.submit(ocr_pool.submit_currencies, path)
+        while len(_CUR) > _CUR_MAX:
+            _CUR.popitem(last=False)
+
+
+def currencies_for(paths: Dict[str, Optional[str]]) -> Dict[str, dict]:
+    """{slot: 图片路径} -> {slot: extract_currencies 结果}；没预取过的几张并发识别"""
+    for p in paths.values():
+        prefetch_currencies(p)
+    with _LOCK:
+        futs: List[Tuple[str, Any]] = [(slot, _CUR.get(p)) for slot, p in paths.items() if p]
+
+    out = {}
+    for slot, fut in futs:
+        if fut is None:
+            # 刚提交就被挤出了预取表（同时太多张图）：没算，不是崩了
+            out[slot] = ocr_service.new_currencies_result(error="not_computed")
+            continue
+        try:
+            out[slot] = fut.result(timeout=OCR_POOL_JOB_TIMEOUT_SEC + 5)
+        except FutureTimeout:
+            out[slot] = ocr_service.new_currencies_result(error="timeout")
+        except Exception:
+            out[slot] = ocr_service.new_currencies_result(error="crash")
+    return out
+
+
+def currencies_ready(paths: Dict[str, Optional[str]]) -> Dict[str, dict]:
+    """
+    不等：{slot: 图片路径} -> {slot: 结果}；已经识别完的给结果，还在跑的 error="pending"，
+    预取表里没有的（被挤出去了）重新提交、同样记 pending
+    """
+    for p in paths.values():
+        prefetch_currencies(p)
+    with _LOCK:
+        futs = [(slot, _CUR.get(p)) for slot, p in paths.items() if p]
+
+    out = {}
+    for slot, fut in futs:
+        if fut is None:
+            out[slot] = ocr_service.new_currencies_result(error="not_computed")
+        elif not fut.done():
+            out[slot] = ocr_service.new_currencies_result(error="pending")
+        else:
+            try:
+                out[slot] = fut.result(timeout=0)
+            except Exception:
+                out[slot] = ocr_service.new_currencies_result(error="crash")
+    return out
+
+
+def _fill_currencies(paths: Dict[str, Optional[str]], ocr_json: Path):
+    res = currencies_for({slot: p for slot, p in paths.items() if p})
+    try:
+        info = json.loads(ocr_json.read_text(encoding="utf-8"))
+    except Exception:
+        return
+    cur = info.get("currencies") or {}
+    for slot, r in res.items():
+        if slot not in cur or (cur.get(slot) or {}).get("error") in ("pending", "not_computed"):
+            cur[slot] = r
+    info["currencies"] = cur
+    tmp = ocr_json.with_suffix(".json.tmp")
+    try:
+        tmp.write_text(json.dumps(info, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, ocr_json)
+    except Exception:
+        pass
+
+
+def fill_currencies_later(paths: Dict[str, Optional[str]], ocr_json) -> bool:
+    """
+    写完日志后调用：ocr.json 里记成 pending / not_computed 的货币栏，后台等识别完再补上
+    全部都已经好了就什么都不做，返回是否提交了后台任务
+    """
+    ocr_json = Path(ocr_json)
+    try:
+        cur = json.loads(ocr_json.read_text(encoding="utf-8")).get("currencies") or {}
+    except Exception:
+        return False
+    if not any((cur.get(slot) or {}).get("error") in ("pending", "not_computed") for slot, p in paths.items() if p):
+        return False
+    _FILL.submit(_fill_currencies, dict(paths), ocr_json)
+    return True
+
+
+def _harvest(path: str, raw: int, source: str):
+    try:
+        ocr_service.harvest_glyphs(path, raw)
+    except Exception:
+        pass
+    try:
+        ocr_service.harvest_phash(path, raw, source)
+    except Exception:
+        pass
+
+
+def harvest_later(path: str, raw: int, source: str):
+    """用户确认过的截图 + 纯币值：后台喂给字形模板库和感知哈希索引"""
+    if path and raw is not None:
+        _HARVEST.submit(_harvest, path, int(raw), source)
+
+
+def job_stats() -> dict:
+    with _LOCK:
+        st = dict(_STATS)
+        st["running"] = len(_JOBS)
+    return st
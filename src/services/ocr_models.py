@@ -0,0 +1,184 @@
+# src/services/ocr_models.py
+# OCR 模型生命周期（每个进程各管各的）：
+# - 用到才加载（get），空闲超过 OCR_MODEL_IDLE_SEC 由后台线程卸载（0 = 永不卸载）
+# - 内存预算 OCR_MODEL_BUDGET_MB：加载新模型前按“最久没用”先卸掉别的，直到装得下（0 = 不限）
+#   占用按加载前后 RSS 差估算（没装 psutil 用 _EST_MB）；Paddle 的内存池不一定马上还给系统，预算偏保守设
+# - OCR_MODEL_SHARE_REC：数字通道（num，en 模型）直接用通用模型（main，ch 字典包含 0-9 , . K M）
+#   纯数字小图走的是 rec-only，不涉及 det / drop_score，两套合一省一半内存
+# - prewarm()：后台预热（结算页打开时调用），用户传图时模型已经在了
+#
+# 卸载只是丢掉引用：正在推理的调用方手里还拿着对象，跑完才真正释放
+import gc
+import threading
+import time
+from typing import Dict, Any
+
+from src.config import OCR_BACKEND, OCR_MODEL_IDLE_SEC, OCR_MODEL_BUDGET_MB, OCR_MODEL_SHARE_REC
+from src.services import ocr_backends
+
+# 量不到 RSS 时的估算（PP-OCRv3 mobile，paddle 推理器 + 预分配）
+_EST_MB = {"main": 260.0, "num": 140.0}
+
+_LOCK = threading.Lock()
+# 加载是慢操作：同一时间只加载一个（也避免两个线程重复加载同一套）
+_LOAD_LOCK = threading.Lock()
+_MODELS: Dict[str, Dict[str, Any]] = {}
+# 上次加载实测的占用（卸载后再加载时，预算按这个算）
+_MEASURED: Dict[str, float] = {}
+
+_REAPER = None
+
+_STATS = {
+    "loads": 0,
+    "evicted_idle": 0,
+    "evicted_budget": 0,
+    "load_ms": 0.0,
+}
+
+
+def _rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1e6
+    except Exception:
+        return None
+
+
+def _resolve(profile: str) -> str:
+    if OCR_MODEL_SHARE_REC and profile == "num":
+        return "main"
+    return profile
+
+
+def get(profile: str, backend: str = OCR_BACKEND):
+    """取模型（没加载就加载）；profile 见 ocr_backends.PROFILES"""
+    name = _resolve(profile)
+    with _LOCK:
+        m = _MODELS.get(name)
+        if m is not None and m["backend"] == backend:
+            m["last_used"] = time.monotonic()
+            return m["obj"]
+
+    with _LOAD_LOCK:
+        with _LOCK:
+            m = _MODELS.get(name)
+            if m is not None and m["backend"] == backend:
+                m["last_used"] = time.monotonic()
+                return m["obj"]
+        _make_room(name)
+
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        obj = ocr_backends.create(name, backend)
+        ms = (time.perf_counter() - t0) * 1000.0
+        rss1 = _rss_mb()
+        mb = (rss1 - rss0) if (rss0 is not None and rss1 is not None and rss1 > rss0) else _EST_MB.get(name, 200.0)
+
+        with _LOCK:
+            _MODELS[name] = {
+                "obj": obj,
+                "backend": backend,
+                "mb": round(mb, 1),
+                "loaded_at": time.time(),
+                "last_used": time.monotonic(),
+            }
+            _MEASURED[name] = round(mb, 1)
+            _STATS["loads"] += 1
+            _STATS["load_ms"] += ms
+    _start_reaper()
+    return obj
+
+
+def _make_room(name: str):
+    """预算不够装下 name：按最久没用的顺序卸载其它模型"""
+    if OCR_MODEL_BUDGET_MB <= 0:
+        return
+    dropped = []
+    with _LOCK:
+        need = _MEASURED.get(name) or _EST_MB.get(name, 200.0)
+        used = sum(m["mb"] for k, m in _MODELS.items() if k != name)
+        for k, _m in sorted(((k, m) for k, m in _MODELS.items() if k != name), key=lambda kv: kv[1]["last_used"]):
+            if used + need <= OCR_MODEL_BUDGET_MB:
+                break
+            used -= _MODELS[k]["mb"]
+            dropped.append(_MODELS.pop(k))
+            _STATS["evicted_budget"] += 1
+    if dropped:
+        del dropped
+        gc.collect()
+
+
+def _reap_once(now: float | None = None) -> int:
+    """卸载空闲超时的模型，返回卸载个数"""
+    if OCR_MODEL_IDLE_SEC <= 0:
+        return 0
+    now = time.monotonic() if now is None else now
+    with _LOCK:
+        idle = [k for k, m in _MODELS.items() if now - m["last_used"] >= OCR_MODEL_IDLE_SEC]
+        dropped = [_MODELS.pop(k) for k in idle]
+        _STATS["evicted_idle"] += len(dropped)
+    if dropped:
+        del dropped
+        gc.collect()
+    return len(idle)
+
+
+def _reaper_loop():
+    interval = max(1.0, min(60.0, OCR_MODEL_IDLE_SEC / 4.0))
+    while True:
+        time.sleep(interval)
+        try:
+            _reap_once()
+        except Exception:
+            pass
+
+
+def _start_reaper():
+    global _REAPER
+    if OCR_MODEL_IDLE_SEC <= 0 or _REAPER is not None:
+        return
+    with _LOCK:
+        if _REAPER is not None:
+            return
+        _REAPER = threading.Thread(target=_reaper_loop, name="ocr-model-reaper", daemon=True)
+        _REAPER.start()
+
+
+def warm(backend: str = OCR_BACKEND):
+    """同步加载两套模型（共享识别器时只有一套）"""
+    for profile in ("main", "num"):
+        try:
+            get(profile, backend)
+        except Exception:
+            pass
+
+
+def prewarm(backend: str = OCR_BACKEND):
+    """后台加载（不等结果）；已经加载的只刷新空闲计时"""
+    threading.Thread(target=warm, args=(backend,), name="ocr-prewarm", daemon=True).start()
+
+
+def unload_all():
+    with _LOCK:
+        dropped = list(_MODELS.values())
+        _MODELS.clear()
+    if dropped:
+        del dropped
+        gc.collect()
+
+
+def model_stats() -> dict:
+    now = time.monotonic()
+    with _LOCK:
+        st = dict(_STATS)
+        st["loaded"] = {
+            k: {"backend": m["backend"], "mb": m["mb"], "idle_s": round(now - m["last_used"], 1)}
+            for k, m in _MODELS.items()
+        }
+        st["used_mb"] = round(sum(m["mb"] for m in _MODELS.values()), 1)
+    st["load_ms"] = round(st["load_ms"], 1)
+    st["budget_mb"] = OCR_MODEL_BUDGET_MB
+    st["idle_sec"] = OCR_MODEL_IDLE_SEC
+    st["shared_rec"] = bool(OCR_MODEL_SHARE_REC)
+    return st
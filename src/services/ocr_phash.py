@@ -0,0 +1,261 @@
+# src/services/ocr_phash.py
+# 纯币区域的感知哈希索引（近似重复截图直接复用确认过的值，不跑 OCR）：
+# - 上一局的“下号”截图经常就是下一局的“上号”，或者是它被聊天软件重新压缩过的副本
+# - 哈希（找候选）：纯币区域灰度缩到 65x16，相邻像素“明显更亮”记 1（差值 <= _DIFF_T 记 0，
+#   纯色背景不会因为重压缩噪声来回翻），共 1024 位；比较用汉明距离
+# - 核对（防冒充）：数字在整个区域里只占几列，只差一位数字的两张图哈希也就差几位，光靠哈希分不开；
+#   所以每条还存一份“字迹”——数字串二值化后缩到固定高度的墨迹图，候选必须墨迹几乎一样
+#   （不同像素 / 墨迹并集 <= OCR_PHASH_MAX_INK_DIFF）才复用。同分辨率重压缩约 0.01，差一位数字 >= 0.06；
+#   缩放过的副本核对不过就老老实实走 OCR
+# - 索引只收用户确认过的值（写日志时 add / tools/ocr_phash_index.py 从日志库重建），存 data/ocr_phash.jsonl：
+#   只追加，一行一条；新增一条只写一行（不再整个文件重写），别的进程追加的行按文件偏移增量读进来
+# - 核对通过的候选里有不同的值（拿不准）就不复用
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import OCR_PHASH_INDEX_PATH, OCR_PHASH_MAX_DIST, OCR_PHASH_MAX_INK_DIFF
+
+_HASH_W = 64
+_HASH_H = 16
+HASH_BITS = _HASH_W * _HASH_H
+_DIFF_T = 4
+
+# 墨迹图高度；宽度按比例（宽度差太多直接算不像：位数都不一样）
+_INK_H = 24
+_INK_MAX_W = 256
+_INK_W_TOL = 0.08
+
+_LOCK = threading.Lock()
+# {"small"/"full": [{"hash": int, "ink": np.ndarray(bool), "raw": int, "source": str}]}
+_INDEX: Dict[str, list] = {}
+# 已经读进 _INDEX 的 (kind, hash, raw)：增量读时跳过自己追加的行
+_KEYS = set()
+# 文件读到哪了：(inode, 字节偏移)
+_FILE = {"ino": None, "offset": 0}
+# add(save=False) 攒着、save() 一次写出去的行
+_PENDING: list = []
+
+
+def coin_hash(region_bgr: np.ndarray) -> Optional[int]:
+    """纯币区域 -> 1024 位哈希（python int）；区域为空返回 None"""
+    if region_bgr is None or region_bgr.size == 0:
+        return None
+    gray = cv2.cvtColor(region_bgr, cv2.COLOR_BGR2GRAY) if region_bgr.ndim == 3 else region_bgr
+    small = cv2.resize(gray, (_HASH_W + 1, _HASH_H), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] - small[:, :-1]) > _DIFF_T
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), "big")
+
+
+def ink_signature(run_bgr: np.ndarray) -> Optional[np.ndarray]:
+    """数字串裁图 -> 固定高度的二值墨迹图（亮字为 True）；裁图为空返回 None"""
+    if run_bgr is None or run_bgr.size == 0:
+        return None
+    gray = cv2.cvtColor(run_bgr, cv2.COLOR_BGR2GRAY) if run_bgr.ndim == 3 else run_bgr
+    h, w = gray.shape[:2]
+    nw = max(1, min(_INK_MAX_W, int(round(w * _INK_H / float(h)))))
+    small = cv2.resize(gray, (nw, _INK_H), interpolation=cv2.INTER_AREA)
+    _, thr = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = thr > 0
+    # 亮字暗底：字是少数像素
+    if ink.sum() > ink.size // 2:
+        ink = ~ink
+    return ink
+
+
+def ink_diff(a: np.ndarray, b: np.ndarray) -> float:
+    """两份墨迹图的差异（不同像素 / 墨迹并集）；宽度差太多返回 1.0"""
+    if abs(a.shape[1] - b.shape[1]) > max(2, _INK_W_TOL * a.shape[1]):
+        return 1.0
+    if b.shape != a.shape:
+        b = cv2.resize(b.astype(np.uint8), (a.shape[1], a.shape[0]), interpolation=cv2.INTER_NEAREST) > 0
+    union = int((a | b).sum())
+    return float((a ^ b).sum()) / union if union else 1.0
+
+
+def _ink_to_json(ink: np.ndarray) -> dict:
+    return {"w": int(ink.shape[1]), "bits": np.packbits(ink.reshape(-1)).tobytes().hex()}
+
+
+def _ink_from_json(obj) -> Optional[np.ndarray]:
+    try:
+        w = int(obj["w"])
+        bits = np.unpackbits(np.frombuffer(bytes.fromhex(obj["bits"]), dtype=np.uint8))[:_INK_H * w]
+        return bits.reshape(_INK_H, w).astype(bool)
+    except Exception:
+        return None
+
+
+def _entry_from_json(e) -> Optional[Dict[str, Any]]:
+    if not isinstance(e, dict) or not e.get("hash") or e.get("raw") is None:
+        return None
+    try:
+        return {"hash": int(e["hash"], 16), "ink": _ink_from_json(e.get("ink")), "raw": int(e["raw"]),
+                "source": e.get("source")}
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry_to_line(kind: str, e: Dict[str, Any]) -> str:
+    obj = {"kind": kind, "hash": format(e["hash"], "x"), "ink": _ink_to_json(e["ink"]), "raw": e["raw"],
+           "source": e["source"]}
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _keep_locked(kind: str, e: Optional[Dict[str, Any]]) -> bool:
+    if e is None or e.get("ink") is None:
+        return False
+    key = (kind, e["hash"], e["raw"])
+    if key in _KEYS:
+        return False
+    _KEYS.add(key)
+    _INDEX.setdefault(kind, []).append(e)
+    return True
+
+
+def _reset_locked():
+    _INDEX.clear()
+    _KEYS.clear()
+    _FILE["ino"], _FILE["offset"] = None, 0
+
+
+def _import_legacy_locked(path: Path):
+    """旧版整个文件一个 json（{kind: [entry]}）：转成一行一条，旧文件留着不动"""
+    legacy = path.with_suffix(".json")
+    if path.exists() or not legacy.exists():
+        return
+    try:
+        obj = json.loads(legacy.read_text(encoding="utf-8"))
+        lines = []
+        for kind, ents in (obj or {}).items():
+            for e in ents:
+                ent = _entry_from_json(e)
+                if ent is not None and ent.get("ink") is not None:
+                    lines.append(_entry_to_line(kind, ent))
+        _append_lines(path, lines)
+    except Exception:
+        pass
+
+
+def _load_locked():
+    """把文件里还没读过的行读进来（别的进程 add 过）；文件被换掉/截短了就整个重读"""
+    path = Path(OCR_PHASH_INDEX_PATH)
+    _import_legacy_locked(path)
+    try:
+        st = path.stat()
+    except OSError:
+        _reset_locked()
+        return
+    if st.st_ino != _FILE["ino"] or st.st_size < _FILE["offset"]:
+        _reset_locked()
+        _FILE["ino"] = st.st_ino
+    if st.st_size == _FILE["offset"]:
+        return
+    try:
+        with open(path, "rb") as f:
+            f.seek(_FILE["offset"])
+            data = f.read(st.st_size - _FILE["offset"])
+    except OSError:
+        return
+    # 只消费完整的行（另一个进程可能正写到一半）
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            _keep_locked(str(obj.get("kind")), _entry_from_json(obj))
+    _FILE["offset"] += end
+
+
+def _append_lines(path: Path, lines: list):
+    """一次 O_APPEND write（多进程同时追加不会插进半行）"""
+    if not lines:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = "".join(lines).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _flush_locked():
+    global _PENDING
+    lines, _PENDING = _PENDING, []
+    try:
+        _append_lines(Path(OCR_PHASH_INDEX_PATH), lines)
+    except Exception:
+        pass
+
+
+def lookup(kind: str, h: int, ink: np.ndarray) -> Optional[Tuple[Dict[str, Any], int, float]]:
+    """
+    哈希距离 <= OCR_PHASH_MAX_DIST 且墨迹核对通过的候选里最像的一条：(entry, 哈希距离, 墨迹差异)
+    没有，或通过核对的候选值不一致（拿不准）返回 None
+    """
+    with _LOCK:
+        _load_locked()
+        ents = list(_INDEX.get(kind) or ())
+    best, best_d, best_ink = None, None, None
+    raws = set()
+    for e in ents:
+        d = (e["hash"] ^ h).bit_count()
+        if d > OCR_PHASH_MAX_DIST or e.get("ink") is None:
+            continue
+        diff = ink_diff(e["ink"], ink)
+        if diff > OCR_PHASH_MAX_INK_DIFF:
+            continue
+        raws.add(e["raw"])
+        if best_ink is None or diff < best_ink:
+            best, best_d, best_ink = e, d, diff
+    if best is None or len(raws) > 1:
+        return None
+    return best, best_d, best_ink
+
+
+def add(kind: str, h: int, ink: np.ndarray, raw: int, source: str | None = None, save: bool = True) -> bool:
+    """收录一张确认过的图（追加一行）；哈希完全一样且值相同的不重复收"""
+    with _LOCK:
+        _load_locked()
+        e = {"hash": int(h), "ink": ink, "raw": int(raw), "source": source}
+        if not _keep_locked(kind, e):
+            return False
+        _PENDING.append(_entry_to_line(kind, e))
+        if save:
+            _flush_locked()
+    return True
+
+
+def save():
+    """把 add(save=False) 攒下的行写出去"""
+    with _LOCK:
+        _flush_locked()
+
+
+def clear():
+    """清空索引（截成空文件）"""
+    with _LOCK:
+        _PENDING.clear()
+        path = Path(OCR_PHASH_INDEX_PATH)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"")
+        except Exception:
+            pass
+        _reset_locked()
+
+
+def index_stats() -> dict:
+    with _LOCK:
+        _load_locked()
+        return {kind: len(ents) for kind, ents in _INDEX.items()}
@@ -0,0 +1,271 @@
+# src/services/ocr_pool.py
+# OCR 工作进程池：
+# - N 个预热好的子进程各自持有 PaddleOCR 模型，Gradio handler 线程只负责提交/等待
+# - 排队上限（满了直接拒绝，不让 UI 事件越堆越多）+ 单任务超时
+# - pool_stats() 给出排队深度/耗时等指标
+# OCR_POOL_WORKERS = 0 时不建进程池，直接在当前进程里识别（ocr_service 内部有锁）
+# OCR_SERVER_URL 非空时也不建进程池：识别交给本地 OCR 服务（ocr_client / ocr_server）
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from src.config import (
+    OCR_POOL_WORKERS,
+    OCR_POOL_MAX_PENDING,
+    OCR_POOL_JOB_TIMEOUT_SEC,
+    OCR_SERVER_URL,
+)
+from src.services import ocr_service, ocr_cache, ocr_client, ocr_models
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+# 排队名额：提交时拿，任务真正结束（含超时后才跑完的）时还
+_SLOTS = threading.BoundedSemaphore(max(1, OCR_POOL_MAX_PENDING))
+
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "rejected": 0,
+    "cancelled": 0,
+    "pending": 0,
+    "max_pending": 0,
+    "total_ms": 0.0,
+    "max_ms": 0.0,
+}
+
+
+# ======================
+# 子进程侧
+# ======================
+def _worker_init():
+    """
+    子进程启动即加载模型（不管 OCR_MODEL_IDLE_SEC）：每个子进程都会跑一次 initializer，
+    第一张图不用再等模型初始化；会空闲卸载时，过 OCR_MODEL_IDLE_SEC 没用到再由 ocr_models 卸掉
+    （prewarm() 发的预热任务不保证每个子进程都领到一个，不能靠它来加载）
+    """
+    ocr_models.warm()
+
+
+def _worker_prewarm() -> int:
+    ocr_models.warm()
+    return os.getpid()
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+def _worker_extract(path: str) -> dict:
+    return ocr_service.extract_pure_coin_detail(path)
+
+
+def _worker_currencies(path: str) -> dict:
+    return ocr_service.extract_currencies(path)
+
+
+# ======================
+# 主进程侧
+# ======================
+def _bump(key: str, n=1):
+    with _STATS_LOCK:
+        _STATS[key] += n
+        if key == "pending" and _STATS["pending"] > _STATS["max_pending"]:
+            _STATS["max_pending"] = _STATS["pending"]
+
+
+def start_pool(workers: int = OCR_POOL_WORKERS):
+    """
+    创建并预热进程池（app 启动时调用；重复调用无副作用）
+    ⚠️ 用 spawn：Paddle 不是 fork-safe，且主进程里已经有 Gradio 线程
+    """
+    global _POOL
+    if workers <= 0 or OCR_SERVER_URL:
+        return None
+    with _POOL_LOCK:
+        if _POOL is not None:
+            return _POOL
+        _POOL = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_worker_init,
+        )
+        # spawn 模式下子进程按需创建：提交 N 个空任务把 N 个进程都拉起来
+        for _ in range(workers):
+            _POOL.submit(_worker_ping)
+        return _POOL
+
+
+def prewarm():
+    """
+    后台预热模型（结算页打开时调用，不等结果）
+    进程池：发 N 个预热任务，尽力把卸载过的模型加载回来/刷新空闲计时（谁领到不保证，启动时的加载在 _worker_init）
+    """
+    if OCR_SERVER_URL:
+        threading.Thread(target=ocr_client.prewarm, name="ocr-prewarm", daemon=True).start()
+        return
+    pool = _POOL
+    if pool is None:
+        ocr_models.prewarm()
+        return
+    try:
+        for _ in range(OCR_POOL_WORKERS):
+            pool.submit(_worker_prewarm)
+    except Exception:
+        pass
+
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _on_job_done(t0: float):
+    def _cb(fut):
+        ms = (time.perf_counter() - t0) * 1000.0
+        with _STATS_LOCK:
+            _STATS["pending"] -= 1
+            if fut.cancelled() or fut.exception() is not None:
+                _STATS["failed"] += 1
+            else:
+                _STATS["completed"] += 1
+                _STATS["total_ms"] += ms
+                _STATS["max_ms"] = max(_STATS["max_ms"], ms)
+        _SLOTS.release()
+    return _cb
+
+
+def submit_extract(path: str, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC, cancel_event=None) -> dict:
+    """
+    提交一张图识别，阻塞等待结果（超时返回 error=timeout）
+    cancel_event（threading.Event）被 set：还在排队的任务直接撤掉，返回 error=cancelled
+    返回 ocr_service.extract_pure_coin_detail 的结构（同时计入 ocr_service.ocr_metrics）
+    """
+    if OCR_SERVER_URL:
+        # HTTP 请求发出去就撤不回来了：只在发之前看一眼
+        if cancel_event is not None and cancel_event.is_set():
+            _bump("cancelled")
+            return ocr_service.new_ocr_detail(error="cancelled")
+        detail = ocr_client.extract(path, timeout)
+    else:
+        detail = _submit(path, timeout, cancel_event, _worker_extract, ocr_service.OCR_PIPELINE_VERSION,
+                         ocr_service.new_ocr_detail)
+    if detail.get("error") != "cancelled":
+        ocr_service.record_metrics(detail)
+    return detail
+
+
+def submit_currencies(path: str, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC) -> dict:
+    """顶部货币栏识别（ocr_service.extract_currencies），排队/超时/崩溃处理同 submit_extract"""
+    if OCR_SERVER_URL:
+        return ocr_client.currencies(path, timeout)
+    return _submit(path, timeout, None, _worker_currencies, ocr_service.CURRENCY_CACHE_VERSION,
+                   ocr_service.new_currencies_result)
+
+
+def _wait_result(fut, timeout: float, cancel_event):
+    """等结果；期间每 0.1s 看一眼 cancel_event"""
+    if cancel_event is None:
+        return fut.result(timeout=timeout)
+    deadline = time.perf_counter() + timeout
+    while True:
+        if cancel_event.is_set():
+            fut.cancel()
+            return None
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            raise FutureTimeout()
+        try:
+            return fut.result(timeout=min(0.1, left))
+        except FutureTimeout:
+            continue
+
+
+def _submit(path: str, timeout: float, cancel_event, worker_fn, cache_version: str, new_result) -> dict:
+    """
+    worker_fn 在子进程里跑（没有进程池就在当前进程跑）；cache_version 对应它用的 OCR 缓存
+    new_result(error=...) 生成出错时的返回结构
+    """
+    pool = _POOL
+    if pool is None:
+        return worker_fn(path)
+
+    # 主进程先查缓存：命中就不用把图发给子进程
+    key, hit = ocr_service.cache_lookup(path, cache_version)
+    if hit is not None:
+        return hit
+
+    if not _SLOTS.acquire(blocking=False):
+        _bump("rejected")
+        return new_result(error="busy")
+
+    _bump("submitted")
+    _bump("pending")
+    t0 = time.perf_counter()
+    try:
+        fut = pool.submit(worker_fn, path)
+    except (BrokenProcessPool, RuntimeError):
+        with _STATS_LOCK:
+            _STATS["pending"] -= 1
+            _STATS["failed"] += 1
+        _SLOTS.release()
+        _restart_pool(pool)
+        return new_result(error="crash")
+    fut.add_done_callback(_on_job_done(t0))
+
+    try:
+        detail = _wait_result(fut, timeout, cancel_event)
+    except FutureTimeout:
+        _bump("timeouts")
+        fut.cancel()  # 还没开始跑就撤掉；已经在跑的只能等它自己结束（名额到时再还）
+        return new_result(error="timeout")
+    except BrokenProcessPool:
+        _restart_pool(pool)
+        return new_result(error="crash")
+    except Exception:
+        return new_result(error="crash")
+    if detail is None:
+        _bump("cancelled")
+        return new_result(error="cancelled")
+
+    # 子进程已经落盘，这里只补主进程的内存 LRU
+    if key and ocr_service.is_cacheable(detail):
+        ocr_cache.put(key, detail, persist=False)
+    return detail
+
+
+def _restart_pool(broken):
+    """子进程崩了（Paddle 段错误等）：丢掉旧池子，重新拉起"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not broken:
+            return
+        _POOL = None
+    try:
+        broken.shutdown(wait=False, cancel_futures=True)
+    except Exception:
+        pass
+    start_pool()
+
+
+def pool_stats() -> dict:
+    with _STATS_LOCK:
+        st = dict(_STATS)
+    done = st["completed"]
+    st["avg_ms"] = round(st["total_ms"] / done, 1) if done else 0.0
+    st["total_ms"] = round(st["total_ms"], 1)
+    st["max_ms"] = round(st["max_ms"], 1)
+    st["workers"] = OCR_POOL_WORKERS if _POOL is not None else 0
+    st["queue_limit"] = OCR_POOL_MAX_PENDING
+    if OCR_SERVER_URL:
+        st["server"] = ocr_client.metrics()
+    return st
@@ -0,0 +1,74 @@
+# src/services/ocr_roi_store.py
+# 按分辨率记住“纯币实际出现的位置”（像素框）：
+# 玩家就那几种设备分辨率，第一次靠 ROI 级联找到后记下来，下次直接裁小框 rec-only
+# 存 data/ocr_roi.json：{"2400x1080": {"box": [x1, y1, x2, y2]}}
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Any
+
+from src.config import OCR_ROI_STORE_PATH
+
+_LOCK = threading.Lock()
+_BOXES: Dict[str, Dict[str, Any]] = {}
+_LOADED = False
+
+
+def _res_key(w: int, h: int) -> str:
+    return f"{int(w)}x{int(h)}"
+
+
+def _load_locked():
+    global _BOXES, _LOADED
+    try:
+        obj = json.loads(Path(OCR_ROI_STORE_PATH).read_text(encoding="utf-8"))
+        _BOXES = obj if isinstance(obj, dict) else {}
+    except Exception:
+        _BOXES = {}
+    _LOADED = True
+
+
+def _save_locked():
+    path = Path(OCR_ROI_STORE_PATH)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(_BOXES, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def get_box(w: int, h: int) -> Optional[Tuple[int, int, int, int]]:
+    """返回该分辨率学到的像素框；没有返回 None（会重读一次文件：其它 OCR 进程可能刚学到）"""
+    key = _res_key(w, h)
+    with _LOCK:
+        if not _LOADED or key not in _BOXES:
+            _load_locked()
+        ent = _BOXES.get(key)
+    if not isinstance(ent, dict):
+        return None
+    box = ent.get("box")
+    if not isinstance(box, list) or len(box) != 4:
+        return None
+    try:
+        x1, y1, x2, y2 = (int(v) for v in box)
+    except Exception:
+        return None
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def learn_box(w: int, h: int, box: Tuple[int, int, int, int]) -> None:
+    """级联命中后记下（覆盖旧框：说明旧框已经不准了）"""
+    key = _res_key(w, h)
+    with _LOCK:
+        if not _LOADED:
+            _load_locked()
+        ent = _BOXES.get(key) if isinstance(_BOXES.get(key), dict) else {}
+        ent["box"] = [int(v) for v in box]
+        _BOXES[key] = ent
+        _save_locked()
+
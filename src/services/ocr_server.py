@@ -0,0 +1,235 @@
+# src/services/ocr_server.py
+# 本地 OCR 服务：模型只在这个进程里加载一份，和 Gradio 的 worker 数、UI 负载脱钩
+#
+#   python -m src.services.ocr_server                # 默认 OCR_SERVER_HOST:OCR_SERVER_PORT
+#   然后把 config.OCR_SERVER_URL 设成 "http://127.0.0.1:7861"，Gradio 就改走 HTTP（见 ocr_client）
+#
+# 接口（请求体都是图片原始字节，返回 json）：
+#   POST /extract      -> ocr_service.extract_pure_coin_detail 的结构（多一个 batch=同批张数）
+#   POST /currencies   -> ocr_service.extract_currencies 的结构
+#   GET  /metrics      -> 排队深度、批大小直方图、耗时 + ocr_metrics / cache_stats
+#   GET  /health
+#   POST /warm         -> 后台加载模型（结算页打开时客户端会调；模型空闲卸载见 ocr_models）
+#
+# 动态批处理：第一张图到达后再等 OCR_SERVER_BATCH_WINDOW_MS，期间到达的（最多 OCR_SERVER_MAX_BATCH 张）
+# 拼成一批交给 ocr_service.extract_pure_coin_batch；排队超过 OCR_SERVER_MAX_QUEUE 直接 503
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config import (
+    OCR_SERVER_HOST,
+    OCR_SERVER_PORT,
+    OCR_SERVER_BATCH_WINDOW_MS,
+    OCR_SERVER_MAX_BATCH,
+    OCR_SERVER_MAX_QUEUE,
+    OCR_POOL_JOB_TIMEOUT_SEC,
+)
+from src.services import ocr_service, ocr_cache, ocr_models, cpu_budget
+
+_QUEUE: "queue.Queue[dict]" = queue.Queue(maxsize=max(1, OCR_SERVER_MAX_QUEUE))
+
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "requests": 0,
+    "completed": 0,
+    "errors": 0,
+    "rejected": 0,
+    "timeouts": 0,
+    "batches": 0,
+    "max_queue": 0,
+    "total_ms": 0.0,
+    "max_ms": 0.0,
+}
+# {批大小: 次数}
+_BATCH_HIST = {}
+
+
+def _bump(key: str, n=1):
+    with _STATS_LOCK:
+        _STATS[key] += n
+
+
+# ======================
+# 批处理线程
+# ======================
+def _collect_batch() -> list:
+    """阻塞等第一张图，然后在时间窗内尽量多收几张"""
+    jobs = [_QUEUE.get()]
+    deadline = time.perf_counter() + OCR_SERVER_BATCH_WINDOW_MS / 1000.0
+    while len(jobs) < max(1, OCR_SERVER_MAX_BATCH):
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            break
+        try:
+            jobs.append(_QUEUE.get(timeout=left))
+        except queue.Empty:
+            break
+    return jobs
+
+
+def _run_batch(jobs: list):
+    extract = [j for j in jobs if j["kind"] == "extract"]
+    if extract:
+        try:
+            results = ocr_service.extract_pure_coin_batch([j["data"] for j in extract])
+        except Exception:
+            results = [ocr_service.new_ocr_detail(error="crash") for _ in extract]
+        for j, detail in zip(extract, results):
+            ocr_service.record_metrics(detail)
+            j["result"] = detail
+
+    # 货币栏是一整条 det+rec，拼批没什么收益：同一批里逐张跑
+    for j in jobs:
+        if j["kind"] != "currencies":
+            continue
+        try:
+            j["result"] = ocr_service.extract_currencies_from_bytes(j["data"])
+        except Exception:
+            j["result"] = ocr_service.new_currencies_result(error="crash")
+
+
+def _batch_loop():
+    while True:
+        jobs = _collect_batch()
+        with _STATS_LOCK:
+            _STATS["batches"] += 1
+            _BATCH_HIST[len(jobs)] = _BATCH_HIST.get(len(jobs), 0) + 1
+        try:
+            _run_batch(jobs)
+        except Exception:
+            pass
+        for j in jobs:
+            j["done"].set()
+
+
+def submit(kind: str, data: bytes, timeout: float = OCR_POOL_JOB_TIMEOUT_SEC):
+    """
+    放进队列并等结果：返回 (状态码, 结果)
+    队列满 503；超时 504（批处理线程之后仍会跑完它，结果丢弃）
+    """
+    _bump("requests")
+    job = {"kind": kind, "data": data, "done": threading.Event(), "result": None}
+    t0 = time.perf_counter()
+    try:
+        _QUEUE.put_nowait(job)
+    except queue.Full:
+        _bump("rejected")
+        return 503, None
+    with _STATS_LOCK:
+        _STATS["max_queue"] = max(_STATS["max_queue"], _QUEUE.qsize())
+
+    if not job["done"].wait(timeout):
+        _bump("timeouts")
+        return 504, None
+    res = job["result"]
+    if res is None:
+        _bump("errors")
+        return 500, None
+
+    ms = (time.perf_counter() - t0) * 1000.0
+    with _STATS_LOCK:
+        _STATS["completed"] += 1
+        _STATS["total_ms"] += ms
+        _STATS["max_ms"] = max(_STATS["max_ms"], ms)
+    return 200, res
+
+
+def server_metrics() -> dict:
+    with _STATS_LOCK:
+        st = dict(_STATS)
+        hist = dict(sorted(_BATCH_HIST.items()))
+    done = st["completed"]
+    st["avg_ms"] = round(st["total_ms"] / done, 1) if done else 0.0
+    st["total_ms"] = round(st["total_ms"], 1)
+    st["max_ms"] = round(st["max_ms"], 1)
+    st["queue"] = _QUEUE.qsize()
+    st["queue_limit"] = OCR_SERVER_MAX_QUEUE
+    st["batch_hist"] = {str(k): v for k, v in hist.items()}
+    n = sum(k * v for k, v in hist.items())
+    st["avg_batch"] = round(n / st["batches"], 2) if st["batches"] else 0.0
+    st["ocr"] = ocr_service.ocr_metrics()
+    st["cache"] = ocr_cache.cache_stats()
+    st["models"] = ocr_models.model_stats()
+    st["cpu"] = {**cpu_budget.plan(), "effective": cpu_budget.effective()}
+    return st
+
+
+# ======================
+# HTTP
+# ======================
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, code: int, obj=None):
+        body = json.dumps(obj if obj is not None else {"error": code}, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True})
+        elif self.path == "/metrics":
+            self._reply(200, server_metrics())
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        if self.path == "/warm":
+            ocr_models.prewarm()
+            self._reply(200, {"ok": True})
+            return
+        kind = {"/extract": "extract", "/currencies": "currencies"}.get(self.path)
+        try:
+            n = int(self.headers.get("Content-Length") or 0)
+            data = self.rfile.read(n) if n > 0 else b""
+        except Exception:
+            self._reply(400)
+            return
+        if kind is None:
+            self._reply(404)
+            return
+        if not data:
+            self._reply(400)
+            return
+        code, res = submit(kind, data)
+        self._reply(code, res)
+
+    def log_message(self, fmt, *args):
+        # 每个请求都打一行太吵，看 /metrics 就行
+        pass
+
+
+def serve(host: str = OCR_SERVER_HOST, port: int = OCR_SERVER_PORT):
+    # 先加载模型：第一批请求不用等初始化（之后空闲超时照样会卸载）
+    ocr_models.warm()
+    print(cpu_budget.report("ocr-server"))
+
+    threading.Thread(target=_batch_loop, name="ocr-batch", daemon=True).start()
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    print(f"✅ OCR 服务已启动：http://{host}:{port}（批窗口 {OCR_SERVER_BATCH_WINDOW_MS}ms，最多 {OCR_SERVER_MAX_BATCH} 张/批）")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本地 OCR 服务（动态批处理）")
+    ap.add_argument("--host", default=OCR_SERVER_HOST)
+    ap.add_argument("--port", type=int, default=OCR_SERVER_PORT)
+    args = ap.parse_args()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,82 @@
 # src/services/ocr_service.py
+import io
+import itertools
 import os
 import re
+import threading
+import time
+from contextlib import contextmanager
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
 
-_OCR = None
-_OCR_NUM = None
+from src.config import (
+    OCR_GATE_MIN_SCORE,
+    OCR_GATE_REQUIRE_UNIT,
+    OCR_GATE_MIN_RAW,
+    OCR_GATE_MAX_RAW,
+    OCR_BATCH_VARIANTS,
+    OCR_VARIANT_CHUNK,
+    OCR_ROI_PAD,
+    OCR_ROI_REC_VARIANTS,
+    OCR_QC_ENABLED,
+    OCR_QC_MIN_SIDE,
+    OCR_QC_MIN_CONTRAST,
+    OCR_QC_MIN_SHARPNESS,
+    OCR_QC_MIN_GLYPHS,
+    OCR_DECODE_BAND,
+    OCR_DECODE_BAND_MIN_PIXELS,
+    OCR_CURRENCY_BAND,
+    OCR_CURRENCY_FIELDS,
+    OCR_CC_LOCALIZE,
+    OCR_BACKEND,
+    OCR_PHASH_ENABLED,
+)
+from src.services import ocr_cache, ocr_roi_store, ocr_glyphs, ocr_models, ocr_phash, ocr_backends
+
+# ⚠️ 识别逻辑（ROI/预处理/门槛/解析规则）有改动时要 +1：旧的 OCR 缓存会自动失效
+OCR_PIPELINE_VERSION = "2"
+
+
+def backend_tag() -> str:
+    """当前推理后端（paddle / onnx / onnx-int8）：不同后端的识别结果不通用"""
+    tag = str(OCR_BACKEND)
+    if tag == "onnx" and ocr_backends.OCR_ONNX_INT8:
+        tag += "-int8"
+    return tag
+
+
+def _cache_key(data: bytes, version: str) -> str:
+    """内容缓存 key：流程版本 + 后端（换后端不会拿到另一个后端缓存的结果，包括识别失败/被拒的）"""
+    return ocr_cache.make_key(data, f"{version}-{backend_tag()}")
+
+# 同进程多线程（Gradio handler）共用模型：推理要加锁（加载/卸载见 ocr_models）
+_OCR_INFER_LOCK = threading.Lock()
+
+# 进程内 OCR 指标（record_metrics 累加，ocr_metrics 读取）
+_METRICS_LOCK = threading.Lock()
+_METRICS = {
+    "calls": 0,
+    "recognized": 0,
+    "cached": 0,
+    "errors": 0,
+    "rejected": 0,
+    "passes": 0,
+    "by_path": {},
+    "stages": {},
+}
+
+
+@contextmanager
+def _timed(detail: dict | None, stage: str):
+    """把这一段耗时（ms）累加到 detail["timings"][stage]；detail=None 时不记"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if detail is not None:
+            ms = (time.perf_counter() - t0) * 1000.0
+            timings = detail.setdefault("timings", {})
+            timings[stage] = round(timings.get(stage, 0.0) + ms, 2)
 
 
 def resolve_image_path(image_input):
@@ -23,16 +93,8 @@ def resolve_image_path(image_input):
 
 
 def get_ocr():
-    global _OCR
-    if _OCR is None:
-        _OCR = PaddleOCR(
-            use_angle_cls=True,
-            lang="ch",
-            ocr_version="PP-OCRv3",
-            show_log=False,
-            drop_score=0.2,
-        )
-    return _OCR
+    """通用 OCR（中文模型，带方向分类）；后端见 config.OCR_BACKEND / ocr_backends，加载/空闲卸载见 ocr_models"""
+    return ocr_models.get("main", OCR_BACKEND)
 
 
 def get_ocr_num():
@@ -40,41 +102,132 @@ def get_ocr_num():
     数字专用 OCR：用于黑底白字、纯数字小截图
     - lang=en 对数字更稳
     - drop_score 降低，避免小图被过滤
+    config.OCR_MODEL_SHARE_REC 打开时和 get_ocr 是同一个对象
     """
-    global _OCR_NUM
-    if _OCR_NUM is None:
-        _OCR_NUM = PaddleOCR(
-            use_angle_cls=False,
-            lang="en",
-            ocr_version="PP-OCRv3",
-            show_log=False,
-            drop_score=0.01,
-        )
-    return _OCR_NUM
+    return ocr_models.get("num", OCR_BACKEND)
 
 
-def _imread_unicode(path: str):
+def _read_bytes(path: str):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        return data if data else None
+    except Exception:
+        return None
+
+
+def _imdecode_bytes(data: bytes):
+    try:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except Exception:
+        return None
+
+
+# 顶部条带高度（比例）：ROI 级联最大的框到 0.20，留一点余量给学到的框外扩
+_DECODE_BAND_Y = 0.22
+
+
+def _decode_top_band(data: bytes):
+    """
+    大横屏 PNG 只解码顶部 _DECODE_BAND_Y 的行（PNG 逐行压缩，解到够用的行数就停）
+    返回 (band_bgr, w, h)，w/h 是整张图的尺寸；不适用（JPEG/隔行/竖屏/小图/没有 PIL）返回 None
+    """
+    try:
+        from PIL import Image
+    except Exception:
+        return None
     try:
-        data = np.fromfile(path, dtype=np.uint8)
-        if data is None or data.size == 0:
+        im = Image.open(io.BytesIO(data))
+        if im.format != "PNG" or im.info.get("interlace") or len(im.tile) != 1:
             return None
-        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if im.mode not in ("RGB", "RGBA", "L", "P"):
+            return None
+        w, h = im.size
+        if w * h < OCR_DECODE_BAND_MIN_PIXELS or w < h:
+            return None
+
+        rows = min(h, int(h * _DECODE_BAND_Y) + 1)
+        t = im.tile[0]
+        im.tile = [(t[0], (0, 0, w, rows)) + tuple(t[2:])]
+        im._size = (w, rows)
+        im.load()
+        rgb = np.asarray(im.convert("RGB"))
     except Exception:
         return None
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), w, h
+
+
+def _decode_for_ocr(data: bytes, detail: dict):
+    """
+    OCR 用的解码：能只解顶部条带就只解条带，否则整张解码
+    返回 (img, w, h)（img 可能只有顶部几行，w/h 始终是整张图的尺寸），失败返回 (None, 0, 0)
+    """
+    band = _decode_top_band(data) if OCR_DECODE_BAND else None
+    if band is not None:
+        img, w, h = band
+        detail["decode"] = {"mode": "band", "size": [w, h], "rows": int(img.shape[0])}
+        return img, w, h
+
+    img = _imdecode_bytes(data)
+    if img is None:
+        return None, 0, 0
+    h, w = img.shape[:2]
+    detail["decode"] = {"mode": "full", "size": [w, h], "rows": h}
+    return img, w, h
+
+
+def _imread_unicode(path: str):
+    data = _read_bytes(path)
+    if data is None:
+        return None
+    return _imdecode_bytes(data)
 
 
 def _ocr_run(ocr_obj, img_obj):
-    try:
-        return ocr_obj.ocr(img_obj)
-    except TypeError:
-        return ocr_obj.ocr(img_obj, det=True, rec=True)
+    with _OCR_INFER_LOCK:
+        try:
+            return ocr_obj.ocr(img_obj)
+        except TypeError:
+            return ocr_obj.ocr(img_obj, det=True, rec=True)
 
 
 def _ocr_rec_only(ocr_obj, img_obj):
+    with _OCR_INFER_LOCK:
+        return ocr_obj.ocr(img_obj, det=False, rec=True, cls=False)
+
+
+def _ocr_det_only(ocr_obj, img_obj):
+    """只跑检测：返回 box 列表（[[x,y]*4]），失败返回 None"""
     try:
-        return ocr_obj.ocr(img_obj, det=False, rec=True)
+        with _OCR_INFER_LOCK:
+            result = ocr_obj.ocr(img_obj, det=True, rec=False)
     except Exception:
         return None
+    if not isinstance(result, list) or not result:
+        return None
+    boxes = result[0]
+    return boxes if isinstance(boxes, list) else None
+
+
+def _ocr_rec_batch(ocr_obj, imgs):
+    """
+    一次 rec 调用识别多张图（PaddleOCR：外层 list 里套一个 list = 同一批）
+    返回与 imgs 一一对应的 rec-only 结果（[[(text, score)]] 形式，可直接喂给 _parse_items_from_result）
+    失败/条数对不上返回 None，调用方回退到逐张识别
+    """
+    if not imgs:
+        return []
+    try:
+        with _OCR_INFER_LOCK:
+            result = ocr_obj.ocr([list(imgs)], det=False, rec=True, cls=False)
+    except Exception:
+        return None
+    if not isinstance(result, list) or not result:
+        return None
+    page = result[0]
+    if not isinstance(page, list) or len(page) != len(imgs):
+        return None
+    return [[[it]] for it in page]
 
 
 def _to_3ch(img):
@@ -92,34 +245,138 @@ def _sharp(gray):
     return cv2.filter2D(gray, -1, k)
 
 
-def _preprocess_variants(roi_bgr):
-    variants = []
+# ROI 预处理统一放大倍数（det box 坐标 / _ROI_SCALE = ROI 内原图坐标）
+_ROI_SCALE = 3.0
 
-    big = cv2.resize(roi_bgr, None, fx=3.0, fy=3.0, interpolation=cv2.INTER_CUBIC)
-    variants.append(("bgr_big", _to_3ch(big)))
 
-    gray = cv2.cvtColor(big, cv2.COLOR_BGR2GRAY)
+# 预处理缓冲池：每个线程一份 {(名字, shape): ndarray}，同尺寸的 ROI 反复用同一块内存
+# ⚠️ 产出的预处理图就在缓冲区里：只在这次识别内有效，下一次同尺寸 ROI 会覆盖
+_BUF = threading.local()
+_BUF_MAX = 64  # 分辨率 x ROI 就那几档；超了说明尺寸很杂，清掉重来
+_CLOSE_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_SHARP_KERNEL = np.array([[0, -1, 0],
+                          [-1, 5, -1],
+                          [0, -1, 0]], dtype=np.float32)
+
+
+def _buf(name: str, shape: tuple):
+    pool = getattr(_BUF, "pool", None)
+    if pool is None:
+        pool = _BUF.pool = {}
+    key = (name, shape)
+    b = pool.get(key)
+    if b is None:
+        if len(pool) >= _BUF_MAX:
+            pool.clear()
+        b = pool[key] = np.empty(shape, dtype=np.uint8)
+    return b
+
+
+def _clahe():
+    c = getattr(_BUF, "clahe", None)
+    if c is None:
+        c = _BUF.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return c
+
+
+def _iter_preprocess_variants(roi_bgr, detail: dict | None = None):
+    """
+    按优先级惰性产出 (name, img)：调用方不再往下取，后面的预处理就不会算
+    每一步都写进缓冲池（dst=），不在每次调用里重新分配
+    """
+    h, w = roi_bgr.shape[:2]
+    bw, bh = int(round(w * _ROI_SCALE)), int(round(h * _ROI_SCALE))
+    gshape, cshape = (bh, bw), (bh, bw, 3)
+
+    def _3ch(name, g):
+        return cv2.cvtColor(g, cv2.COLOR_GRAY2BGR, dst=_buf(name, cshape))
 
-    gray_blur = cv2.bilateralFilter(gray, 7, 40, 40)
-    variants.append(("gray_bilateral", _to_3ch(gray_blur)))
+    with _timed(detail, "resize"):
+        big = cv2.resize(roi_bgr, (bw, bh), dst=_buf("bgr_big", cshape), interpolation=cv2.INTER_CUBIC)
+    yield "bgr_big", big
 
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    g = clahe.apply(gray_blur)
-    variants.append(("gray_clahe", _to_3ch(g)))
+    with _timed(detail, "preprocess"):
+        gray = cv2.cvtColor(big, cv2.COLOR_BGR2GRAY, dst=_buf("gray", gshape))
+        blur = cv2.bilateralFilter(gray, 7, 40, 40, dst=_buf("g_bilateral", gshape))
+        out = _3ch("gray_bilateral", blur)
+    yield "gray_bilateral", out
 
-    g_sharp = _sharp(g)
-    variants.append(("gray_sharp", _to_3ch(g_sharp)))
+    with _timed(detail, "preprocess"):
+        g = _clahe().apply(blur, dst=_buf("g_clahe", gshape))
+        out = _3ch("gray_clahe", g)
+    yield "gray_clahe", out
 
-    _, thr = cv2.threshold(g_sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    variants.append(("thr_otsu", _to_3ch(thr)))
-    variants.append(("thr_otsu_inv", _to_3ch(cv2.bitwise_not(thr))))
+    with _timed(detail, "preprocess"):
+        g_sharp = cv2.filter2D(g, -1, _SHARP_KERNEL, dst=_buf("g_sharp", gshape))
+        out = _3ch("gray_sharp", g_sharp)
+    yield "gray_sharp", out
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    close = cv2.morphologyEx(thr, cv2.MORPH_CLOSE, kernel, iterations=1)
-    variants.append(("thr_close", _to_3ch(close)))
-    variants.append(("thr_close_inv", _to_3ch(cv2.bitwise_not(close))))
+    with _timed(detail, "preprocess"):
+        _, thr = cv2.threshold(g_sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=_buf("g_thr", gshape))
+        out = _3ch("thr_otsu", thr)
+    yield "thr_otsu", out
 
-    return [(n, im) for (n, im) in variants if im is not None]
+    with _timed(detail, "preprocess"):
+        out = _3ch("thr_otsu_inv", cv2.bitwise_not(thr, dst=_buf("g_tmp", gshape)))
+    yield "thr_otsu_inv", out
+
+    with _timed(detail, "preprocess"):
+        close = cv2.morphologyEx(thr, cv2.MORPH_CLOSE, _CLOSE_KERNEL, dst=_buf("g_close", gshape), iterations=1)
+        out = _3ch("thr_close", close)
+    yield "thr_close", out
+
+    with _timed(detail, "preprocess"):
+        out = _3ch("thr_close_inv", cv2.bitwise_not(close, dst=_buf("g_tmp", gshape)))
+    yield "thr_close_inv", out
+
+
+class _LazyVariants:
+    """
+    _iter_preprocess_variants 的惰性序列：可以反复迭代 / head(n)，算过的不重算
+    （批量模式回退到逐个 det+rec 时，从头再迭代一遍也不会重复预处理）
+    """
+
+    def __init__(self, roi_bgr, detail: dict | None = None):
+        self._gen = _iter_preprocess_variants(roi_bgr, detail)
+        self._done = []
+
+    def _fill(self, n: int) -> bool:
+        while len(self._done) < n:
+            nxt = next(self._gen, None)
+            if nxt is None:
+                return False
+            self._done.append(nxt)
+        return True
+
+    def head(self, n: int) -> list:
+        self._fill(n)
+        return self._done[:n]
+
+    def __iter__(self):
+        i = 0
+        while self._fill(i + 1):
+            yield self._done[i]
+            i += 1
+
+
+def _preprocess_variants(roi_bgr, detail: dict | None = None) -> _LazyVariants:
+    return _LazyVariants(roi_bgr, detail)
+
+
+def _box_bounds(box, w: int, h: int, pad: int = 4):
+    """det box -> 轴对齐裁剪范围 (x1, y1, x2, y2)，越界会被裁掉"""
+    try:
+        xs = [int(p[0]) for p in box]
+        ys = [int(p[1]) for p in box]
+    except Exception:
+        return None
+    x1 = max(0, min(xs) - pad)
+    y1 = max(0, min(ys) - pad)
+    x2 = min(w, max(xs) + pad)
+    y2 = min(h, max(ys) + pad)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
 
 
 def _box_center_x(box) -> float | None:
@@ -136,9 +393,9 @@ def _box_center_x(box) -> float | None:
 
 def _parse_items_from_result(result):
     """
-    返回 items: [{"text": str, "score": float, "cx": float|None}]
+    返回 items: [{"text": str, "score": float, "cx": float|None, "box": list|None}]
     - det+rec：带 box -> cx 可用
-    - rec-only：无 box -> cx=None
+    - rec-only：无 box -> cx=None, box=None
     """
     items = []
     if result is None:
@@ -157,9 +414,9 @@ def _parse_items_from_result(result):
                     score = it[1]
                     try:
                         if float(score) >= 0.08:
-                            items.append({"text": text, "score": float(score), "cx": None})
+                            items.append({"text": text, "score": float(score), "cx": None, "box": None})
                     except Exception:
-                        items.append({"text": text, "score": 0.0, "cx": None})
+                        items.append({"text": text, "score": 0.0, "cx": None, "box": None})
                     continue
 
                 # det+rec: [box, (text, score)]
@@ -172,7 +429,7 @@ def _parse_items_from_result(result):
                         try:
                             if float(score) >= 0.08:
                                 cx = _box_center_x(box)
-                                items.append({"text": text, "score": float(score), "cx": cx})
+                                items.append({"text": text, "score": float(score), "cx": cx, "box": box})
                         except Exception:
                             pass
         return items
@@ -194,8 +451,10 @@ def _parse_num_token(raw: str) -> float:
 
 def _extract_candidates_from_items_raw(items, roi_w: int | None = None):
     """
-    返回 list[(raw:int, cx_norm:float|None)]
-    cx_norm: 0~1，越小越靠左
+    返回 list[{"raw": int, "cx": float|None, "score": float, "unit": str|None, "box": list|None}]
+    cx: 0~1（归一化），越小越靠左
+    unit: 命中的单位（k/w/万/m），无单位兜底为 None
+    box: 所在文字块的 det box（预处理图坐标），rec-only 为 None
     """
     out = []
 
@@ -216,6 +475,12 @@ def _extract_candidates_from_items_raw(items, roi_w: int | None = None):
         if roi_w and isinstance(cx, (int, float)) and roi_w > 0:
             cx_norm = float(cx) / float(roi_w)
 
+        score = float(it.get("score") or 0.0)
+        box = it.get("box")
+
+        def _add(raw: int, unit: str | None):
+            out.append({"raw": raw, "cx": cx_norm, "score": score, "unit": unit, "box": box})
+
         # 1) 带单位（k/w/万/m）——这是最可靠的（纯币一般会有 K）
         for m in re.finditer(r"([0-9][0-9,\.]*(?:[0-9])?)\s*([kKwW万mM])", s):
             num_raw = m.group(1)
@@ -226,11 +491,11 @@ def _extract_candidates_from_items_raw(items, roi_w: int | None = None):
                 continue
 
             if unit in ("w", "万"):
-                out.append((int(round(num * 10_000)), cx_norm))
+                _add(int(round(num * 10_000)), unit)
             elif unit == "k":
-                out.append((int(round(num * 1_000)), cx_norm))
+                _add(int(round(num * 1_000)), unit)
             elif unit == "m":
-                out.append((int(round(num * 1_000_000)), cx_norm))
+                _add(int(round(num * 1_000_000)), unit)
 
         # 2) 无单位兜底（形如 647,736）
         m2 = re.search(r"\b([0-9]{1,3}(?:[,\.][0-9]{3}){1,2})\b", s)
@@ -244,7 +509,7 @@ def _extract_candidates_from_items_raw(items, roi_w: int | None = None):
                 n = int(re.sub(r"[,\.\s]", "", raw_num))
                 if 100_000 <= n <= 9_999_999:
                     w_approx = int(round(n / 10_000.0))
-                    out.append((int(w_approx * 10_000), cx_norm))
+                    _add(int(w_approx * 10_000), None)
             except Exception:
                 pass
 
@@ -257,7 +522,7 @@ def _extract_candidates_from_items_raw(items, roi_w: int | None = None):
             try:
                 n = int(re.sub(r"[,\.\s]", "", raw_num))
                 if n <= 200_000:
-                    out.append((int(n * 1_000), cx_norm))
+                    _add(int(n * 1_000), None)
             except Exception:
                 pass
 
@@ -276,92 +541,649 @@ def _is_direct_number_image(img: np.ndarray) -> bool:
     return False
 
 
+# 预检看的区域：小图看整张；整张截图看 ROI 级联里最大的那个框
+_QC_REGION = (0.60, 0.00, 0.90, 0.20)
+
+
+def _quality_check(img: np.ndarray, direct: bool, detail: dict, w: int, h: int) -> str | None:
+    """
+    便宜的图片预检（几毫秒）：返回拒绝原因，能识别返回 None
+      too_small：图片太小；low_contrast：纯币区域几乎纯色；
+      blurry：糊成一片；no_glyphs：纯币区域里切不出数字
+    测到的指标写进 detail["quality"]，方便按实际截图调阈值
+    （w/h 是整张图的尺寸：img 可能只解码了顶部条带）
+    """
+    if min(h, w) < OCR_QC_MIN_SIDE:
+        return "too_small"
+
+    if direct:
+        region = img
+    else:
+        x1r, y1r, x2r, y2r = _QC_REGION
+        region = img[int(h * y1r):int(h * y2r), int(w * x1r):int(w * x2r)]
+        if region.size == 0:
+            return "too_small"
+
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    contrast = float(gray.std())
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    q = {"contrast": round(contrast, 1), "sharpness": round(sharpness, 1)}
+    detail["quality"] = q
+
+    if contrast < OCR_QC_MIN_CONTRAST:
+        return "low_contrast"
+    if sharpness < OCR_QC_MIN_SHARPNESS:
+        return "blurry"
+
+    glyphs = sum(1 for (kind, _g) in ocr_glyphs.segment_glyphs(region) if kind == "glyph")
+    q["glyphs"] = glyphs
+    if glyphs < OCR_QC_MIN_GLYPHS:
+        return "no_glyphs"
+    return None
+
+
+def _rec_variants_sequential(ocr_obj, named_imgs, detail: dict):
+    """逐张 rec-only（惰性：调用方 break 后剩下的不会再跑）"""
+    for vname, vimg in named_imgs:
+        detail["passes"] += 1
+        try:
+            with _timed(detail, "rec"):
+                result = _ocr_rec_only(ocr_obj, vimg)
+        except Exception:
+            _fault(detail, "rec")
+            continue
+        yield vname, _parse_items_from_result(result)
+
+
+def _rec_variants_batched(ocr_obj, named_imgs, detail: dict):
+    """
+    所有预处理图拼成一批 rec-only
+    返回 list[(vname, items)]；批量调用失败返回 None
+    """
+    named_imgs = list(named_imgs)
+    with _timed(detail, "rec"):
+        results = _ocr_rec_batch(ocr_obj, [im for (_n, im) in named_imgs])
+    if results is None:
+        return None
+    detail["passes"] += 1
+    return [(vname, _parse_items_from_result(r)) for (vname, _im), r in zip(named_imgs, results)]
+
+
+def _ocr_variants_sequential(ocr_obj, variants, detail: dict):
+    """逐个预处理图跑 det+rec（惰性）"""
+    for vname, vimg in variants:
+        detail["passes"] += 1
+        try:
+            with _timed(detail, "det_rec"):
+                result = _ocr_run(ocr_obj, vimg)
+        except Exception:
+            _fault(detail, "det_rec")
+            continue
+        yield vname, _parse_items_from_result(result)
+
+
+def _rec_boxes_chunk(ocr_obj, chunk, boxes, detail: dict):
+    """用同一组 det box 去这几张预处理图上裁文字块，一批 rec；返回 list[(vname, items)] 或 None"""
+    crops, owners = [], []
+    for vi, (_vname, vimg) in enumerate(chunk):
+        vh, vw = vimg.shape[:2]
+        for box in boxes:
+            b = _box_bounds(box, vw, vh)
+            if b is None:
+                continue
+            x1, y1, x2, y2 = b
+            crops.append(vimg[y1:y2, x1:x2])
+            owners.append((vi, box))
+    if not crops:
+        return None
+
+    with _timed(detail, "rec"):
+        results = _ocr_rec_batch(ocr_obj, crops)
+    if results is None:
+        return None
+    detail["passes"] += 1
+
+    per_variant = [(vname, []) for (vname, _im) in chunk]
+    for (vi, box), r in zip(owners, results):
+        for it in _parse_items_from_result(r):
+            it["cx"] = _box_center_x(box)
+            it["box"] = box
+            per_variant[vi][1].append(it)
+    return per_variant
+
+
+def _ocr_variants_batched(ocr_obj, variants: _LazyVariants, detail: dict):
+    """
+    整张截图 ROI 的批量模式：
+    1) 只在第一个预处理图（bgr_big）上跑一次检测
+    2) 用这些 box 去预处理图上裁文字块，每 OCR_VARIANT_CHUNK 张图拼成一批 rec
+    3) 按预处理名把结果拆回去（items 带 cx，和 det+rec 一致）
+    返回惰性的 (vname, items)：调用方 break 后，后面几批的预处理和 rec 都不会跑
+    检测不到/第一批失败返回 None，调用方回退到逐个 det+rec
+    """
+    first = variants.head(1)
+    if not first:
+        return None
+
+    detail["passes"] += 1
+    with _timed(detail, "det"):
+        boxes = _ocr_det_only(ocr_obj, first[0][1])
+    if not boxes:
+        return None
+
+    step = max(1, OCR_VARIANT_CHUNK)
+    first_res = _rec_boxes_chunk(ocr_obj, variants.head(step), boxes, detail)
+    if first_res is None:
+        return None
+    return _iter_batched_chunks(ocr_obj, variants, boxes, first_res, step, detail)
+
+
+def _iter_batched_chunks(ocr_obj, variants: _LazyVariants, boxes, first_res, step: int, detail: dict):
+    yield from first_res
+    start = len(first_res)
+    while True:
+        chunk = variants.head(start + step)[start:]
+        if not chunk:
+            return
+        res = _rec_boxes_chunk(ocr_obj, chunk, boxes, detail)
+        if res is None:
+            # 后面的批次失败：剩下的逐个 det+rec
+            yield from _ocr_variants_sequential(ocr_obj, itertools.islice(variants, start, None), detail)
+            return
+        yield from res
+        start += len(chunk)
+
+
 def _pick_leftmost_candidate(cands):
     """
-    cands: list[(raw, cx_norm)]
-    规则：优先选择最靠左（cx_norm 最小）的候选；没有位置则回退取 raw 最大
+    cands: list[{"raw", "cx", "score", "unit"}]
+    规则：优先选择最靠左（cx 最小）的候选；没有位置则回退取 raw 最大
     """
     if not cands:
         return None
-    with_pos = [(raw, cx) for (raw, cx) in cands if isinstance(cx, (int, float))]
+    with_pos = [c for c in cands if isinstance(c.get("cx"), (int, float))]
     if with_pos:
-        with_pos.sort(key=lambda x: x[1])  # cx 越小越靠左
-        return with_pos[0][0]
-    return max(raw for (raw, _cx) in cands)
+        with_pos.sort(key=lambda c: c["cx"])  # cx 越小越靠左
+        return with_pos[0]
+    return max(cands, key=lambda c: c["raw"])
 
 
-def extract_pure_coin_raw(image_input):
+def _passes_gate(cand) -> bool:
+    """
+    提前退出门槛：置信度够高 + 带单位 + 数值在合理范围
+    （门槛见 config.OCR_GATE_*）
+    """
+    if not cand:
+        return False
+    raw = cand.get("raw")
+    if not isinstance(raw, int) or not (OCR_GATE_MIN_RAW <= raw <= OCR_GATE_MAX_RAW):
+        return False
+    if OCR_GATE_REQUIRE_UNIT and not cand.get("unit"):
+        return False
+    return float(cand.get("score") or 0.0) >= OCR_GATE_MIN_SCORE
+
+
+def new_ocr_detail(error: str | None = None) -> dict:
+    """
+    extract_pure_coin_detail 的返回结构：
+      raw: 识别出的纯币（raw）或 None
+      path: direct（小图 rec-only）/ learned（按分辨率学到的小框 rec-only）/
+            cc（连通域定位数字串后 rec-only，不跑检测）/ roi（整张截图 det+rec 级联）/
+            phash（和日志库里确认过的截图近似重复，直接复用当时的值）
+            variant=glyph 表示是字形模板匹配命中的（没跑 PaddleOCR）
+      roi: 命中的 ROI 序号；variant: 命中的预处理名
+      box: 纯币在原图里的像素框 [x1, y1, x2, y2]（learned/roi 才有）
+      score / unit: 命中候选的置信度 / 单位
+      gated: 是否通过提前退出门槛；passes: 实际跑了几次 OCR
+      error: 没跑完时的原因（busy / timeout / crash，见 ocr_pool），正常为 None
+      faults: 级联里抛了异常、被跳过的步骤（direct / learned / cc / rec / det_rec / glyph / prepare / cascade）；
+              有的话没认出来不算“这张图没有值”，不进缓存（见 is_cacheable）
+      phash: path=phash 时 {"dist": 哈希汉明距离, "bits": 总位数, "ink_diff": 墨迹差异, "source": 匹配到的日志文件夹/槽位}
+      reject: 预检直接拒绝的原因（too_small / low_contrast / blurry / no_glyphs），没拒绝为 None
+      quality: 预检测到的指标（contrast / sharpness / glyphs）
+      decode: 解码方式 {"mode": band（只解顶部条带）/ full, "size": [w, h], "rows": 实际解码行数}
+      timings: 各阶段耗时 ms（read / cache / decode / quality / glyph / localize / roi_crop / resize / preprocess / det / rec / det_rec）
+      total_ms: 本次调用总耗时
+      （缓存命中时额外带 cached=mem/disk，见 ocr_cache；其余字段是当初那次识别的记录）
+    """
+    return {
+        "raw": None,
+        "path": None,
+        "roi": None,
+        "variant": None,
+        "box": None,
+        "score": None,
+        "unit": None,
+        "gated": False,
+        "passes": 0,
+        "error": error,
+        "faults": [],
+        "phash": None,
+        "reject": None,
+        "quality": None,
+        "decode": None,
+        "timings": {},
+        "total_ms": None,
+    }
+
+
+def _fault(detail: dict, stage: str):
+    """某一步抛了异常被吞掉（模型加载失败/刚被卸载/rec 出错……）：记下来，级联照常往下走"""
+    faults = detail.setdefault("faults", [])
+    if stage not in faults:
+        faults.append(stage)
+
+
+def is_cacheable(detail: dict) -> bool:
+    """
+    结果能不能进缓存：出错（busy/timeout/crash……）的不行；
+    没认出来的只有级联一步都没出过异常才算“这张图就是没有值”，否则偶发错误会变成永久的未识别
+    """
+    if detail.get("error") is not None:
+        return False
+    return detail.get("raw") is not None or bool(detail.get("reject")) or not detail.get("faults")
+
+
+def _fill_detail(detail: dict, cand, path: str, roi, variant: str):
+    detail.update({
+        "raw": int(cand["raw"]),
+        "path": path,
+        "roi": roi,
+        "variant": variant,
+        "score": float(cand.get("score") or 0.0),
+        "unit": cand.get("unit"),
+        "gated": _passes_gate(cand),
+    })
+
+
+def _pad_box(box, w: int, h: int):
+    """学到的框按文字高度外扩一圈（分辨率相同但 UI 缩放/数字位数可能略有不同）"""
+    x1, y1, x2, y2 = box
+    bh = max(1, y2 - y1)
+    px = int(bh * OCR_ROI_PAD * 2)
+    py = int(bh * OCR_ROI_PAD)
+    return max(0, x1 - px), max(0, y1 - py), min(w, x2 + px), min(h, y2 + py)
+
+
+def _roi_box_to_image(box, roi_x1: int, roi_y1: int):
+    """预处理图坐标（ROI 放大 _ROI_SCALE 倍）-> 原图像素框"""
+    try:
+        xs = [float(p[0]) for p in box]
+        ys = [float(p[1]) for p in box]
+    except Exception:
+        return None
+    return (
+        roi_x1 + int(min(xs) / _ROI_SCALE),
+        roi_y1 + int(min(ys) / _ROI_SCALE),
+        roi_x1 + int(round(max(xs) / _ROI_SCALE)),
+        roi_y1 + int(round(max(ys) / _ROI_SCALE)),
+    )
+
+
+def _learn_from_cand(detail: dict, cand, w: int, h: int, roi_x1: int, roi_y1: int):
+    """级联里通过门槛的候选：记下它在原图的位置，下次同分辨率直接用"""
+    if not cand.get("box"):
+        return
+    box = _roi_box_to_image(cand["box"], roi_x1, roi_y1)
+    if box is None:
+        return
+    detail["box"] = list(box)
+    try:
+        ocr_roi_store.learn_box(w, h, box)
+    except Exception:
+        pass
+
+
+def _phash_keys(img, w: int, h: int, direct: bool):
+    """
+    感知哈希索引的 (kind, 哈希, 墨迹图)；找不到数字串返回 None
+    哈希取纯币区域：纯数字小图整张；整张截图取最紧的 ROI（按比例，缩放过的副本也对得上）
+    墨迹图取区域里最靠左的一串字（连通域定位）
+    """
+    if direct:
+        region = img
+    else:
+        x1, y1, x2, y2 = _roi_pixels(0, w, h)
+        region = img[y1:y2, x1:x2]
+    hv = ocr_phash.coin_hash(region)
+    runs = ocr_glyphs.find_text_runs(region) if hv is not None else None
+    if not runs:
+        return None
+    rx1, ry1, rx2, ry2 = runs[0]
+    ink = ocr_phash.ink_signature(region[ry1:ry2, rx1:rx2])
+    if ink is None:
+        return None
+    return ("small" if direct else "full"), hv, ink
+
+
+def _try_phash(img, w: int, h: int, direct: bool, detail: dict) -> bool:
+    """和确认过的截图近似重复（哈希近 + 墨迹核对通过）：直接复用当时的值"""
+    if not OCR_PHASH_ENABLED:
+        return False
+    try:
+        with _timed(detail, "phash"):
+            keys = _phash_keys(img, w, h, direct)
+            hit = ocr_phash.lookup(*keys) if keys is not None else None
+    except Exception:
+        return False
+    if hit is None:
+        return False
+    ent, dist, diff = hit
+    detail.update({
+        "raw": int(ent["raw"]),
+        "path": "phash",
+        "score": round(1.0 - diff, 4),
+        "gated": True,
+        "phash": {"dist": int(dist), "bits": ocr_phash.HASH_BITS, "ink_diff": round(diff, 4),
+                  "source": ent.get("source")},
+    })
+    return True
+
+
+def harvest_phash(image_input, raw, source: str | None = None, save: bool = True) -> bool:
+    """用户确认过的截图 + 纯币值 -> 收进感知哈希索引（source 记日志文件夹/槽位，界面上提示用）"""
+    try:
+        raw = int(raw)
+    except Exception:
+        return False
+    if raw <= 0:
+        return False
+    # 和识别时同一种解码（可能只有顶部条带）：小图/整张截图的判断两边一致，收进去的才查得到
+    data = _read_bytes(resolve_image_path(image_input) or "")
+    img, w, h = _decode_for_ocr(data, {}) if data is not None else (None, 0, 0)
+    if img is None:
+        return False
+    try:
+        keys = _phash_keys(img, w, h, _is_direct_number_image(img))
+        if keys is None:
+            return False
+        kind, hv, ink = keys
+        return ocr_phash.add(kind, hv, ink, raw, source, save=save)
+    except Exception:
+        return False
+
+
+def _try_glyphs(crop, detail: dict, path: str) -> bool:
+    """字形模板匹配（毫秒级）：认得准且过门槛就直接用，否则返回 False 交给 PaddleOCR"""
+    try:
+        with _timed(detail, "glyph"):
+            r = ocr_glyphs.recognize(crop)
+    except Exception:
+        _fault(detail, "glyph")
+        return False
+    if r is None:
+        return False
+    text, conf = r
+    items = [{"text": text, "score": conf, "cx": None, "box": None}]
+    cand = _pick_leftmost_candidate(_extract_candidates_from_items_raw(items, roi_w=None))
+    if cand is None or not _passes_gate(cand):
+        return False
+    _fill_detail(detail, cand, path, None, "glyph")
+    return True
+
+
+# ✅ ROI 收紧：尽量只覆盖左币，不碰右边 “xxxxx+”
+# 多个兜底：分辨率/缩放不同也能覆盖
+_ROI_BOXES = [
+    (0.68, 0.00, 0.86, 0.16),  # ⭐ 优先：左币区域（推荐）
+    (0.64, 0.00, 0.88, 0.18),  # 兜底：稍大
+    (0.60, 0.00, 0.90, 0.20),  # 最后兜底：可能会带到右边，但我们会“选最左”
+]
+
+
+def _roi_pixels(roi_idx: int, w: int, h: int):
+    x1r, y1r, x2r, y2r = _ROI_BOXES[roi_idx]
+    return max(0, int(w * x1r)), max(0, int(h * y1r)), min(w, int(w * x2r)), min(h, int(h * y2r))
+
+
+def _cc_locate(img, roi_box, detail: dict):
+    """连通域找 ROI 里最靠左的一串字，返回整图坐标的框；找不到返回 None"""
+    rx1, ry1, rx2, ry2 = roi_box
+    with _timed(detail, "localize"):
+        runs = ocr_glyphs.find_text_runs(img[ry1:ry2, rx1:rx2])
+    if not runs:
+        return None
+    x1, y1, x2, y2 = runs[0]
+    return rx1 + x1, ry1 + y1, rx1 + x2, ry1 + y2
+
+
+def _try_learned_roi(ocr_obj, img, detail: dict, w: int, h: int) -> bool:
+    """
+    该分辨率之前学到过纯币位置：裁小框 + rec-only（一批）
+    通过门槛返回 True；否则返回 False，交给完整 ROI 级联
+    """
+    box = ocr_roi_store.get_box(w, h)
+    if box is None:
+        return False
+
+    with _timed(detail, "roi_crop"):
+        x1, y1, x2, y2 = _pad_box(box, w, h)
+        crop = img[y1:y2, x1:x2]
+    if crop.size == 0:
+        return False
+
+    if _try_glyphs(crop, detail, "learned"):
+        detail["box"] = list(box)
+        return True
+
+    variants = _preprocess_variants(crop, detail).head(max(1, OCR_ROI_REC_VARIANTS))
+    per_variant = _rec_variants_batched(ocr_obj, variants, detail) if OCR_BATCH_VARIANTS else None
+    if per_variant is None:
+        per_variant = _rec_variants_sequential(ocr_obj, variants, detail)
+
+    for vname, items in per_variant:
+        cand = _pick_leftmost_candidate(_extract_candidates_from_items_raw(items, roi_w=None))
+        if cand is not None and _passes_gate(cand):
+            _fill_detail(detail, cand, "learned", None, vname)
+            detail["box"] = list(box)
+            return True
+    return False
+
+
+def _try_cc_localized(ocr_obj, img, roi_box, roi_idx: int, detail: dict, w: int, h: int) -> bool:
+    """
+    连通域定位 ROI 里最靠左的一串字 -> 裁紧 -> 字形匹配 / rec-only（一批），完全跳过检测模型
+    通过门槛返回 True（顺便按分辨率记下位置）；否则返回 False，交给 det+rec
+    """
+    box = _cc_locate(img, roi_box, detail)
+    if box is None:
+        return False
+
+    with _timed(detail, "roi_crop"):
+        cx1, cy1, cx2, cy2 = _pad_box(box, w, h)
+        crop = img[cy1:cy2, cx1:cx2]
+    if crop.size == 0:
+        return False
+
+    ok = _try_glyphs(crop, detail, "cc")
+    if not ok:
+        variants = _preprocess_variants(crop, detail).head(max(1, OCR_ROI_REC_VARIANTS))
+        per_variant = _rec_variants_batched(ocr_obj, variants, detail) if OCR_BATCH_VARIANTS else None
+        if per_variant is None:
+            per_variant = _rec_variants_sequential(ocr_obj, variants, detail)
+        for vname, items in per_variant:
+            cand = _pick_leftmost_candidate(_extract_candidates_from_items_raw(items, roi_w=None))
+            if cand is not None and _passes_gate(cand):
+                _fill_detail(detail, cand, "cc", roi_idx, vname)
+                ok = True
+                break
+    if not ok:
+        return False
+
+    detail["roi"] = roi_idx
+    detail["box"] = list(box)
+    try:
+        ocr_roi_store.learn_box(w, h, box)
+    except Exception:
+        pass
+    return True
+
+
+def cache_lookup(image_input, version: str = OCR_PIPELINE_VERSION):
+    """
+    只查缓存不识别：返回 (key, detail|None)；图片读不到返回 (None, None)
+    （进程池在主进程里先查一遍，命中就不用把图发给子进程）
+    version 传 CURRENCY_CACHE_VERSION 查的是 extract_currencies 的缓存
+    """
     real_path = resolve_image_path(image_input)
     if not real_path or not os.path.exists(real_path):
-        return None
+        return None, None
+    data = _read_bytes(real_path)
+    if data is None:
+        return None, None
+    key = _cache_key(data, version)
+    return key, ocr_cache.get(key)
+
+
+def extract_pure_coin_detail(image_input, use_cache: bool = True) -> dict:
+    """
+    识别纯币并返回识别过程信息（见 new_ocr_detail）。
+    先查内容缓存（同一张图重复上传直接返回，结果里 cached=mem/disk）；
+    级联顺序不变，但任一候选通过门槛就立刻返回，不再跑剩余的预处理/ROI。
+    """
+    t0 = time.perf_counter()
+    detail = new_ocr_detail()
+
+    real_path = resolve_image_path(image_input)
+    if not real_path or not os.path.exists(real_path):
+        return detail
 
-    img = _imread_unicode(real_path)
+    with _timed(detail, "read"):
+        data = _read_bytes(real_path)
+    if data is None:
+        return detail
+
+    key = _cache_key(data, OCR_PIPELINE_VERSION)
+    if use_cache:
+        with _timed(detail, "cache"):
+            hit = ocr_cache.get(key)
+        if hit is not None:
+            return hit
+
+    _extract_from_bytes(data, detail)
+    detail["total_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    if use_cache and is_cacheable(detail):
+        ocr_cache.put(key, detail)
+    return detail
+
+
+def _prepare_image(data: bytes, detail: dict):
+    """
+    解码 + 预检：返回 (img, w, h, direct)；解不出来或被预检拒绝返回 None（原因已写进 detail）
+    """
+    with _timed(detail, "decode"):
+        img, w, h = _decode_for_ocr(data, detail)
     if img is None:
         return None
 
-    h, w = img.shape[:2]
+    # 条带只在大横屏上用（宽 >= 1000），尺寸判断不会成立；灰度 std < 40 的判断照旧，看的是解出来的条带
+    direct = _is_direct_number_image(img)
+
+    # 明显没救的图（太小/纯色/糊/区域里没字）：直接拒绝，不跑任何一次 OCR
+    if OCR_QC_ENABLED:
+        try:
+            with _timed(detail, "quality"):
+                detail["reject"] = _quality_check(img, direct, detail, w, h)
+        except Exception:
+            detail["reject"] = None
+        if detail["reject"] is not None:
+            return None
+    return img, w, h, direct
+
+
+def _direct_variants(img, detail: dict):
+    """纯数字小图：放大 4 倍 + 锐化，生成 gray / inv / thr / thr_inv 四个三通道变体（都是新数组）"""
+    with _timed(detail, "resize"):
+        big = cv2.resize(img, None, fx=4.0, fy=4.0, interpolation=cv2.INTER_CUBIC)
+
+    with _timed(detail, "preprocess"):
+        gray = cv2.cvtColor(big, cv2.COLOR_BGR2GRAY)
+        gray = _sharp(gray)
+
+        inv = cv2.bitwise_not(gray)
+        _, thr = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        _, thr_inv = cv2.threshold(inv, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        return [(n, _to_3ch(im)) for (n, im) in (("gray", gray), ("inv", inv), ("thr", thr), ("thr_inv", thr_inv))]
+
+
+def _extract_from_bytes(data: bytes, detail: dict) -> dict:
+    prep = _prepare_image(data, detail)
+    if prep is None:
+        return detail
+    img, w, h, direct = prep
+    if _try_phash(img, w, h, direct, detail):
+        return detail
+    return _extract_from_image(img, w, h, direct, detail)
+
+
+def _extract_from_image(img, w: int, h: int, direct: bool, detail: dict, skip: tuple = ()) -> dict:
+    """
+    完整级联；skip 里的快速通道（"direct" / "learned" / "cc"）调用方已经试过，这里跳过
+    （批处理先把所有图的快速通道拼成一批跑，没过门槛的才进来）
+    """
     ocr = get_ocr()
 
     # =========================
     # 情况 1：纯数字小图（rec-only）
     # =========================
-    if _is_direct_number_image(img):
+    if direct and "direct" not in skip:
+        if _try_glyphs(img, detail, "direct"):
+            return detail
         try:
             ocr_num = get_ocr_num()
-            big = cv2.resize(img, None, fx=4.0, fy=4.0, interpolation=cv2.INTER_CUBIC)
-
-            gray = cv2.cvtColor(big, cv2.COLOR_BGR2GRAY)
-            gray = _sharp(gray)
+            named = _direct_variants(img, detail)
 
-            inv = cv2.bitwise_not(gray)
-            _, thr = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            _, thr_inv = cv2.threshold(inv, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            per_variant = _rec_variants_batched(ocr_num, named, detail) if OCR_BATCH_VARIANTS else None
+            if per_variant is None:
+                per_variant = _rec_variants_sequential(ocr_num, named, detail)
 
-            for candidate_img in (gray, inv, thr, thr_inv):
-                result = _ocr_rec_only(ocr_num, _to_3ch(candidate_img))
-                items = _parse_items_from_result(result)
+            for vname, items in per_variant:
                 cands = _extract_candidates_from_items_raw(items, roi_w=None)
                 if cands:
                     # 小图没有“左右两串”问题，直接取 max
-                    return max(raw for (raw, _cx) in cands)
+                    _fill_detail(detail, max(cands, key=lambda c: c["raw"]), "direct", None, vname)
+                    return detail
         except Exception:
-            pass
+            _fault(detail, "direct")
 
     # =========================
     # 情况 2：整张截图（ROI）
     # 目标：强制只认左边那串 xxxxK
     # =========================
 
-    # ✅ ROI 收紧：尽量只覆盖左币，不碰右边 “xxxxx+”
-    # 多个兜底：分辨率/缩放不同也能覆盖
-    roi_boxes = [
-        (0.68, 0.00, 0.86, 0.16),  # ⭐ 优先：左币区域（推荐）
-        (0.64, 0.00, 0.88, 0.18),  # 兜底：稍大
-        (0.60, 0.00, 0.90, 0.20),  # 最后兜底：可能会带到右边，但我们会“选最左”
-    ]
-
-    best = None
+    # 这个分辨率学过纯币位置：先试小框 rec-only，没过门槛再走完整级联
+    if "learned" not in skip:
+        try:
+            if _try_learned_roi(ocr, img, detail, w, h):
+                return detail
+        except Exception:
+            _fault(detail, "learned")
 
-    for (x1r, y1r, x2r, y2r) in roi_boxes:
-        x1 = max(0, int(w * x1r))
-        y1 = max(0, int(h * y1r))
-        x2 = min(w, int(w * x2r))
-        y2 = min(h, int(h * y2r))
+    for roi_idx in range(len(_ROI_BOXES)):
+        x1, y1, x2, y2 = _roi_pixels(roi_idx, w, h)
 
-        roi = img[y1:y2, x1:x2]
+        with _timed(detail, "roi_crop"):
+            roi = img[y1:y2, x1:x2]
         if roi.size == 0:
             continue
 
-        roi_h, roi_w = roi.shape[:2]
-        variants = _preprocess_variants(roi)
-
-        for _vname, vimg in variants:
+        # 第一个（最紧的）ROI：先用连通域找数字串，裁紧后 rec-only，过门槛就不用跑检测模型
+        if roi_idx == 0 and OCR_CC_LOCALIZE and "cc" not in skip:
             try:
-                result = _ocr_run(ocr, vimg)
+                if _try_cc_localized(ocr, img, (x1, y1, x2, y2), roi_idx, detail, w, h):
+                    return detail
             except Exception:
-                continue
+                _fault(detail, "cc")
+
+        roi_h, roi_w = roi.shape[:2]
+        variants = _preprocess_variants(roi, detail)
 
-            items = _parse_items_from_result(result)
+        per_variant = _ocr_variants_batched(ocr, variants, detail) if OCR_BATCH_VARIANTS else None
+        if per_variant is None:
+            per_variant = _ocr_variants_sequential(ocr, variants, detail)
+
+        for vname, items in per_variant:
             if not items:
                 continue
 
@@ -370,27 +1192,446 @@ def extract_pure_coin_raw(image_input):
                 continue
 
             # ✅ 核心：只取“最靠左”的候选（避免右边数字抽风）
-            cand_raw = _pick_leftmost_candidate(cands)
-            if cand_raw is None:
+            cand = _pick_leftmost_candidate(cands)
+            if cand is None:
                 continue
 
-            # 你也可以加一个“纯币合理范围”防呆（可选）
-            # 例如：纯币通常是 K 计数，raw 至少几千到几亿之间
-            if cand_raw <= 0:
+            if cand["raw"] <= 0:
                 continue
 
-            if best is None:
-                best = cand_raw
-            else:
-                # 多 ROI/多预处理：如果都识别到，优先选“更靠左”逻辑已在 cand_raw 内完成
-                # 这里取更大/更小都可能不稳定，所以保持：优先选第一次成功的（更贴合 ROI 优先级）
-                pass
+            if _passes_gate(cand):
+                # ✅ 足够可靠：直接返回，剩下的预处理/ROI 都不用跑了
+                _fill_detail(detail, cand, "roi", roi_idx, vname)
+                _learn_from_cand(detail, cand, w, h, x1, y1)
+                return detail
 
-        if best is not None:
+            if detail["raw"] is None:
+                # 没过门槛：先记下第一次成功的（更贴合 ROI 优先级），继续找更可靠的
+                _fill_detail(detail, cand, "roi", roi_idx, vname)
+                box = _roi_box_to_image(cand["box"], x1, y1) if cand.get("box") else None
+                detail["box"] = list(box) if box else None
+
+        if detail["raw"] is not None:
             # ROI 优先级：第一组成功就直接返回（减少抽风概率）
-            return best
+            return detail
+
+    return detail
 
-    return best
+
+# ======================
+# 多张图一批（本地 OCR 服务的动态批处理用）
+# ======================
+def _batch_fast_job(img, w: int, h: int, direct: bool, detail: dict):
+    """
+    准备一张图的快速通道：
+    - 字形匹配直接认出来：返回 None（detail 已填好）
+    - 否则返回 job：{model, path, roi, box, named, skip}，named 里的图要和别的图拼一批 rec
+    - 没有快速通道可走（没学过框、连通域也没找到）：返回 {"skip": ()}，直接走完整级联
+    """
+    if direct:
+        if _try_glyphs(img, detail, "direct"):
+            return None
+        return {"model": "num", "path": "direct", "roi": None, "box": None,
+                "named": _direct_variants(img, detail), "skip": ("direct",)}
+
+    box = ocr_roi_store.get_box(w, h)
+    path, roi_idx, skip = "learned", None, ("learned",)
+    if box is None:
+        if not OCR_CC_LOCALIZE:
+            return {"skip": ("learned",)}
+        box = _cc_locate(img, _roi_pixels(0, w, h), detail)
+        if box is None:
+            return {"skip": ("learned",)}
+        path, roi_idx, skip = "cc", 0, ("learned", "cc")
+
+    with _timed(detail, "roi_crop"):
+        cx1, cy1, cx2, cy2 = _pad_box(box, w, h)
+        crop = img[cy1:cy2, cx1:cx2]
+    if crop.size == 0:
+        return {"skip": skip[:1]}
+
+    if _try_glyphs(crop, detail, path):
+        _batch_accept(detail, path, roi_idx, box, w, h)
+        return None
+
+    # 预处理缓冲区按形状复用：同分辨率的几张图会拿到同一块内存，拼批前必须各自拷贝
+    variants = _preprocess_variants(crop, detail).head(max(1, OCR_ROI_REC_VARIANTS))
+    named = [(vname, vimg.copy()) for vname, vimg in variants]
+    return {"model": "main", "path": path, "roi": roi_idx, "box": box, "named": named, "skip": skip}
+
+
+def _batch_accept(detail: dict, path: str, roi_idx, box, w: int, h: int):
+    detail["roi"] = roi_idx
+    detail["box"] = list(box)
+    if path == "cc":
+        try:
+            ocr_roi_store.learn_box(w, h, box)
+        except Exception:
+            pass
+
+
+def _batch_rec(ocr_obj, jobs: list) -> bool:
+    """
+    jobs 里所有变体拼成一次 rec；按 job 依次取第一个可用候选
+    （纯数字小图取 max 不过门槛；裁出来的框要过门槛）
+    批量调用失败返回 False，调用方把这些图都交给完整级联
+    """
+    flat = [(job, vname, vimg) for job in jobs for vname, vimg in job["named"]]
+    if not flat:
+        return True
+    t0 = time.perf_counter()
+    results = _ocr_rec_batch(ocr_obj, [vimg for (_j, _n, vimg) in flat])
+    ms = (time.perf_counter() - t0) * 1000.0
+    for job in jobs:
+        d = job["detail"]
+        d["passes"] += 1
+        d["timings"]["rec"] = round(d["timings"].get("rec", 0.0) + ms, 2)
+    if results is None:
+        return False
+
+    for (job, vname, _vimg), r in zip(flat, results):
+        if job.get("done"):
+            continue
+        d = job["detail"]
+        cands = _extract_candidates_from_items_raw(_parse_items_from_result(r), roi_w=None)
+        if job["path"] == "direct":
+            if cands:
+                _fill_detail(d, max(cands, key=lambda c: c["raw"]), "direct", None, vname)
+                job["done"] = True
+            continue
+        cand = _pick_leftmost_candidate(cands)
+        if cand is not None and _passes_gate(cand):
+            _fill_detail(d, cand, job["path"], job["roi"], vname)
+            _batch_accept(d, job["path"], job["roi"], job["box"], job["w"], job["h"])
+            job["done"] = True
+    return True
+
+
+def extract_pure_coin_batch(datas: list, use_cache: bool = True) -> list:
+    """
+    多张图（bytes）一起识别，返回一一对应的 detail 列表（每个多一个 batch=本批张数）：
+    1) 各自查缓存 / 解码 / 预检 / 字形匹配
+    2) 快速通道（纯数字小图、学到的框、连通域定位）的裁图拼批：数字模型、通用模型各一次 rec
+    3) 没过门槛的各自走完整级联（跳过已经试过的快速通道）
+    单张的结果和 extract_pure_coin_detail 一样
+    """
+    n = len(datas)
+    out = []
+    jobs = []
+    t_start = []
+    for data in datas:
+        t0 = time.perf_counter()
+        detail = new_ocr_detail()
+        detail["batch"] = n
+        out.append(detail)
+        t_start.append(t0)
+        if not data:
+            continue
+
+        key = _cache_key(data, OCR_PIPELINE_VERSION)
+        if use_cache:
+            with _timed(detail, "cache"):
+                hit = ocr_cache.get(key)
+            if hit is not None:
+                out[-1] = hit
+                continue
+
+        job = {"detail": detail, "key": key, "prep": None}
+        jobs.append(job)
+        try:
+            job["prep"] = _prepare_image(data, detail)
+            if job["prep"] is not None:
+                img, w, h, direct = job["prep"]
+                job.update(w=w, h=h)
+                fast = None if _try_phash(img, w, h, direct, detail) else _batch_fast_job(img, w, h, direct, detail)
+                if fast is None:
+                    job["done"] = True
+                else:
+                    job.update(fast)
+        except Exception:
+            _fault(detail, "prepare")
+            job["skip"] = ()
+
+    for model, get_model in (("num", get_ocr_num), ("main", get_ocr)):
+        group = [j for j in jobs if j.get("model") == model and not j.get("done")]
+        if not group:
+            continue
+        try:
+            ok = _batch_rec(get_model(), group)
+        except Exception:
+            ok = False
+        if not ok:
+            for j in group:
+                j["skip"] = ()
+
+    for job in jobs:
+        detail = job["detail"]
+        if job["prep"] is not None and not job.get("done"):
+            img, w, h, direct = job["prep"]
+            try:
+                _extract_from_image(img, w, h, direct, detail, skip=job.get("skip") or ())
+            except Exception:
+                _fault(detail, "cascade")
+
+    for i, detail in enumerate(out):
+        if detail.get("cached"):
+            continue
+        detail["total_ms"] = round((time.perf_counter() - t_start[i]) * 1000.0, 2)
+    if use_cache:
+        for job in jobs:
+            if is_cacheable(job["detail"]):
+                ocr_cache.put(job["key"], {k: v for k, v in job["detail"].items() if k != "batch"})
+    return out
+
+
+# ======================
+# 多货币（顶部货币栏一次 det+rec）
+# ======================
+# extract_currencies 的缓存版本（和纯币结果分开存）
+CURRENCY_CACHE_VERSION = f"{OCR_PIPELINE_VERSION}-cur"
+
+# 顶部货币栏放大倍数（栏比纯币 ROI 宽得多，放大少一点）
+_HEADER_SCALE = 2.0
+
+_RE_CURRENCY = re.compile(r"([0-9][0-9,\.]*)\s*([kKwW万mM])?")
+
+
+def _parse_currency_token(text: str) -> int | None:
+    """
+    货币栏里的一个数字：12,345K / 64.7w / 3,000+（+ 是充值按钮）/ 120
+    返回 raw（带单位的乘上去），不是数字返回 None
+    """
+    s = (text or "").strip()
+    s = (s.replace("，", ",").replace("＋", "+")
+          .replace("Ｋ", "K").replace("ｋ", "k")
+          .replace("Ｗ", "W").replace("ｗ", "w")
+          .replace("Ｍ", "M").replace("ｍ", "m"))
+    s = s.rstrip("+ ")
+    m = _RE_CURRENCY.fullmatch(s.replace(" ", ""))
+    if not m:
+        return None
+    try:
+        num = _parse_num_token(m.group(1))
+    except Exception:
+        return None
+    unit = (m.group(2) or "").lower()
+    mul = {"k": 1_000, "w": 10_000, "万": 10_000, "m": 1_000_000}.get(unit, 1)
+    return int(round(num * mul))
+
+
+def new_currencies_result(error: str | None = None) -> dict:
+    """
+    extract_currencies 的返回结构：
+      fields: 从左到右识别到的货币 [{"name", "item", "raw", "text", "score", "box"}]
+              name/item 按 config.OCR_CURRENCY_FIELDS 的顺序对上（多出来的数字 name/item 为 None）
+              box 是原图像素框 [x1, y1, x2, y2]
+      texts: 货币栏里检测到的全部文字（含不是数字的），排查用
+      band: 货币栏在原图里的像素框；passes / timings / total_ms / error 同 new_ocr_detail
+    """
+    return {
+        "fields": [],
+        "texts": [],
+        "band": None,
+        "passes": 0,
+        "error": error,
+        "timings": {},
+        "total_ms": None,
+    }
+
+
+def extract_currencies(image_input, use_cache: bool = True) -> dict:
+    """
+    整张截图的顶部货币栏跑一次 det+rec，返回所有货币数字和位置（见 new_currencies_result）
+    纯数字小图没有货币栏：fields 为空
+    """
+    t0 = time.perf_counter()
+    res = new_currencies_result()
+
+    real_path = resolve_image_path(image_input)
+    if not real_path or not os.path.exists(real_path):
+        return res
+    with _timed(res, "read"):
+        data = _read_bytes(real_path)
+    if data is None:
+        return res
+    return extract_currencies_from_bytes(data, use_cache, res, t0)
+
+
+def extract_currencies_from_bytes(data: bytes, use_cache: bool = True, res: dict | None = None, t0: float | None = None) -> dict:
+    """extract_currencies 的 bytes 版（本地 OCR 服务收到的是图片内容，不是路径）"""
+    if t0 is None:
+        t0 = time.perf_counter()
+    if res is None:
+        res = new_currencies_result()
+
+    key = _cache_key(data, CURRENCY_CACHE_VERSION)
+    if use_cache:
+        with _timed(res, "cache"):
+            hit = ocr_cache.get(key)
+        if hit is not None:
+            return hit
+
+    _extract_currencies_from_bytes(data, res)
+    res["total_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    if use_cache and res.get("error") is None:
+        ocr_cache.put(key, res)
+    return res
+
+
+def _extract_currencies_from_bytes(data: bytes, res: dict) -> dict:
+    scratch = {}
+    with _timed(res, "decode"):
+        img, w, h = _decode_for_ocr(data, scratch)
+    if img is None:
+        return res
+    if _is_direct_number_image(img):
+        return res
+
+    x1r, y1r, x2r, y2r = OCR_CURRENCY_BAND
+    bx1, by1 = int(w * x1r), int(h * y1r)
+    bx2, by2 = int(w * x2r), int(h * y2r)
+    band = img[by1:by2, bx1:bx2]
+    if band.size == 0:
+        return res
+    res["band"] = [bx1, by1, bx2, by2]
+
+    with _timed(res, "resize"):
+        big = cv2.resize(band, None, fx=_HEADER_SCALE, fy=_HEADER_SCALE, interpolation=cv2.INTER_CUBIC)
+
+    res["passes"] += 1
+    try:
+        with _timed(res, "det_rec"):
+            result = _ocr_run(get_ocr(), big)
+    except Exception:
+        # 模型加载失败/被卸载/det_rec 出错：标成出错，别把空 fields 当结果缓存下来
+        res["error"] = "crash"
+        return res
+
+    tokens = []
+    for it in _parse_items_from_result(result):
+        box = None
+        if it.get("box"):
+            try:
+                xs = [float(p[0]) for p in it["box"]]
+                ys = [float(p[1]) for p in it["box"]]
+                box = [
+                    bx1 + int(min(xs) / _HEADER_SCALE), by1 + int(min(ys) / _HEADER_SCALE),
+                    bx1 + int(round(max(xs) / _HEADER_SCALE)), by1 + int(round(max(ys) / _HEADER_SCALE)),
+                ]
+            except Exception:
+                box = None
+        text = it.get("text") or ""
+        res["texts"].append({"text": text, "score": round(float(it.get("score") or 0.0), 4), "box": box})
+
+        raw = _parse_currency_token(text)
+        if raw is not None and box is not None:
+            tokens.append((box[0], text, raw, float(it.get("score") or 0.0), box))
+
+    tokens.sort(key=lambda t: t[0])
+    for i, (_x, text, raw, score, box) in enumerate(tokens):
+        name, item = OCR_CURRENCY_FIELDS[i] if i < len(OCR_CURRENCY_FIELDS) else (None, None)
+        res["fields"].append({
+            "name": name,
+            "item": item,
+            "raw": raw,
+            "text": text,
+            "score": round(score, 4),
+            "box": box,
+        })
+    return res
+
+
+def harvest_glyphs(image_input, raw) -> int:
+    """
+    用户确认过的截图 + 纯币值 -> 给字形模板库加样本（只收 K 计数的值，如 12,345K）
+    整张截图用该分辨率学到的纯币框；还没学到框就跳过
+    返回收录的字数
+    """
+    try:
+        raw = int(raw)
+    except Exception:
+        return 0
+    if raw <= 0 or raw % 1000 != 0:
+        return 0
+
+    img = _imread_unicode(resolve_image_path(image_input) or "")
+    if img is None:
+        return 0
+
+    if _is_direct_number_image(img):
+        crop = img
+    else:
+        h, w = img.shape[:2]
+        box = ocr_roi_store.get_box(w, h)
+        if box is None:
+            return 0
+        x1, y1, x2, y2 = _pad_box(box, w, h)
+        crop = img[y1:y2, x1:x2]
+
+    try:
+        return ocr_glyphs.harvest(crop, f"{raw // 1000}K")
+    except Exception:
+        return 0
+
+
+def record_metrics(detail: dict) -> None:
+    """把一次识别结果累加进进程内指标（进程池模式下由主进程对返回结果调用）"""
+    if not isinstance(detail, dict):
+        return
+    with _METRICS_LOCK:
+        m = _METRICS
+        m["calls"] += 1
+        if detail.get("error"):
+            m["errors"] += 1
+            return
+        if detail.get("cached"):
+            m["cached"] += 1
+            return
+        if detail.get("raw") is not None:
+            m["recognized"] += 1
+        if detail.get("reject"):
+            m["rejected"] += 1
+        m["passes"] += int(detail.get("passes") or 0)
+
+        path = detail.get("path") or "none"
+        m["by_path"][path] = m["by_path"].get(path, 0) + 1
+
+        stages = dict(detail.get("timings") or {})
+        if detail.get("total_ms") is not None:
+            stages["total"] = detail["total_ms"]
+        for stage, ms in stages.items():
+            st = m["stages"].setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            st["count"] += 1
+            st["total_ms"] += float(ms)
+            st["max_ms"] = max(st["max_ms"], float(ms))
+
+
+def ocr_metrics() -> dict:
+    """进程内 OCR 指标快照：调用数/命中路径/平均 passes/各阶段平均与最大耗时"""
+    with _METRICS_LOCK:
+        m = _METRICS
+        fresh = m["calls"] - m["errors"] - m["cached"]
+        return {
+            "calls": m["calls"],
+            "recognized": m["recognized"],
+            "cached": m["cached"],
+            "errors": m["errors"],
+            "rejected": m["rejected"],
+            "avg_passes": round(m["passes"] / fresh, 2) if fresh else 0.0,
+            "by_path": dict(m["by_path"]),
+            "stages": {
+                k: {
+                    "count": v["count"],
+                    "avg_ms": round(v["total_ms"] / v["count"], 2) if v["count"] else 0.0,
+                    "max_ms": round(v["max_ms"], 2),
+                }
+                for k, v in m["stages"].items()
+            },
+        }
+
+
+def extract_pure_coin_raw(image_input):
+    return extract_pure_coin_detail(image_input)["raw"]
 
 
 def extract_pure_coin_k(image_input):
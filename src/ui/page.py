@@ -9,9 +9,9 @@ import time
 import random
 
 from .pages import picker
-from src.config import PAGE_SIZE, OCR_HINT_IMAGE
+from src.config import PAGE_SIZE, OCR_HINT_IMAGE, OCR_POOL_MAX_PENDING
 from src.services.logs_service import make_log_table_meta, make_log_table_page_meta
-from src.services.ocr_service import extract_pure_coin_raw
+from src.services import ocr_jobs, ocr_pool
 from src.ui.pages.common import show_pages, home_stats_text
 from src.services import logs_service
 from src.services import finance_service
@@ -140,6 +140,8 @@ def build_app(css: str):
             return 1
 
     def goto_settlement():
+        # 马上要传截图了：模型可能已经空闲卸载，先在后台加载
+        ocr_pool.prewarm()
         return show_pages(False, True, False, False, False, False, False)
 
     def back_to_home():
@@ -161,26 +163,90 @@ def build_app(css: str):
         return show_pages(False, True, False, False, False, False, False)
 
     # ======================
-    # OCR 预览
+    # OCR 预览（两步：先登记任务立刻显示“识别中”，再等结果；同槽位新图会作废旧任务）
     # ======================
-    def ocr_preview(image_path: str):
+    def _ocr_start(slot: str, image_path: str, request: gr.Request):
         hint_img_exists = os.path.exists(OCR_HINT_IMAGE)
+        session = request.session_hash if request is not None else ""
 
         if not image_path:
-            return None, "未识别", "", gr.update(visible=False, value=OCR_HINT_IMAGE if hint_img_exists else None)
+            ocr_jobs.cancel(session, slot)
+            return None, "未识别", "", gr.update(visible=False, value=OCR_HINT_IMAGE if hint_img_exists else None), None, None
 
-        v_raw = extract_pure_coin_raw(image_path)
+        gen = ocr_jobs.start(session, slot, image_path)
+        return None, "⏳ 识别中…", "", gr.update(visible=False), None, gen
+
+    def _ocr_finish(slot: str, image_path: str, gen, request: gr.Request):
+        session = request.session_hash if request is not None else ""
+        if not image_path or gen is None:
+            return (gr.skip(),) * 5
+
+        detail = ocr_jobs.wait(session, slot, gen)
+        if detail is None:
+            # 已经被新上传的图顶掉：界面交给新任务去更新
+            return (gr.skip(),) * 5
+        if detail.get("raw") is not None and detail.get("path") != "direct":
+            # 顺手在后台把顶部货币栏也识别了（确认写日志时要记）
+            ocr_jobs.prefetch_currencies(image_path)
+        return ocr_preview_from_detail(detail)
+
+    def ocr_start_up(image_path: str, request: gr.Request):
+        return _ocr_start("up", image_path, request)
+
+    def ocr_start_down(image_path: str, request: gr.Request):
+        return _ocr_start("down", image_path, request)
+
+    def ocr_finish_up(image_path: str, gen, request: gr.Request):
+        return _ocr_finish("up", image_path, gen, request)
+
+    def ocr_finish_down(image_path: str, gen, request: gr.Request):
+        return _ocr_finish("down", image_path, gen, request)
+
+    def ocr_on_session_end(request: gr.Request):
+        # 页面关掉了：还在排队的任务不用跑了
+        if request is not None:
+            ocr_jobs.cancel(request.session_hash)
+
+    def ocr_preview_from_detail(detail: dict):
+        hint_img_exists = os.path.exists(OCR_HINT_IMAGE)
+        err = detail.get("error")
+        if err in ("busy", "timeout", "crash"):
+            busy_md = {
+                "busy": "⏳ **识别排队已满**，请稍等几秒后重新上传这张截图。  \n",
+                "timeout": "⏳ **识别超时**，请重新上传（或裁剪右上角纯币区域后再传）。  \n",
+                "crash": "⚠️ **识别进程异常**，已自动重启，请重新上传。  \n",
+            }[err]
+            return None, "⚠️ 识别未完成", busy_md, gr.update(visible=False), detail
+
+        reject = detail.get("reject")
+        if reject:
+            reject_md = {
+                "too_small": "⚠️ **图片太小**，请上传原始截图（或右上角纯币区域的清晰截图）。  \n",
+                "low_contrast": "⚠️ **纯币区域几乎是纯色**（截图过暗/全黑/全白？），请重新截图。  \n",
+                "blurry": "⚠️ **纯币区域太模糊**，请上传原图（不要压缩/缩小），确保数字清晰。  \n",
+                "no_glyphs": "⚠️ **右上角没有找到数字**，请确认截的是带纯币的界面，或直接裁剪纯币区域上传。  \n",
+            }.get(reject, "⚠️ **图片无法识别**，请重新截图。  \n")
+            img_upd = gr.update(visible=True, value=OCR_HINT_IMAGE) if hint_img_exists else gr.update(visible=False)
+            return None, "⚠️ 未识别到纯币", reject_md, img_upd, detail
+
+        v_raw = detail.get("raw")
         if v_raw is None:
             fail_md = (
                 "⚠️ **未识别到纯币**（右上角数字区域）  \n"
                 "建议：**裁剪/放大右上角纯币区域**，确保数字清晰不糊、不要被图标遮挡。  \n"
             )
             img_upd = gr.update(visible=True, value=OCR_HINT_IMAGE) if hint_img_exists else gr.update(visible=False)
-            return None, "⚠️ 未识别到纯币", fail_md, img_upd
+            return None, "⚠️ 未识别到纯币", fail_md, img_upd, detail
 
-        return int(v_raw), f"✅ 识别成功：{format_money(v_raw)}", "", gr.update(
+        reuse_md = ""
+        ph = detail.get("phash") if detail.get("path") == "phash" else None
+        if ph:
+            src = logs_service.dir_to_display_time(str(ph.get("source") or "").split("/")[0]) or "历史记录"
+            reuse_md = f"♻️ 和 {src} 的截图几乎一样（差异 {ph.get('dist')}/{ph.get('bits')}），直接沿用当时确认的值，请核对。  \n"
+
+        return int(v_raw), f"✅ 识别成功：{format_money(v_raw)}", reuse_md, gr.update(
             visible=False, value=OCR_HINT_IMAGE if hint_img_exists else None
-        )
+        ), detail
 
     # ======================
     # 提交确认文本
@@ -198,6 +264,23 @@ def build_app(css: str):
 
         prepay_yuan = float(finance_service.get_prepayment_total() or 0)
 
+        # 提交记录（ledger）的结构化字段：和确认页文本同一份数据，写日志时原样存下
+        # 结算页是“总计: xxx”时解析不出明细：ledger.make_record 看到“明细为空、总价不为 0”会标成只有总价
+        try:
+            reserve_items, _ = reserve_manager.parse_settlement_reserve_text(reserve_expr_raw)
+        except Exception:
+            reserve_items = []
+        record = {
+            "up_raw": None if up_raw is None else int(up_raw),
+            "down_raw": None if down_raw is None else int(down_raw),
+            "reserve_items": [{"name": n, "qty": int(q), "unit_raw": int(p)} for n, q, p in reserve_items],
+            "reserve_total_raw": int(reserve_total_raw_int),
+            "change_raw": None,
+            "yuan": None,
+            "prepay_yuan": round(prepay_yuan, 2),
+            "settlement_yuan": None,
+        }
+
         if up_raw is None or down_raw is None:
             msg = (
                 "注意，以下是最终提交的日志，请阅读后确保没有任何问题。\n"
@@ -227,12 +310,18 @@ def build_app(css: str):
                 f"预付款：{prepay_yuan:.2f}元\n"
                 f"结算金额：{settlement_yuan:.2f}元\n"
             )
+            record.update(
+                change_raw=int(diff_with_reserve_raw),
+                yuan=round(change_yuan, 2),
+                settlement_yuan=round(settlement_yuan, 2),
+            )
 
         p1, p2, p3, p4, p5, p6, p7 = goto_confirm()
         return (
             gr.update(value=msg),
             gr.update(interactive=has_both_imgs),
             gr.update(value=""),
+            record,
             p1, p2, p3, p4, p5, p6, p7
         )
 
@@ -491,6 +580,11 @@ def build_app(css: str):
         reserve_raw_state = gr.State("无")
         up_coin_state = gr.State(None)
         down_coin_state = gr.State(None)
+        up_ocr_state = gr.State(None)      # OCR 识别过程（写 ocr.json 用）
+        down_ocr_state = gr.State(None)
+        up_job_state = gr.State(None)      # 当前 OCR 任务号（旧任务的结果据此丢弃）
+        down_job_state = gr.State(None)
+        ledger_record_state = gr.State(None)  # 确认页对应的结构化提交记录（ledger）
         log_meta_state = gr.State(init_meta)
         last_day_state = gr.State(_today_key())
 
@@ -562,6 +656,8 @@ def build_app(css: str):
                 w2["down_fail_hint"],
                 w2["up_hint_img"],
                 w2["down_hint_img"],
+                up_ocr_state,
+                down_ocr_state,
             ],
         ).then(
             fn=lambda: False,
@@ -586,15 +682,32 @@ def build_app(css: str):
 
         w2["btn_back_home"].click(fn=back_to_home, outputs=[page1, page2, page3, page4, page5, page6, page7])
 
-        w2["img_up"].change(fn=ocr_preview, inputs=w2["img_up"],
-                            outputs=[up_coin_state, w2["up_coin_preview"], w2["up_fail_hint"], w2["up_hint_img"]])
-        w2["img_down"].change(fn=ocr_preview, inputs=w2["img_down"],
-                              outputs=[down_coin_state, w2["down_coin_preview"], w2["down_fail_hint"], w2["down_hint_img"]])
+        # ✅ OCR 在进程池里跑：handler 只是提交+等待，放开并发（真正的上限由进程池排队名额控制）
+        # 第一步只登记任务、显示“识别中”（不占 OCR 并发名额）；第二步等结果，上号/下号两张图同时识别
+        w2["img_up"].change(
+            fn=ocr_start_up, inputs=w2["img_up"],
+            outputs=[up_coin_state, w2["up_coin_preview"], w2["up_fail_hint"], w2["up_hint_img"], up_ocr_state, up_job_state],
+            concurrency_limit=None,
+        ).then(
+            fn=ocr_finish_up, inputs=[w2["img_up"], up_job_state],
+            outputs=[up_coin_state, w2["up_coin_preview"], w2["up_fail_hint"], w2["up_hint_img"], up_ocr_state],
+            concurrency_id="ocr", concurrency_limit=OCR_POOL_MAX_PENDING,
+        )
+        w2["img_down"].change(
+            fn=ocr_start_down, inputs=w2["img_down"],
+            outputs=[down_coin_state, w2["down_coin_preview"], w2["down_fail_hint"], w2["down_hint_img"], down_ocr_state, down_job_state],
+            concurrency_limit=None,
+        ).then(
+            fn=ocr_finish_down, inputs=[w2["img_down"], down_job_state],
+            outputs=[down_coin_state, w2["down_coin_preview"], w2["down_fail_hint"], w2["down_hint_img"], down_ocr_state],
+            concurrency_id="ocr", concurrency_limit=OCR_POOL_MAX_PENDING,
+        )
+        demo.unload(fn=ocr_on_session_end)
 
         w2["btn_submit"].click(
             fn=submit_with_ocr,
             inputs=[w2["img_up"], w2["img_down"], up_coin_state, down_coin_state, reserve_raw_state],
-            outputs=[w3["confirm_text"], w3["btn_confirm"], w3["remark"],
+            outputs=[w3["confirm_text"], w3["btn_confirm"], w3["remark"], ledger_record_state,
                      page1, page2, page3, page4, page5, page6, page7],
         )
 
@@ -602,13 +715,28 @@ def build_app(css: str):
 
         _RE_YUAN = re.compile(r"本次折合(?:\s*[:：])?\s*([0-9]+(?:\.[0-9]+)?)\s*元")
 
-        def on_confirm_write_log(img_up_path, img_down_path, confirm_text, remark):
-            logs_service.save_submit_log(
+        def on_confirm_write_log(img_up_path, img_down_path, up_raw, down_raw, up_ocr, down_ocr, confirm_text, remark,
+                                 ledger_record):
+            cur_paths = {"up": img_up_path, "down": img_down_path}
+            out_dir = logs_service.save_submit_log(
                 up_img_path=img_up_path,
                 down_img_path=img_down_path,
                 log_text=confirm_text,
                 remark=remark or "",
+                ocr_info={
+                    "up": up_ocr,
+                    "down": down_ocr,
+                    # 只拿已经预取好的；还没好的写日志后在后台补进 ocr.json（确认不等 OCR）
+                    "currencies": ocr_jobs.currencies_ready(cur_paths),
+                },
+                record=ledger_record if isinstance(ledger_record, dict) else None,
             )
+            ocr_jobs.fill_currencies_later(cur_paths, Path(out_dir) / "ocr.json")
+            # ✅ 用户确认过的截图 + 纯币值：喂给字形模板库（下次同字体直接模板匹配，不跑 PaddleOCR）
+            #    + 感知哈希索引（下一局传同一张/压缩过的副本直接复用）；后台做，用日志目录里的副本
+            for slot, path, raw in (("up", img_up_path, up_raw), ("down", img_down_path, down_raw)):
+                if path and raw is not None:
+                    ocr_jobs.harvest_later(str(Path(out_dir) / f"{slot}.png"), raw, f"{Path(out_dir).name}/{slot}")
             try:
                 m = _RE_YUAN.search(confirm_text or "")
                 if m:
@@ -620,7 +748,8 @@ def build_app(css: str):
 
         w3["btn_confirm"].click(
             fn=on_confirm_write_log,
-            inputs=[w2["img_up"], w2["img_down"], w3["confirm_text"], w3["remark"]],
+            inputs=[w2["img_up"], w2["img_down"], up_coin_state, down_coin_state, up_ocr_state, down_ocr_state,
+                    w3["confirm_text"], w3["remark"], ledger_record_state],
             outputs=[page1, page2, page3, page4, page5, page6, page7],
         ).then(
             fn=refresh_after_confirm_and_pick_audio,
@@ -809,6 +938,10 @@ def build_app(css: str):
                              outputs=[w6["more_table"], w6["more_info"], w6["more_page_state"], w6["more_meta_state"]])
         w6["btn_next"].click(fn=logs_more.more_next, inputs=[w6["more_page_state"]],
                              outputs=[w6["more_table"], w6["more_info"], w6["more_page_state"], w6["more_meta_state"]])
+        w6["btn_jump"].click(fn=logs_more.more_jump, inputs=[w6["jump_date"]],
+                             outputs=[w6["more_table"], w6["more_info"], w6["more_page_state"], w6["more_meta_state"]])
+        w6["jump_date"].submit(fn=logs_more.more_jump, inputs=[w6["jump_date"]],
+                               outputs=[w6["more_table"], w6["more_info"], w6["more_page_state"], w6["more_meta_state"]])
 
         w6["more_table"].select(
             fn=log_detail.open_log_detail,
@@ -1,38 +1,31 @@
 # src/ui/pages/logs_more.py
 import gradio as gr
-from src.services.logs_service import make_log_table_page_meta
+from src.services.logs_service import make_log_table_cursor_meta, make_log_table_date_meta
 
 
-def open_more_page():
-    rows, metas, info, page = make_log_table_page_meta(page=1)
+def _out(rows, metas, info, state):
     return (
         gr.update(value=rows),
         gr.update(value=info),
-        1,
+        state,
         metas,
     )
 
 
-def more_prev(page: int):
-    page = int(page or 1) - 1
-    rows, metas, info, page = make_log_table_page_meta(page=page)
-    return (
-        gr.update(value=rows),
-        gr.update(value=info),
-        page,
-        metas,
-    )
+def open_more_page():
+    return _out(*make_log_table_cursor_meta(None, "first"))
 
 
-def more_next(page: int):
-    page = int(page or 1) + 1
-    rows, metas, info, page = make_log_table_page_meta(page=page)
-    return (
-        gr.update(value=rows),
-        gr.update(value=info),
-        page,
-        metas,
-    )
+def more_prev(state):
+    return _out(*make_log_table_cursor_meta(state, "prev"))
+
+
+def more_next(state):
+    return _out(*make_log_table_cursor_meta(state, "next"))
+
+
+def more_jump(date_text: str):
+    return _out(*make_log_table_date_meta(date_text))
 
 
 def build(init_rows):
@@ -49,13 +42,18 @@ def build(init_rows):
             wrap=True,
         )
 
-        more_page_state = gr.State(1)
+        # 翻页游标：{"first", "last", "offset"}（logs_service.make_log_table_cursor_meta）
+        more_page_state = gr.State({})
         more_meta_state = gr.State([])
 
         with gr.Row(elem_classes=["center-btn"]):
             btn_prev = gr.Button("上一页")
             btn_next = gr.Button("下一页")
 
+        with gr.Row(elem_classes=["center-btn"]):
+            jump_date = gr.Textbox(label="跳到日期", placeholder="例如 2026-02-07")
+            btn_jump = gr.Button("跳转")
+
         with gr.Row(elem_classes=["center-btn"]):
             btn_more_back = gr.Button("返回主页")
 
@@ -66,5 +64,7 @@ def build(init_rows):
         "more_meta_state": more_meta_state,
         "btn_prev": btn_prev,
         "btn_next": btn_next,
+        "jump_date": jump_date,
+        "btn_jump": btn_jump,
         "btn_more_back": btn_more_back,
     }
@@ -19,6 +19,8 @@ def reset_settlement_ui():
         gr.update(value=""),        # down_fail_hint
         gr.update(visible=False, value=OCR_HINT_IMAGE if hint_img_exists else None),  # up_hint_img
         gr.update(visible=False, value=OCR_HINT_IMAGE if hint_img_exists else None),  # down_hint_img
+        None,                   # up_ocr_state
+        None,                   # down_ocr_state
     )
 
 
@@ -0,0 +1,65 @@
+# tools/check_ocr_glyphs.py
+# 字形模板快速通道的回归检查（不需要 PaddleOCR / 日志库，临时模板库，不动 data/ocr_glyphs.npz）：
+#   python tools/check_ocr_glyphs.py
+# 用 make_ocr_fixtures 的数字条画图：
+#   - 留了边的图要认对
+#   - 裁得太紧（首位/末位贴边）的图必须返回 None 交给 PaddleOCR，不能少一位还“很有把握”
+# 有一项不对就退出码 1
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.services import ocr_glyphs  # noqa: E402
+from tools.make_ocr_fixtures import render  # noqa: E402
+
+# 收模板用（合起来覆盖 0-9 和 K）
+_HARVEST = [1234567, 890, 54321, 9876]
+
+# (k 值, 裁法)
+_CASES = [
+    (7654321, ""),
+    (7654321, "left"),
+    (7654321, "right"),
+    (20480, "both"),
+]
+
+
+def _tight(img, side: str):
+    """把首位/末位那个字的外侧边距裁掉（字贴着边），side: left / right / both"""
+    cols = (img.max(axis=(0, 2)) > 128).nonzero()[0]
+    x1, x2 = int(cols[0]), int(cols[-1]) + 1
+    if side in ("left", "both"):
+        img = img[:, x1:]
+        x2 -= x1
+    if side in ("right", "both"):
+        img = img[:, :x2]
+    return img
+
+
+def main() -> int:
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        ocr_glyphs.OCR_GLYPH_BANK_PATH = str(Path(tmp) / "glyphs.npz")
+        for i, k in enumerate(_HARVEST):
+            ocr_glyphs.harvest(render(k, 1.0, 2, "", seed=i), f"{k}K")
+        missing = ocr_glyphs.missing_labels()
+        if missing:
+            print(f"❌ 临时模板库缺字：{missing}")
+            return 1
+
+        for k, side in _CASES:
+            img = render(k, 1.0, 2, "", seed=0)
+            if side:
+                img = _tight(img, side)
+            r = ocr_glyphs.recognize(img)
+            want = f"{k:,}K"
+            ok = (r is None) if side else (r is not None and r[0] == want)
+            failed += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} {want} 裁法={side or '留边'} -> {r}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# tools/ledger_backfill.py
+# 把已有日志（data/logs/<ts>/log.txt + up.png / down.png）补进结构化提交记录（data/ledger.jsonl）：
+#   python tools/ledger_backfill.py                # 补所有还没记录的文件夹
+#   python tools/ledger_backfill.py --dry-run      # 只解析统计，不写
+#   python tools/ledger_backfill.py --workers 8
+#
+# 已经在 ledger 里的文件夹跳过（可以重复跑/中断后接着跑）；app 同时在写也没关系（都是 O_APPEND 追加）
+# 每个文件夹：读 log.txt 解析一次 + 两张截图算 sha256；线程池并行（读文件/哈希都会释放 GIL）
+# 按时间顺序分块追加，每块一次 write
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import LOG_DIR, LEDGER_PATH  # noqa: E402
+from src.services import ledger, logs_service  # noqa: E402
+
+_CHUNK = 256
+
+
+def _record_for_dir(base: Path, d: str):
+    try:
+        text = (base / d / "log.txt").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    fields = logs_service.parse_log_record(text)
+    return ledger.make_record(d, base / d, fields, fields["remark"], source="backfill")
+
+
+def backfill(base: Path, out: str, workers: int, dry_run: bool = False) -> dict:
+    done = ledger.recorded_dirs(out)
+    dirs = sorted(d for d in os.listdir(base) if (base / d).is_dir() and d not in done) if base.exists() else []
+    st = {"pending": len(dirs), "written": 0, "skipped": len(done), "no_log": 0, "no_change": 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        for i in range(0, len(dirs), _CHUNK):
+            recs = list(ex.map(lambda d: _record_for_dir(base, d), dirs[i:i + _CHUNK]))
+            st["no_log"] += sum(1 for r in recs if r is None)
+            recs = [r for r in recs if r is not None]
+            st["no_change"] += sum(1 for r in recs if r["change_raw"] is None)
+            st["written"] += len(recs) if dry_run else ledger.append_many(recs, out)
+            print(f"  {min(i + _CHUNK, len(dirs))}/{len(dirs)}", flush=True)
+    return st
+
+
+def main():
+    ap = argparse.ArgumentParser(description="把已有日志补进结构化提交记录（ledger.jsonl）")
+    ap.add_argument("--logs-dir", default=LOG_DIR)
+    ap.add_argument("--out", default=LEDGER_PATH)
+    ap.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    ap.add_argument("--dry-run", action="store_true", help="只解析统计，不写")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    st = backfill(Path(args.logs_dir), args.out, args.workers, args.dry_run)
+    print(f"✅ {'（试运行，没有写）' if args.dry_run else ''}新写入 {st['written']} 条，已有 {st['skipped']} 条跳过，"
+          f"没有 log.txt {st['no_log']} 个，解析不出本次变化 {st['no_change']} 条，用时 {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
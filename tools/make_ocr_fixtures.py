@@ -0,0 +1,145 @@
+# tools/make_ocr_fixtures.py
+# 生成纯币 OCR 基准的固定语料（tools/ocr_bench_fixtures/，已提交到仓库）：
+#   python tools/make_ocr_fixtures.py
+#   python tools/ocr_bench.py --corpus tools/ocr_bench_fixtures
+#
+# 图都是程序画的，标签是精确值（tol=0），不依赖日志库、也不会被感知哈希索引命中自己：
+# - small：只截了数字的“12,345K”数字条（亮字暗底，和游戏里纯币的样子一致）；
+#   覆盖不同字号、字体粗细、位数、模糊、JPEG 压缩、轻微噪点
+# - full：整张横屏截图（2400x1080 / 1800x810，都 >= 1MP 的 PNG，会走只解顶部条带的解码）：
+#   顶部 HUD 条 + 货币栏；纯币串画在 ocr_service._ROI_BOXES[0] 里（前面一个币图标），
+#   同一个 ROI 里右边紧跟一个干扰数字（充值按钮“3,000+”之类），ROI 外左边还有一个别的货币；
+#   学到的 ROI / 连通域定位 / ROI det+rec 级联 / 条带解码都会跑到
+# 真实截图不能提交（有账号信息）：要真实语料请用 ocr_bench.py --build-from-logs 导入
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+OUT = Path(__file__).resolve().parent / "ocr_bench_fixtures"
+
+# (k 值, 字号, 粗细, 处理)
+CASES = [
+    (54321, 1.0, 2, ""),
+    (987, 1.0, 2, ""),
+    (1234, 0.8, 2, ""),
+    (12345, 1.2, 3, ""),
+    (100000, 1.0, 2, ""),
+    (7654321, 0.9, 2, ""),
+    (20480, 1.0, 2, "blur"),
+    (33333, 0.7, 1, "blur"),
+    (45670, 1.0, 2, "jpeg"),
+    (808, 1.1, 2, "jpeg"),
+    (61209, 1.0, 2, "noise"),
+    (1999999, 0.8, 2, "noise"),
+]
+
+
+def render(k: int, scale: float, thick: int, fx: str, seed: int) -> np.ndarray:
+    text = f"{k:,}K"
+    font = cv2.FONT_HERSHEY_DUPLEX
+    (tw, th), base = cv2.getTextSize(text, font, scale, thick)
+    pad_x, pad_y = 14, 12
+    img = np.full((th + base + 2 * pad_y, tw + 2 * pad_x, 3), (30, 30, 30), np.uint8)
+    cv2.putText(img, text, (pad_x, pad_y + th), font, scale, (235, 235, 235), thick, cv2.LINE_AA)
+
+    rng = np.random.default_rng(seed)
+    if fx == "blur":
+        img = cv2.GaussianBlur(img, (3, 3), 0.8)
+    elif fx == "jpeg":
+        ok, enc = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 55])
+        img = cv2.imdecode(enc, cv2.IMREAD_COLOR)
+    elif fx == "noise":
+        img = np.clip(img.astype(np.int16) + rng.normal(0, 6, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+# (k 值, 分辨率, 右边的干扰数字, 处理)
+FULL_CASES = [
+    (12345, (2400, 1080), "3,000+", ""),
+    (987, (2400, 1080), "64.7w", ""),
+    (7654321, (2400, 1080), "120", "jpeg"),
+    (45670, (2400, 1080), "3,000+", "blur"),
+    (54321, (1800, 810), "3,000+", ""),
+    (808, (1800, 810), "1,999K", ""),
+    (1999999, (1800, 810), "88.8w", "jpeg"),
+    (20480, (1800, 810), "3,000+", "blur"),
+]
+
+
+def render_full(k: int, size, distractor: str, fx: str, seed: int) -> np.ndarray:
+    """整张横屏截图：场景 + 顶部 HUD；纯币串左对齐在 ROI0 里（字号按高度缩放，两种分辨率比例一致）"""
+    from src.config import OCR_CURRENCY_BAND
+    from src.services.ocr_service import _ROI_BOXES
+
+    w, h = size
+    rng = np.random.default_rng(1000 + seed)
+
+    # 场景：上亮下暗的渐变 + 几块色块（顶部条带灰度起伏要大，不能被当成纯数字小图）
+    ys = np.linspace(0.0, 1.0, h, dtype=np.float32)[:, None, None]
+    top = np.array([200, 170, 120], np.float32)
+    bottom = np.array([40, 55, 50], np.float32)
+    img = (top * (1.0 - ys) + bottom * ys).repeat(w, axis=1).astype(np.uint8)
+    for _ in range(12):
+        x1, y1 = int(rng.integers(0, w - 50)), int(rng.integers(0, h - 50))
+        x2, y2 = x1 + int(rng.integers(40, w // 4)), y1 + int(rng.integers(40, h // 3))
+        color = tuple(int(c) for c in rng.integers(20, 235, 3))
+        cv2.rectangle(img, (x1, y1), (min(w - 1, x2), min(h - 1, y2)), color, -1)
+
+    # 顶部 HUD：货币栏那一段压暗
+    bx1, by1, bx2, by2 = OCR_CURRENCY_BAND
+    bar = (int(w * bx1), int(h * by1), int(w * bx2), int(h * 0.11))
+    img[bar[1]:bar[3], bar[0]:bar[2]] = (img[bar[1]:bar[3], bar[0]:bar[2]] * 0.25).astype(np.uint8)
+
+    font = cv2.FONT_HERSHEY_DUPLEX
+    scale = 1.15 * h / 1080.0
+    thick = 2 if h >= 1000 else 1
+    (_tw, th), _base = cv2.getTextSize("0", font, scale, thick)
+    base_y = int(h * 0.065)
+
+    # 纯币：ROI0 左边缘往里一点，前面一个币图标（和数字隔开，不会连成一串）
+    rx1, _ry1, rx2, _ry2 = _ROI_BOXES[0]
+    x = int(w * (rx1 + 0.02))
+    cv2.circle(img, (x - int(1.4 * th), base_y - th // 2), max(3, th // 2), (40, 200, 240), -1)
+    coin = f"{k:,}K"
+    cv2.putText(img, coin, (x, base_y), font, scale, (235, 235, 235), thick, cv2.LINE_AA)
+    (cw, _ch), _ = cv2.getTextSize(coin, font, scale, thick)
+
+    # 干扰：同一个 ROI 里右边隔一段的另一个数字（要选最左那串）
+    dx = x + cw + int(2.5 * th)
+    (dw, _dh), _ = cv2.getTextSize(distractor, font, scale, thick)
+    if dx + dw < int(w * rx2):
+        cv2.putText(img, distractor, (dx, base_y), font, scale, (120, 220, 255), thick, cv2.LINE_AA)
+
+    # ROI 外左边的另一个货币
+    cv2.putText(img, "64.7w", (int(w * (bx1 + 0.015)), base_y), font, scale, (235, 235, 235), thick, cv2.LINE_AA)
+
+    if fx == "blur":
+        img = cv2.GaussianBlur(img, (3, 3), 0.8)
+    elif fx == "jpeg":
+        ok, enc = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        img = cv2.imdecode(enc, cv2.IMREAD_COLOR)
+    return img
+
+
+def main():
+    OUT.mkdir(parents=True, exist_ok=True)
+    labels = []
+    for i, (k, scale, thick, fx) in enumerate(CASES):
+        name = f"small_{i:02d}_{k}k{('_' + fx) if fx else ''}.png"
+        cv2.imwrite(str(OUT / name), render(k, scale, thick, fx, seed=i))
+        labels.append({"file": name, "raw": k * 1000, "tol": 0, "kind": "small", "source": "synthetic"})
+    for i, (k, (w, h), distractor, fx) in enumerate(FULL_CASES):
+        name = f"full_{i:02d}_{w}x{h}_{k}k{('_' + fx) if fx else ''}.png"
+        cv2.imwrite(str(OUT / name), render_full(k, (w, h), distractor, fx, seed=i))
+        labels.append({"file": name, "raw": k * 1000, "tol": 0, "kind": "full", "source": "synthetic"})
+    (OUT / "labels.json").write_text(json.dumps(labels, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"✅ 已生成 {len(labels)} 张到 {OUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# tools/ocr_audit.py
+# 日志库批量重跑 OCR 审计：data/logs/<ts>/ 的 up.png / down.png 用当前识别流程重新识别，
+# 和 log.txt 里记下的上号纯币 / 下号纯币对比，输出不一致清单
+#
+#   python tools/ocr_audit.py                      # 默认 CPU 核数个进程，结果写到 data/ocr_audit/
+#   python tools/ocr_audit.py --workers 4 --limit 200
+#   python tools/ocr_audit.py --restart            # 丢掉之前的进度从头跑（默认接着上次跑）
+#   python tools/ocr_audit.py --backend onnx       # 换后端跑一遍，看准确率有没有变化
+#
+# 输出目录：
+#   progress.jsonl  每个日志文件夹一行（边跑边追加；中断后重跑会跳过已完成的）
+#   report.json     汇总（准确率、不一致/没认出来的数量、按识别路径拆分、吞吐）+ 不一致清单
+#
+# 进度按 OCR_PIPELINE_VERSION + 后端区分：识别流程升级后旧进度自动作废
+# 每个子进程把“学到的 ROI / 字形模板库”指到自己的临时副本，不影响线上数据；不查/不写内容缓存
+import argparse
+import atexit
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import LOG_DIR  # noqa: E402
+from src.services import logs_service  # noqa: E402
+
+DEFAULT_OUT = "data/ocr_audit"
+DEFAULT_TOL = 500   # 日志里的纯币只精确到 0.1w
+
+
+# ======================
+# 子进程侧
+# ======================
+_WORKER_TMP = None
+
+
+def _worker_init(backend, int8: bool, workers: int):
+    from src.services import ocr_service, ocr_backends, ocr_roi_store, ocr_glyphs, cpu_budget
+
+    global _WORKER_TMP
+    # 并行靠多进程：线程预算按本工具的进程数分（不是 app 的进程池）
+    cpu_budget.OCR_POOL_WORKERS = workers
+    cpu_budget.OCR_SERVER_URL = ""
+    cpu_budget.apply_cv()
+
+    _WORKER_TMP = Path(tempfile.mkdtemp(prefix="ocr_audit_"))
+    atexit.register(shutil.rmtree, _WORKER_TMP, True)
+    for mod, attr in ((ocr_roi_store, "OCR_ROI_STORE_PATH"), (ocr_glyphs, "OCR_GLYPH_BANK_PATH")):
+        src = Path(getattr(mod, attr))
+        dst = _WORKER_TMP / src.name
+        if src.exists():
+            shutil.copy2(src, dst)
+        setattr(mod, attr, str(dst))
+
+    # 感知哈希索引里就是这些日志截图 + 确认值：不关掉每张图都会命中自己，准确率没有意义
+    ocr_service.OCR_PHASH_ENABLED = False
+
+    if backend:
+        ocr_service.OCR_BACKEND = backend
+    if int8:
+        ocr_backends.OCR_ONNX_INT8 = True
+    ocr_service.get_ocr()
+    ocr_service.get_ocr_num()
+
+
+def _audit_dir(base: str, dir_name: str, tol: int) -> dict:
+    """一个日志文件夹：两张图各识别一次，和 log.txt 对比"""
+    from src.services import ocr_service
+
+    d = Path(base) / dir_name
+    try:
+        text = (d / "log.txt").read_text(encoding="utf-8")
+    except Exception:
+        text = ""
+    expect = dict(zip(("up", "down"), logs_service.parse_up_down_raw_from_log_text(text)))
+
+    row = {"dir": dir_name, "slots": {}}
+    for slot in ("up", "down"):
+        img = d / f"{slot}.png"
+        if not img.exists():
+            continue
+        t0 = time.perf_counter()
+        try:
+            detail = ocr_service.extract_pure_coin_detail(str(img), use_cache=False)
+        except Exception:
+            detail = ocr_service.new_ocr_detail(error="crash")
+        got, exp = detail.get("raw"), expect.get(slot)
+
+        if exp is None:
+            status = "no_label"
+        elif got is None:
+            status = "missing"
+        elif abs(int(got) - int(exp)) <= tol:
+            status = "ok"
+        else:
+            status = "mismatch"
+        row["slots"][slot] = {
+            "expect": exp,
+            "got": got,
+            "status": status,
+            "path": detail.get("path"),
+            "variant": detail.get("variant"),
+            "score": detail.get("score"),
+            "reject": detail.get("reject"),
+            "error": detail.get("error"),
+            "ms": round((time.perf_counter() - t0) * 1000.0, 2),
+        }
+    return row
+
+
+# ======================
+# 主进程侧
+# ======================
+def _run_tag(backend: str, int8: bool) -> str:
+    from src.services import ocr_service
+
+    return f"{ocr_service.OCR_PIPELINE_VERSION}/{backend}" + ("+int8" if int8 else "")
+
+
+def _load_progress(path: Path, tag: str) -> dict:
+    """{dir: row}（只认同一个流程版本/后端跑出来的）"""
+    done = {}
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except Exception:
+                continue  # 中断时写了半行
+            if isinstance(row, dict) and row.get("tag") == tag and row.get("dir"):
+                done[row["dir"]] = row
+    return done
+
+
+def _list_targets(base: Path) -> list:
+    if not base.exists():
+        return []
+    return sorted(
+        d for d in os.listdir(base)
+        if (base / d / "log.txt").exists() and ((base / d / "up.png").exists() or (base / d / "down.png").exists())
+    )
+
+
+def build_report(rows: list, tag: str, elapsed_s: float, fresh: int) -> dict:
+    slots = [(r["dir"], slot, s) for r in rows for slot, s in sorted(r.get("slots", {}).items())]
+    counts = {}
+    by_path = {}
+    for _d, _slot, s in slots:
+        counts[s["status"]] = counts.get(s["status"], 0) + 1
+        if s["status"] in ("ok", "mismatch"):
+            p = s.get("path") or "none"
+            st = by_path.setdefault(p, {"ok": 0, "mismatch": 0})
+            st[s["status"]] += 1
+
+    labelled = sum(v for k, v in counts.items() if k != "no_label")
+    return {
+        "tag": tag,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "dirs": len(rows),
+        "images": len(slots),
+        "labelled": labelled,
+        "counts": counts,
+        "accuracy": round(counts.get("ok", 0) / labelled, 4) if labelled else None,
+        "by_path": by_path,
+        "throughput": {
+            "elapsed_s": round(elapsed_s, 1),
+            "dirs_this_run": fresh,
+            "dirs_per_s": round(fresh / elapsed_s, 2) if elapsed_s > 0 else None,
+        },
+        "mismatches": [
+            {"dir": d, "slot": slot, "expect": s["expect"], "got": s["got"],
+             "diff": (int(s["got"]) - int(s["expect"])) if s["got"] is not None else None,
+             "status": s["status"], "path": s.get("path"), "variant": s.get("variant"),
+             "score": s.get("score"), "reject": s.get("reject"), "error": s.get("error")}
+            for d, slot, s in slots if s["status"] in ("mismatch", "missing")
+        ],
+    }
+
+
+def run_audit(base: Path, out: Path, workers: int, tol: int = DEFAULT_TOL, limit: int = 0,
+              restart: bool = False, backend: str = None, int8: bool = False) -> dict:
+    from src.services import ocr_service
+
+    out.mkdir(parents=True, exist_ok=True)
+    progress = out / "progress.jsonl"
+    if restart and progress.exists():
+        progress.unlink()
+
+    tag = _run_tag(backend or ocr_service.OCR_BACKEND, int8)
+    done = _load_progress(progress, tag)
+    todo = [d for d in _list_targets(base) if d not in done]
+    if limit > 0:
+        todo = todo[:limit]
+    print(f"▶ 日志 {len(done) + len(todo)} 个（已完成 {len(done)}，本次 {len(todo)}），{workers} 个进程")
+
+    t0 = time.perf_counter()
+    fresh = 0
+    if todo:
+        # spawn：Paddle 不是 fork-safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_worker_init, initargs=(backend, int8, workers)) as pool, \
+                progress.open("a", encoding="utf-8") as f:
+            futs = {pool.submit(_audit_dir, str(base), d, tol): d for d in todo}
+            for fut in as_completed(futs):
+                try:
+                    row = fut.result()
+                except Exception:
+                    print(f"⚠️ {futs[fut]} 识别失败（子进程异常），下次重跑会再试")
+                    continue
+                row["tag"] = tag
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                done[row["dir"]] = row
+                fresh += 1
+                if fresh % 50 == 0 or fresh == len(todo):
+                    el = time.perf_counter() - t0
+                    print(f"  {fresh}/{len(todo)}  {fresh / el:.1f} 个/秒")
+
+    report = build_report([done[d] for d in sorted(done)], tag, time.perf_counter() - t0, fresh)
+    (out / "report.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="日志库批量重跑 OCR，和 log.txt 记录的纯币对比")
+    ap.add_argument("--logs-dir", default=LOG_DIR)
+    ap.add_argument("--out", default=DEFAULT_OUT, help="进度和报告目录")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--tol", type=int, default=DEFAULT_TOL, help="允许误差（raw）")
+    ap.add_argument("--limit", type=int, default=0, help="本次最多跑几个日志文件夹（0 = 全部）")
+    ap.add_argument("--restart", action="store_true", help="丢掉之前的进度")
+    ap.add_argument("--backend", choices=["paddle", "onnx"], help="覆盖 config.OCR_BACKEND")
+    ap.add_argument("--int8", action="store_true", help="onnx 后端用 int8 量化模型")
+    args = ap.parse_args()
+
+    report = run_audit(Path(args.logs_dir), Path(args.out), max(1, args.workers), tol=args.tol,
+                       limit=args.limit, restart=args.restart, backend=args.backend, int8=args.int8)
+    c = report["counts"]
+    print(f"✅ 完成：{report['images']} 张图，准确率 {report['accuracy']}，"
+          f"不一致 {c.get('mismatch', 0)}，没认出 {c.get('missing', 0)}，无记录 {c.get('no_label', 0)}")
+    print(f"   报告：{Path(args.out) / 'report.json'}")
+
+
+if __name__ == "__main__":
+    main()
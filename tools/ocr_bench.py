@@ -0,0 +1,332 @@
+# tools/ocr_bench.py
+# 纯币 OCR 基准测试（离线、CPU 即可）：
+#
+#   语料目录（默认 data/ocr_bench/）：
+#     labels.json：[{"file": "xxx.png", "raw": 12345000, "tol": 0, "kind": "full"}, ...]
+#       - raw：期望的纯币 raw；tol：允许误差（从日志导入的值只精确到 0.1w，tol=500）
+#       - kind：small（只截了数字）/ full（整张截图），不填按图片自动判断
+#     图片和 labels.json 放在同一个目录
+#
+#   仓库自带一套固定语料（程序画的，标签精确；tools/make_ocr_fixtures.py 生成）：
+#   数字条（small）+ 两种分辨率的整张横屏截图（full，带干扰数字，走条带解码）
+#     python tools/ocr_bench.py --corpus tools/ocr_bench_fixtures
+#
+#   从日志库导入语料（up.png/down.png + log.txt 里的上号/下号纯币）：
+#     python tools/ocr_bench.py --build-from-logs
+#
+#   跑基准（输出 JSON：准确率、p50/p95/p99 延迟、每张图 OCR passes、解码方式/解码出的像素 MB、按 kind/分辨率拆分）：
+#     python tools/ocr_bench.py --out bench.json
+#     python tools/ocr_bench.py --compare bench.json      # 和上次结果对比
+#
+#   换后端对比（准确率 / 延迟 / 冷启动 / 内存）：
+#     python tools/ocr_bench.py --backend paddle --out paddle.json
+#     python tools/ocr_bench.py --backend onnx [--int8] --compare paddle.json
+#
+#   默认把“学到的 ROI / 字形模板库”指到临时目录，跑完不影响线上数据；--live 则用真实数据
+#   感知哈希复用（ocr_phash）总是关掉：语料截图本身就在索引里，不关会命中自己
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import LOG_DIR  # noqa: E402
+from src.services import logs_service  # noqa: E402
+
+DEFAULT_CORPUS = "data/ocr_bench"
+
+
+def _percentile(values, p: float):
+    if not values:
+        return None
+    xs = sorted(values)
+    k = max(0, min(len(xs) - 1, math.ceil(p / 100.0 * len(xs)) - 1))
+    return round(float(xs[k]), 2)
+
+
+def _summary(rows):
+    lat = [r["ms"] for r in rows]
+    passes = [r["passes"] for r in rows]
+    n = len(rows)
+    ok = sum(1 for r in rows if r["ok"])
+    recognized = sum(1 for r in rows if r["got"] is not None)
+    return {
+        "images": n,
+        "accuracy": round(ok / n, 4) if n else None,
+        "recognized_rate": round(recognized / n, 4) if n else None,
+        "latency_ms": {
+            "p50": _percentile(lat, 50),
+            "p95": _percentile(lat, 95),
+            "p99": _percentile(lat, 99),
+            "mean": round(sum(lat) / n, 2) if n else None,
+        },
+        "passes_per_image": {
+            "mean": round(sum(passes) / n, 2) if n else None,
+            "p95": _percentile(passes, 95),
+            "max": max(passes) if passes else None,
+        },
+        "decode": {
+            "band_rate": round(sum(1 for r in rows if r["decode_mode"] == "band") / n, 4) if n else None,
+            "mean_mb": round(sum(r["decoded_mb"] for r in rows) / n, 2) if n else None,
+            "max_mb": max((r["decoded_mb"] for r in rows), default=None),
+        },
+    }
+
+
+def load_labels(corpus: Path):
+    path = corpus / "labels.json"
+    if not path.exists():
+        return []
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    return obj if isinstance(obj, list) else []
+
+
+def build_from_logs(corpus: Path, logs_dir: str = LOG_DIR) -> int:
+    """把日志库里 up/down 截图 + 确认过的纯币值导成语料（已存在的文件跳过）"""
+    corpus.mkdir(parents=True, exist_ok=True)
+    labels = load_labels(corpus)
+    known = {x.get("file") for x in labels}
+
+    added = 0
+    base = Path(logs_dir)
+    if not base.exists():
+        return 0
+    for d in sorted(os.listdir(base)):
+        log_path = base / d / "log.txt"
+        if not log_path.exists():
+            continue
+        up_raw, down_raw = logs_service.parse_up_down_raw_from_log_text(log_path.read_text(encoding="utf-8"))
+        for slot, raw in (("up", up_raw), ("down", down_raw)):
+            src = base / d / f"{slot}.png"
+            name = f"{d}_{slot}.png"
+            if raw is None or not src.exists() or name in known:
+                continue
+            shutil.copy2(src, corpus / name)
+            labels.append({"file": name, "raw": int(raw), "tol": 500, "source": f"{d}/{slot}.png"})
+            known.add(name)
+            added += 1
+
+    (corpus / "labels.json").write_text(json.dumps(labels, ensure_ascii=False, indent=2), encoding="utf-8")
+    return added
+
+
+def _isolate_learned_state(live: bool):
+    """
+    把学到的 ROI / 字形库指到临时目录（复制一份当前数据当起点），返回临时目录
+    感知哈希复用总是关掉（--live 也一样）：--build-from-logs 的语料就是索引里的截图，会直接命中自己的确认值
+    """
+    from src.services import ocr_service, ocr_roi_store, ocr_glyphs
+
+    ocr_service.OCR_PHASH_ENABLED = False
+    if live:
+        return None
+
+    tmp = Path(tempfile.mkdtemp(prefix="ocr_bench_"))
+    for mod, attr in ((ocr_roi_store, "OCR_ROI_STORE_PATH"), (ocr_glyphs, "OCR_GLYPH_BANK_PATH")):
+        src = Path(getattr(mod, attr))
+        dst = tmp / src.name
+        if src.exists():
+            shutil.copy2(src, dst)
+        setattr(mod, attr, str(dst))
+    return tmp
+
+
+def _rss_mb():
+    try:
+        import psutil
+
+        return round(psutil.Process().memory_info().rss / 1e6, 1)
+    except Exception:
+        return None
+
+
+def _select_backend(backend: str = None, int8: bool = False):
+    """覆盖 config 里的 OCR 后端（必须在第一次 get_ocr 之前）"""
+    from src.services import ocr_service, ocr_backends
+
+    if backend:
+        ocr_service.OCR_BACKEND = backend
+    if int8:
+        ocr_backends.OCR_ONNX_INT8 = True
+    return ocr_service.OCR_BACKEND
+
+
+def run_bench(corpus: Path, warmup: int = 0, repeat: int = 1, live: bool = False) -> dict:
+    import cv2
+    from src.services import ocr_service, ocr_backends
+
+    labels = load_labels(corpus)
+    tmp = _isolate_learned_state(live)
+    try:
+        items = []
+        for lab in labels:
+            path = corpus / str(lab.get("file"))
+            if not path.exists():
+                continue
+            img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img is None:
+                continue
+            h, w = img.shape[:2]
+            kind = lab.get("kind") or ("small" if ocr_service._is_direct_number_image(img) else "full")
+            items.append((path, lab, kind, f"{w}x{h}"))
+
+        # 第一次调用含模型加载，不计入延迟（单独记冷启动）
+        rss_before = _rss_mb()
+        cold_ms = None
+        if items:
+            t0 = time.perf_counter()
+            ocr_service.get_ocr()
+            ocr_service.get_ocr_num()
+            cold_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        rss_loaded = _rss_mb()
+
+        for _ in range(max(0, warmup)):
+            for path, _lab, _kind, _res in items:
+                ocr_service.extract_pure_coin_detail(str(path), use_cache=False)
+
+        rows = []
+        for it in range(max(1, repeat)):
+            for path, lab, kind, res in items:
+                t0 = time.perf_counter()
+                detail = ocr_service.extract_pure_coin_detail(str(path), use_cache=False)
+                ms = (time.perf_counter() - t0) * 1000.0
+
+                expect = lab.get("raw")
+                got = detail.get("raw")
+                tol = int(lab.get("tol") or 0)
+                dec = detail.get("decode") or {}
+                dec_w = (dec.get("size") or [0, 0])[0]
+                ok = expect is not None and got is not None and abs(int(got) - int(expect)) <= tol
+                rows.append({
+                    "file": path.name,
+                    "iter": it,
+                    "kind": kind,
+                    "res": res,
+                    "expect": expect,
+                    "got": got,
+                    "ok": ok,
+                    "ms": round(ms, 2),
+                    "passes": int(detail.get("passes") or 0),
+                    "path": detail.get("path"),
+                    "variant": detail.get("variant"),
+                    "reject": detail.get("reject"),
+                    "decode_mode": dec.get("mode"),
+                    "decoded_mb": round(dec_w * int(dec.get("rows") or 0) * 3 / 1e6, 2),
+                    "timings": detail.get("timings") or {},
+                })
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    by_kind = {k: _summary([r for r in rows if r["kind"] == k]) for k in sorted({r["kind"] for r in rows})}
+    by_res = {k: _summary([r for r in rows if r["res"] == k]) for k in sorted({r["res"] for r in rows})}
+
+    stage_ms = {}
+    for r in rows:
+        for st, ms in r["timings"].items():
+            stage_ms.setdefault(st, []).append(ms)
+
+    by_path = {}
+    for r in rows:
+        p = r["path"] or "none"
+        by_path[p] = by_path.get(p, 0) + 1
+
+    return {
+        "pipeline_version": ocr_service.OCR_PIPELINE_VERSION,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": str(corpus),
+        "repeat": max(1, repeat),
+        "backend": ocr_service.OCR_BACKEND + ("+int8" if ocr_service.OCR_BACKEND == "onnx" and ocr_backends.OCR_ONNX_INT8 else ""),
+        "cold_start_ms": cold_ms,
+        "rss_mb": {"before_load": rss_before, "after_load": rss_loaded, "after_run": _rss_mb()},
+        "overall": _summary(rows),
+        "by_kind": by_kind,
+        "by_resolution": by_res,
+        "by_path": by_path,
+        "stages_ms": {
+            st: {"p50": _percentile(v, 50), "p95": _percentile(v, 95), "mean": round(sum(v) / len(v), 2)}
+            for st, v in sorted(stage_ms.items())
+        },
+        "failures": [
+            {k: r[k] for k in ("file", "kind", "res", "expect", "got", "path", "variant", "reject")}
+            for r in rows if not r["ok"] and r["iter"] == 0
+        ],
+    }
+
+
+def _compare(prev: dict, cur: dict) -> dict:
+    def pick(d, *keys):
+        for k in keys:
+            d = (d or {}).get(k)
+        return d
+
+    out = {"backend": {"prev": prev.get("backend"), "cur": cur.get("backend")}}
+    for name, keys in (
+        ("accuracy", ("overall", "accuracy")),
+        ("p50_ms", ("overall", "latency_ms", "p50")),
+        ("p95_ms", ("overall", "latency_ms", "p95")),
+        ("p99_ms", ("overall", "latency_ms", "p99")),
+        ("passes_mean", ("overall", "passes_per_image", "mean")),
+        ("decode_p50_ms", ("stages_ms", "decode", "p50")),
+        ("decoded_mb_mean", ("overall", "decode", "mean_mb")),
+        ("cold_start_ms", ("cold_start_ms",)),
+        ("rss_after_run_mb", ("rss_mb", "after_run")),
+    ):
+        a, b = pick(prev, *keys), pick(cur, *keys)
+        out[name] = {"prev": a, "cur": b, "delta": (round(b - a, 4) if isinstance(a, (int, float)) and isinstance(b, (int, float)) else None)}
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="纯币 OCR 基准测试")
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS, help="语料目录（含 labels.json）")
+    ap.add_argument("--build-from-logs", action="store_true", help="从日志库导入语料后退出")
+    ap.add_argument("--logs-dir", default=LOG_DIR)
+    ap.add_argument("--warmup", type=int, default=0, help="不计时的预跑轮数（让学到的 ROI 生效）")
+    ap.add_argument("--repeat", type=int, default=1, help="计时轮数")
+    ap.add_argument("--live", action="store_true", help="直接用线上的 ROI/字形数据（会被改写）")
+    ap.add_argument("--out", help="结果写到这个 JSON 文件（默认打印）")
+    ap.add_argument("--compare", help="和之前的结果 JSON 对比")
+    ap.add_argument("--backend", choices=["paddle", "onnx"], help="覆盖 config.OCR_BACKEND")
+    ap.add_argument("--int8", action="store_true", help="onnx 后端用 int8 量化模型")
+    args = ap.parse_args()
+
+    corpus = Path(args.corpus)
+    if args.build_from_logs:
+        n = build_from_logs(corpus, args.logs_dir)
+        print(f"✅ 已导入 {n} 张截图到 {corpus}/（共 {len(load_labels(corpus))} 条）")
+        return
+
+    if not load_labels(corpus):
+        print(f"⚠️ {corpus}/labels.json 为空或不存在（可以先跑 --build-from-logs）")
+        sys.exit(1)
+
+    _select_backend(args.backend, args.int8)
+    result = run_bench(corpus, warmup=args.warmup, repeat=args.repeat, live=args.live)
+
+    if args.compare:
+        prev = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        result["compare"] = _compare(prev, result)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+        print(f"✅ 结果已写入 {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
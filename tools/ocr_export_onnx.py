@@ -0,0 +1,85 @@
+# tools/ocr_export_onnx.py
+# 把 PaddleOCR 用的推理模型（det / rec / cls）导出成 ONNX，给 OCR_BACKEND = "onnx" 用：
+#
+#   pip install paddle2onnx onnxruntime          # 只有导出这一步需要 paddle2onnx
+#   python tools/ocr_export_onnx.py              # 导出到 data/ocr_models/main、data/ocr_models/num
+#   python tools/ocr_export_onnx.py --int8       # 另外生成 det.int8.onnx / rec.int8.onnx（动态 int8 量化）
+#
+# 模型目录从 PaddleOCR 实例里取（和 get_ocr / get_ocr_num 同样的参数，第一次会自动下载）
+# 导出后用基准确认准确率一致再切后端：
+#   python tools/ocr_bench.py --backend paddle --out paddle.json
+#   python tools/ocr_bench.py --backend onnx --compare paddle.json
+#   python tools/ocr_bench.py --backend onnx --int8 --compare paddle.json
+import argparse
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import OCR_ONNX_DIR  # noqa: E402
+from src.services import ocr_backends  # noqa: E402
+
+
+def _paddle2onnx(model_dir: str, out_file: Path):
+    cmd = [
+        "paddle2onnx",
+        "--model_dir", model_dir,
+        "--model_filename", "inference.pdmodel",
+        "--params_filename", "inference.pdiparams",
+        "--save_file", str(out_file),
+        "--opset_version", "11",
+        "--enable_onnx_checker", "True",
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def _quantize(src: Path, dst: Path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QUInt8)
+
+
+def export_profile(profile: str, out_root: Path, int8: bool):
+    ocr = ocr_backends.create_paddle(profile)
+    args = ocr.args
+    out = out_root / profile
+    out.mkdir(parents=True, exist_ok=True)
+
+    parts = [("det", args.det_model_dir), ("rec", args.rec_model_dir)]
+    if ocr_backends.PROFILES[profile]["use_angle_cls"]:
+        parts.append(("cls", args.cls_model_dir))
+
+    for name, model_dir in parts:
+        dst = out / f"{name}.onnx"
+        print(f"▶ {profile}/{name}: {model_dir} -> {dst}")
+        _paddle2onnx(model_dir, dst)
+        # cls 很小而且对量化敏感，只量化 det/rec
+        if int8 and name != "cls":
+            qdst = out / f"{name}.int8.onnx"
+            print(f"  int8 -> {qdst}")
+            _quantize(dst, qdst)
+
+    shutil.copy2(args.rec_char_dict_path, out / "dict.txt")
+    print(f"✅ {profile} 导出完成：{out}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="导出 PaddleOCR 模型为 ONNX")
+    ap.add_argument("--out", default=OCR_ONNX_DIR)
+    ap.add_argument("--profile", choices=sorted(ocr_backends.PROFILES), action="append",
+                    help="只导出某一套（默认 main + num）")
+    ap.add_argument("--int8", action="store_true", help="额外生成动态 int8 量化的 det/rec")
+    args = ap.parse_args()
+
+    if shutil.which("paddle2onnx") is None:
+        print("⚠️ 找不到 paddle2onnx，请先 pip install paddle2onnx")
+        sys.exit(1)
+
+    for profile in args.profile or sorted(ocr_backends.PROFILES):
+        export_profile(profile, Path(args.out), args.int8)
+
+
+if __name__ == "__main__":
+    main()
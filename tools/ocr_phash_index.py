@@ -0,0 +1,83 @@
+# tools/ocr_phash_index.py
+# 用日志库重建纯币感知哈希索引（data/ocr_phash.jsonl）：
+#   每个 data/logs/<ts>/ 的 up.png / down.png + log.txt 里确认过的上号纯币 / 下号纯币
+#
+#   python tools/ocr_phash_index.py              # 追加（已收录的跳过）
+#   python tools/ocr_phash_index.py --rebuild    # 清空后重建
+#   python tools/ocr_phash_index.py --check      # 只统计：每张图在索引里能不能复用、复用的值对不对
+#
+# 之后写日志时会自动收录（page.on_confirm_write_log -> ocr_service.harvest_phash）
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import LOG_DIR  # noqa: E402
+from src.services import logs_service, ocr_service, ocr_phash  # noqa: E402
+
+
+def _iter_labelled(base: Path):
+    if not base.exists():
+        return
+    for d in sorted(os.listdir(base)):
+        log_path = base / d / "log.txt"
+        if not log_path.exists():
+            continue
+        up_raw, down_raw = logs_service.parse_up_down_raw_from_log_text(log_path.read_text(encoding="utf-8"))
+        for slot, raw in (("up", up_raw), ("down", down_raw)):
+            img = base / d / f"{slot}.png"
+            if raw is not None and img.exists():
+                yield d, slot, img, raw
+
+
+def build(base: Path, rebuild: bool = False) -> int:
+    if rebuild:
+        ocr_phash.clear()
+    added = 0
+    for d, slot, img, raw in _iter_labelled(base):
+        if ocr_service.harvest_phash(str(img), raw, f"{d}/{slot}", save=False):
+            added += 1
+    ocr_phash.save()
+    return added
+
+
+def check(base: Path) -> dict:
+    """每张图排除自己后查索引：能复用几张、复用的值和日志一致的几张"""
+    st = {"images": 0, "reused": 0, "correct": 0}
+    for d, slot, img, raw in _iter_labelled(base):
+        st["images"] += 1
+        detail = ocr_service.new_ocr_detail()
+        data = Path(img).read_bytes()
+        prep = ocr_service._prepare_image(data, detail)
+        if prep is None:
+            continue
+        im, w, h, direct = prep
+        if not ocr_service._try_phash(im, w, h, direct, detail):
+            continue
+        if (detail["phash"] or {}).get("source") == f"{d}/{slot}" and detail["phash"]["dist"] == 0:
+            continue  # 命中的是自己
+        st["reused"] += 1
+        if abs(int(detail["raw"]) - int(raw)) <= 500:
+            st["correct"] += 1
+    return st
+
+
+def main():
+    ap = argparse.ArgumentParser(description="用日志库重建纯币感知哈希索引")
+    ap.add_argument("--logs-dir", default=LOG_DIR)
+    ap.add_argument("--rebuild", action="store_true", help="清空后重建")
+    ap.add_argument("--check", action="store_true", help="只统计复用命中率/正确率")
+    args = ap.parse_args()
+
+    base = Path(args.logs_dir)
+    if args.check:
+        print(check(base))
+        return
+    n = build(base, args.rebuild)
+    print(f"✅ 新收录 {n} 张，索引：{ocr_phash.index_stats()}")
+
+
+if __name__ == "__main__":
+    main()
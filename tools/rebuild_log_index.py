@@ -0,0 +1,38 @@
+# tools/rebuild_log_index.py
+# 从磁盘上的日志文件夹全量重建日志索引（data/log_index.sqlite3）：
+#   python tools/rebuild_log_index.py
+#   python tools/rebuild_log_index.py --verify        # 只对账：从磁盘重算今日/累计等合计，和索引里的 totals 比
+#   python tools/rebuild_log_index.py --verify --fix  # 对不上就重建
+# 平时不用跑：写日志时自动入库，目录有增删会自动增量同步；手动改过 log.txt 内容才需要
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config import LOG_DIR  # noqa: E402
+from src.services import log_index  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="重建 / 对账日志索引")
+    ap.add_argument("--verify", action="store_true", help="从磁盘重算合计，和索引对账")
+    ap.add_argument("--fix", action="store_true", help="配合 --verify：对不上就重建")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.verify:
+        res = log_index.verify_totals(LOG_DIR, fix=args.fix)
+        print(json.dumps(res, ensure_ascii=False, indent=2))
+        print(("✅ 对账一致" if res["ok"] else "❌ 对不上" + ("（已重建）" if res.get("fixed") else ""))
+              + f"，用时 {time.perf_counter() - t0:.2f}s")
+        sys.exit(0 if res["ok"] or res.get("fixed") else 1)
+
+    n = log_index.rebuild(LOG_DIR)
+    print(f"✅ 已重建日志索引：{n} 条，用时 {time.perf_counter() - t0:.2f}s（{log_index.index_stats()['path']}）")
+
+
+if __name__ == "__main__":
+    main()